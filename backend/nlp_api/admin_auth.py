@@ -0,0 +1,41 @@
+"""
+🔐 Protection des routes d'administration (/catalog/import, /catalog/invalidate).
+
+Ces routes écrivent dans "Products" ou forcent un rechargement du catalogue,
+alors que le port du service est publié sur l'hôte (docker-compose) et
+appelé directement par le frontend. Comme requireAdmin côté Node, elles
+exigent donc un jeton partagé, envoyé en en-tête
+"Authorization: Bearer <jeton>" (ou "X-Admin-Token: <jeton>"). Sans
+NLP_ADMIN_TOKEN configuré, elles sont désactivées.
+
+Variables d'environnement :
+    NLP_ADMIN_TOKEN   jeton partagé des routes d'administration (vide = routes désactivées)
+"""
+import functools
+import hmac
+import os
+
+from flask import jsonify, request
+
+NLP_ADMIN_TOKEN = os.getenv("NLP_ADMIN_TOKEN", "")
+
+
+def request_token():
+    """Token sent with the current request, or None"""
+    authorization = request.headers.get("Authorization", "")
+    if authorization.startswith("Bearer "):
+        return authorization[len("Bearer "):].strip()
+    return request.headers.get("X-Admin-Token")
+
+
+def admin_required(view):
+    """Route decorator: 403 when NLP_ADMIN_TOKEN is not configured, 401 without the right token"""
+    @functools.wraps(view)
+    def guarded(*args, **kwargs):
+        if not NLP_ADMIN_TOKEN:
+            return jsonify({"error": "Route d'administration désactivée (NLP_ADMIN_TOKEN non configuré)"}), 403
+        token = request_token()
+        if token is None or not hmac.compare_digest(token.encode(), NLP_ADMIN_TOKEN.encode()):
+            return jsonify({"error": "Accès refusé : jeton d'administration manquant ou invalide"}), 401
+        return view(*args, **kwargs)
+    return guarded
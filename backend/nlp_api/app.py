@@ -1,57 +1,44 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from textblob import TextBlob
-import psycopg2
+import io
 import json
+import logging
 import re
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from nltk.stem import WordNetLemmatizer
-
-# Download NLTK data
-try:
-    nltk.download('punkt', quiet=True)
-    nltk.download('stopwords', quiet=True)
-    nltk.download('wordnet', quiet=True)
-except:
-    pass
+import db
+import nlp_resources
+from admin_auth import admin_required
+from catalog import catalog, start_listener
+from catalog_import import import_csv, CATALOG_IMPORT_CHUNK_SIZE
+from search_index import ProductIndex
+from index_artifact import current_artifact
+from intent import IntentDetector
+from scoring import VectorizedScorer
+from reviews import parse_reviews, analyze_batch
+from review_queue import ReviewQueue
+from query_cache import QueryCache, SEARCH_CACHE_SIZE
+from filters import CatalogFilters, SearchFilters, Page, encode_cursor
+from suggest import Suggester, SUGGEST_LIMIT, SUGGEST_MAX_LIMIT
+from fuzzy import TermCorrector
+from text_preprocessing import fast_word_tokenize, fold_accents, cached_lemmatizer, lemma_cache_stats
+from metrics import StageTimer, SEARCH_STAGE_SECONDS, SEARCH_REQUESTS, instrument
+from logger import get_logger
 
 # 🔹 Initialisation de l'application Flask
 app = Flask(__name__)
 CORS(app)  # Activer les CORS pour permettre les requêtes externes
 
-# 🔹 Configuration PostgreSQL - Railway Environment
-import os
-
-DB_NAME = os.getenv("POSTGRES_DB", "eco_recommendation")
-DB_USER = os.getenv("POSTGRES_USER", "postgres")
-DB_PASSWORD = os.getenv("POSTGRES_PASSWORD", "postgres")
-DB_HOST = os.getenv("POSTGRES_HOST", "localhost")
-DB_PORT = os.getenv("POSTGRES_PORT", "5432")
+# 📈 Latence de chaque route + /metrics (format Prometheus, voir metrics.py) ; logs niveaux + échantillonnés
+instrument(app, "search")
+log = get_logger("search")
 
-# 🔹 Connexion PostgreSQL
-def get_db_connection():
-    try:
-        return psycopg2.connect(
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT
-        )
-    except Exception as e:
-        print(f"❌ Database connection error: {e}")
-        # Fallback to Railway's DATABASE_URL if available
-        if os.getenv("DATABASE_URL"):
-            return psycopg2.connect(os.getenv("DATABASE_URL"))
-        raise e
+# 🔹 Configuration PostgreSQL - Railway Environment (pool partagé, voir db.py)
+import os
 
 # 🤖 AI Search Engine Class
 class AISearchEngine:
     def __init__(self):
-        self.lemmatizer = WordNetLemmatizer()
-        self.stop_words = set(stopwords.words('english'))
+        # NLTK chargé au premier usage ou par le warmup (voir nlp_resources.py) ; token -> lemme mémorisé
+        self.lemmatize = cached_lemmatizer(lambda token: nlp_resources.lemmatizer().lemmatize(token))
         
         # Advanced Intent Recognition Patterns
         self.intent_patterns = {
@@ -107,19 +94,69 @@ class AISearchEngine:
                 r'\b(need.*clean|want.*clean|looking.*clean)\b'
             ]
         }
+
+        # Additional scoring based on word importance (2 points per query word)
+        self.important_words = {
+            'facial_care': {'face', 'facial', 'skin', 'soap', 'cleanser', 'moisturizer', 'hygiene', 'care', 'use', 'my'},
+            'hair_care': {'hair', 'shampoo', 'brush', 'comb', 'care'},
+            'oral_care': {'teeth', 'tooth', 'brush', 'toothpaste', 'dental', 'oral', 'hygiene'},
+            'kitchen': {'kitchen', 'cook', 'utensil', 'plate', 'cup', 'bottle'},
+            'bathroom': {'bathroom', 'soap', 'towel', 'hygiene', 'clean'},
+            'eco_friendly': {'eco', 'green', 'sustainable', 'bamboo', 'natural', 'organic'},
+            'materials': {'wood', 'glass', 'metal', 'cotton', 'bamboo', 'ceramic'},
+            'cleaning': {'clean', 'soap', 'wash', 'hygiene'}
+        }
+
+        # Patterns compiled once (see intent.py)
+        self.intent_detector = IntentDetector(self.intent_patterns, self.important_words, self.preprocess_text)
+
+        # Product keywords (substring match) giving the intent score, with its weight
+        self.intent_keywords = {
+            'facial_care': (['soap', 'savon', 'face', 'facial', 'skin', 'hygiene', 'cleanser', 'moisturizer'], 10),
+            'hair_care': (['hair', 'cheveux', 'brush', 'brosse', 'shampoo', 'bamboo'], 10),
+            'oral_care': (['teeth', 'dents', 'tooth', 'dent', 'toothbrush'], 8),
+            'kitchen': (['kitchen', 'cuisine', 'utensil', 'cup', 'bottle'], 8),
+            'bathroom': (['soap', 'savon', 'towel', 'hygiene'], 8),
+            'eco_friendly': (['bamboo', 'bambou', 'eco', 'green', 'natural', 'organic'], 10),
+            'materials': (['wood', 'glass', 'metal', 'cotton', 'bamboo'], 6),
+            'cleaning': (['soap', 'savon', 'clean', 'wash'], 7)
+        }
+
+        # A product must contain one of these keywords to stay relevant for the intent
+        self.relevance_keywords = {
+            'facial_care': ['soap', 'savon', 'face', 'facial', 'skin', 'hygiene', 'cleanser', 'moisturizer', 'wash', 'clean'],
+            'hair_care': ['hair', 'cheveux', 'brush', 'brosse', 'shampoo', 'comb', 'peigne', 'bamboo'],
+            'oral_care': ['teeth', 'dents', 'tooth', 'dent', 'toothbrush', 'toothpaste', 'dental'],
+            'kitchen': ['kitchen', 'cuisine', 'utensil', 'cup', 'bottle', 'plate', 'cook'],
+            'bathroom': ['bathroom', 'soap', 'savon', 'towel', 'hygiene', 'wash', 'clean']
+        }
+
+        # Index produits (tokens lemmatisés + index inversé), calculé une fois par version du catalogue
+        keywords = [k for words, _ in self.intent_keywords.values() for k in words]
+        keywords += [k for words in self.relevance_keywords.values() for k in words]
+        self.index = ProductIndex(self.preprocess_text, keywords=keywords)
+        self.scorer = VectorizedScorer(self.index, self.intent_keywords, self.relevance_keywords)
     
+    @property
+    def lemmatizer(self):
+        return nlp_resources.lemmatizer()
+
+    @property
+    def stop_words(self):
+        return nlp_resources.stop_words()
+
     def preprocess_text(self, text):
         """Advanced text preprocessing with lemmatization"""
         if not text:
             return ""
         
-        # Convert to lowercase and remove special characters
-        text = re.sub(r'[^a-zA-Z\s]', ' ', text.lower())
+        # Convert to lowercase, fold accents ("hygiène" -> "hygiene") and remove special characters
+        text = re.sub(r'[^a-z\s]', ' ', fold_accents(text))
         
         try:
             # Tokenize and lemmatize
-            tokens = word_tokenize(text)
-            tokens = [self.lemmatizer.lemmatize(token) for token in tokens]
+            tokens = fast_word_tokenize(text)
+            tokens = [self.lemmatize(token) for token in tokens]
             # Remove stop words and short words
             tokens = [token for token in tokens if token not in self.stop_words and len(token) > 2]
             return ' '.join(tokens)
@@ -129,129 +166,196 @@ class AISearchEngine:
     def detect_intent(self, query):
         """Advanced intent detection with confidence scoring"""
         try:
-            query_lower = query.lower()
-            intent_scores = {}
-            
-            for intent, patterns in self.intent_patterns.items():
-                score = 0
-                for pattern in patterns:
-                    matches = re.findall(pattern, query_lower, re.IGNORECASE)
-                    score += len(matches) * 3
-                
-                # Additional scoring based on word importance
-                query_words = set(self.preprocess_text(query).split())
-                important_words = {
-                    'facial_care': {'face', 'facial', 'skin', 'soap', 'cleanser', 'moisturizer', 'hygiene', 'care', 'use', 'my'},
-                    'hair_care': {'hair', 'shampoo', 'brush', 'comb', 'care'},
-                    'oral_care': {'teeth', 'tooth', 'brush', 'toothpaste', 'dental', 'oral', 'hygiene'},
-                    'kitchen': {'kitchen', 'cook', 'utensil', 'plate', 'cup', 'bottle'},
-                    'bathroom': {'bathroom', 'soap', 'towel', 'hygiene', 'clean'},
-                    'eco_friendly': {'eco', 'green', 'sustainable', 'bamboo', 'natural', 'organic'},
-                    'materials': {'wood', 'glass', 'metal', 'cotton', 'bamboo', 'ceramic'},
-                    'cleaning': {'clean', 'soap', 'wash', 'hygiene'}
-                }
-                
-                if intent in important_words:
-                    word_overlap = len(query_words.intersection(important_words[intent]))
-                    score += word_overlap * 2
-                
-                intent_scores[intent] = score
-            
-            if intent_scores:
-                top_intent = max(intent_scores.items(), key=lambda x: x[1])
-                return top_intent[0], top_intent[1]
-            return 'none', 0
+            return self.intent_detector.detect(query)
         except Exception as e:
-            print(f"Error in detect_intent: {e}")
+            log.error("Error in detect_intent: %s", e)
             return 'none', 0
-    
-    def calculate_simple_similarity(self, query, product_texts):
-        """Calculate simple text similarity without heavy dependencies"""
-        if not product_texts:
-            return []
-        
-        processed_query = self.preprocess_text(query).split()
-        similarities = []
-        
-        for text in product_texts:
-            processed_text = self.preprocess_text(text).split()
-            
-            # Calculate Jaccard similarity
-            query_words = set(processed_query)
-            text_words = set(processed_text)
-            
-            if not query_words or not text_words:
-                similarities.append(0)
-                continue
-                
-            intersection = len(query_words.intersection(text_words))
-            union = len(query_words.union(text_words))
-            similarity = intersection / union if union > 0 else 0
-            similarities.append(similarity)
-        
-        return similarities
 
 # Initialize AI Search Engine
 ai_engine = AISearchEngine()
 
-# �� **Route principale pour analyser un avis et mettre à jour eco_rating**
+def index_catalog_change(change):
+    """Catalog subscriber: attach the prebuilt artifact when it matches a full reload, else re-index"""
+    artifact = current_artifact()
+    if change["full"] and artifact is not None and artifact.matches(change["upserted"], ai_engine.index.keywords):
+        ai_engine.index.attach(artifact, change["upserted"], change["version"])
+        log.info("💾 Search index attached from %s", artifact.path)
+    else:
+        ai_engine.index.apply_change(change)
+
+catalog.subscribe(index_catalog_change)
+
+# ⚡ Cache des résultats de /ai-search (LRU + TTL, lié à la version du catalogue)
+search_cache = QueryCache()
+query_keys = QueryCache(max_entries=SEARCH_CACHE_SIZE * 4)
+
+# 🧮 Colonnes catégorie / prix / eco_rating alignées sur l'index, masques de filtres en cache (voir filters.py)
+catalog_filters = CatalogFilters(catalog)
+catalog.subscribe(catalog_filters.on_catalog_change)
+
+# 🔤 Index de préfixes de /suggest (termes, catégories, marques, noms), patché en arrière-plan (voir suggest.py)
+suggester = Suggester(catalog, ai_engine.scorer)
+catalog.subscribe(suggester.on_catalog_change)
+
+# 🔡 Dictionnaire de suppressions du vocabulaire : mots mal orthographiés corrigés avant le scoring (voir fuzzy.py)
+term_corrector = TermCorrector(ai_engine.scorer, known_word=nlp_resources.is_dictionary_word)
+catalog.subscribe(term_corrector.on_catalog_change)
+
+# 📬 File d'avis : journal SQLite + workers en arrière-plan
+review_queue = ReviewQueue(
+    on_updated=lambda updated: catalog.patch_products({product_id: {'eco_rating': float(rating)} for product_id, rating in updated.items()})
+)
+
+# 🔥 Warmup : ressources NLP, catalogue, index et matrice de scoring chargés hors du chemin des requêtes
+warmup = nlp_resources.Warmup([
+    ("nltk", lambda: (nlp_resources.stop_words(), nlp_resources.lemmatizer())),
+    ("sentiment", nlp_resources.sentiment_engine),
+    ("catalog", catalog.products),
+    ("search_index", ai_engine.scorer.state),
+    ("suggest", suggester.ensure_index),
+    ("fuzzy", term_corrector.ensure_index)
+])
+
+# 🧵 Threads d'arrière-plan : démarrés à l'import, ou après le fork de chaque worker gunicorn (voir wsgi.py)
+def start_background():
+    """Catalog NOTIFY listener (snapshot rafraîchi par TTL / invalidate / NOTIFY), review workers, warmup"""
+    start_listener()
+    review_queue.start()
+    warmup.configure()
+
+if os.getenv("BACKGROUND_AUTOSTART", "1") == "1":
+    start_background()
+
+# 📬 **Route principale pour analyser un avis : mise en file, eco_rating mis à jour par les workers (voir review_queue.py)**
 @app.route("/analyze_review", methods=["POST"])
 def analyze_review():
     try:
-        data = request.json
-        product_id = data.get("product_id", 0)
-        review_text = data.get("review", "")
-
-        print(f"📌 Avis reçu : {review_text} pour le produit {product_id}")
-
-        # 🔹 Analyse NLP avec TextBlob
-        analysis = TextBlob(review_text)
-        polarity = analysis.sentiment.polarity
-        print(f"�� Score de sentiment : {polarity}")
-
-        # 🔹 Connexion à PostgreSQL
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        # 🔹 Vérifier si le produit existe
-        cursor.execute('SELECT id, eco_rating FROM "Products" WHERE id = %s;', (product_id,))
-        product = cursor.fetchone()
-
-        if not product:
-            print(f"❌ ERREUR : Le produit {product_id} n'existe pas dans la base de données.")
-            return jsonify({"error": "Produit non trouvé"}), 404
-
-        # �� Exécuter la mise à jour du eco_rating
-        if polarity > 0.1:  # Avis positif
-            cursor.execute('UPDATE "Products" SET eco_rating = eco_rating + 1 WHERE id = %s AND eco_rating < 5;', (product_id,))
-            connection.commit()
-            cursor.execute('SELECT eco_rating FROM "Products" WHERE id = %s;', (product_id,))
-            updated_value = cursor.fetchone()
-            print(f"✅ eco_rating augmenté pour le produit {product_id}. Nouvelle valeur : {updated_value}")
-
-        elif polarity < -0.1:  # Avis négatif
-            cursor.execute('UPDATE "Products" SET eco_rating = eco_rating - 1 WHERE id = %s AND eco_rating > 1;', (product_id,))
-            connection.commit()
-            cursor.execute('SELECT eco_rating FROM "Products" WHERE id = %s;', (product_id,))
-            updated_value = cursor.fetchone()
-            print(f"✅ eco_rating diminué pour le produit {product_id}. Nouvelle valeur : {updated_value}")
-        else:
-            print(f"ℹ️ Aucun changement de eco_rating pour le produit {product_id}")
+        data = request.get_json(silent=True) or {}
+        reviews, rejected = parse_reviews([data])
+        if not reviews:
+            return jsonify({"error": rejected[0]["error"]}), 400
 
-        cursor.close()
-        connection.close()
+        product_id, review_text = reviews[0]
+        log.sampled(logging.INFO, "📌 Avis reçu : %s pour le produit %s", review_text, product_id)
 
+        job_id = review_queue.enqueue(product_id, review_text)
         return jsonify({
-            "message": "Analyse réussie",
+            "message": "Avis en cours d'analyse",
             "review": review_text,
-            "sentiment": polarity
+            "job_id": job_id,
+            "status_url": f"/analyze_review/{job_id}"
+        }), 202
+
+    except Exception as e:
+        log.exception("❌ Erreur serveur : %s", e)
+        return jsonify({"error": str(e)}), 500
+
+# 📬 **Statut d'un avis mis en file**
+@app.route("/analyze_review/<job_id>", methods=["GET"])
+def analyze_review_status(job_id):
+    job = review_queue.status(job_id)
+    if job is None:
+        return jsonify({"error": "Job introuvable"}), 404
+    return jsonify(job), 200
+
+# 📬 **Statistiques de la file d'avis**
+@app.route("/analyze_review/stats", methods=["GET"])
+def analyze_review_stats():
+    return jsonify(review_queue.stats())
+
+# 📝 **Analyse d'avis par lots : sentiment de tous les avis, un seul UPDATE pour tous les produits**
+@app.route("/analyze_reviews", methods=["POST"])
+def analyze_reviews():
+    try:
+        data = request.get_json(silent=True) or {}
+        reviews, rejected = parse_reviews(data.get("reviews"))
+        if not reviews:
+            return jsonify({"error": "Aucun avis valide", "rejected": rejected}), 400
+
+        log.sampled(logging.INFO, "📌 Lot de %d avis reçu (%d rejetés)", len(reviews), len(rejected))
+
+        with db.connection() as connection:
+            results, updated, missing = analyze_batch(connection, reviews)
+
+        catalog.patch_products({product_id: {'eco_rating': float(rating)} for product_id, rating in updated.items()})
+        log.sampled(logging.INFO, "✅ eco_rating mis à jour pour %d produits, %d introuvables", len(updated), len(missing))
+
+        return jsonify({
+            "message": "Analyse réussie",
+            "results": results,
+            "updated": [{"product_id": product_id, "eco_rating": rating} for product_id, rating in updated.items()],
+            "not_found": missing,
+            "rejected": rejected
         }), 200
 
     except Exception as e:
-        print(f"❌ Erreur serveur : {e}")
+        log.exception("❌ Erreur serveur : %s", e)
+        return jsonify({"error": str(e)}), 500
+
+# 🔥 **Readiness : 200 une fois le warmup terminé, 503 avant (lance le warmup en mode lazy)**
+@app.route("/ready", methods=["GET"])
+def ready():
+    if not warmup.is_ready():
+        warmup.start()
+        return jsonify(warmup.status()), 503
+    return jsonify(warmup.status()), 200
+
+# 🔌 **Statistiques du pool de connexions PostgreSQL**
+@app.route("/db/stats", methods=["GET"])
+def db_stats():
+    return jsonify(db.pool.stats())
+
+# 🗂️ **Invalider le snapshot du catalogue (tout, ou seulement certains produits) : jeton d'administration requis (voir admin_auth.py)**
+@app.route("/catalog/invalidate", methods=["POST"])
+@admin_required
+def invalidate_catalog():
+    try:
+        data = request.get_json(silent=True) or {}
+        product_ids = data.get("product_ids")
+        catalog.invalidate(product_ids)
+        return jsonify({"message": "Catalogue rafraîchi", **catalog.stats()}), 200
+    except Exception as e:
+        log.exception("❌ Catalog invalidate error: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+# 📦 **Import en masse d'un CSV de produits, lu en flux : chaque lot est upserté puis appliqué à l'index (voir catalog_import.py)**
+# Écrit dans "Products" : jeton d'administration requis (voir admin_auth.py)
+@app.route("/catalog/import", methods=["POST"])
+@admin_required
+def import_catalog():
+    try:
+        upload = request.files.get("file")
+        stream = io.TextIOWrapper(upload.stream if upload is not None else request.stream, encoding="utf-8-sig", newline="")
+        chunk_size = request.args.get("chunk_size", CATALOG_IMPORT_CHUNK_SIZE, type=int)
+        # Matrice de scoring mise à jour après chaque lot plutôt qu'à la première recherche qui suit
+        stats = import_csv(stream, max(1, chunk_size), after_chunk=ai_engine.scorer.state)
+        return jsonify({"message": "Import terminé", **stats, **catalog.stats()}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        log.exception("❌ Catalog import error: %s", e)
         return jsonify({"error": str(e)}), 500
 
+# ⚡ **Statistiques du cache de recherche**
+@app.route("/ai-search/cache/stats", methods=["GET"])
+def search_cache_stats():
+    return jsonify({"results": search_cache.stats(), "query_keys": query_keys.stats(), "lemmas": lemma_cache_stats(ai_engine.lemmatize), "catalog_version": catalog.version})
+
 # 🤖 **Advanced AI-Powered Search with Real NLP**
+SEARCH_MODES = {"ai": "ai_powered", "bm25": "bm25"}
+
+PAGINATION_ARGS = ("offset", "limit", "cursor", "category", "min_price", "max_price", "min_eco_rating")
+
+def search_response(payload, timer, mode, cache, debug_timing):
+    """JSON response of /ai-search; records the stage timings (and returns them inline with debug_timing=1)"""
+    with timer.stage("serialization"):
+        response = jsonify(payload)
+    timer.record(SEARCH_STAGE_SECONDS, mode=mode)
+    SEARCH_REQUESTS.inc(mode=mode, cache=cache)
+    if debug_timing:
+        response = jsonify({**payload, "timing": {"cache": cache, "stages_ms": timer.breakdown_ms()}})
+    return response
+
 @app.route("/ai-search", methods=["GET"])
 def ai_search():
     try:
@@ -259,146 +363,144 @@ def ai_search():
         if not query:
             return jsonify({"results": []})
 
-        print(f"🤖 AI Search: Processing query '{query}'")
+        # ai (défaut) : intention + mots-clés + Jaccard ; bm25 : classement BM25 seul
+        mode = request.args.get("mode", "ai").lower()
+        if mode not in SEARCH_MODES:
+            return jsonify({"error": f"mode must be one of {', '.join(SEARCH_MODES)}", "results": []}), 400
 
-        # Get all products
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        cursor.execute('SELECT id, name, description, category, price, eco_rating FROM "Products"')
-        products = cursor.fetchall()
-        cursor.close()
-        connection.close()
+        # 🧮 Filtres (category, min_price, max_price, min_eco_rating) et page (offset/limit ou cursor)
+        try:
+            filters = SearchFilters.from_args(request.args)
+            page = Page.from_args(request.args, mode)
+        except ValueError as e:
+            return jsonify({"error": str(e), "results": []}), 400
+        paginated = any(name in request.args for name in PAGINATION_ARGS)
+
+        # ⏱️ Durée de chaque étape -> nlp_search_stage_seconds ; debug_timing=1 la renvoie dans la réponse
+        timer = StageTimer()
+        debug_timing = request.args.get("debug_timing") == "1"
+        log.debug("🤖 AI Search: Processing query '%s'", query)
 
-        if not products:
+        # Get all products from the in-memory catalog snapshot
+        with timer.stage("db_fetch"):
+            product_data = catalog.products()
+        if not product_data:
             return jsonify({"results": []})
 
-        # Prepare product data
-        product_data = []
-        product_texts = []
-        
-        for product in products:
-            product_id, name, description, category, price, eco_rating = product
-            product_text = f"{name} {description} {category}"
-            product_data.append({
-                'id': product_id,
-                'name': name,
-                'description': description or "",
-                'category': category or "",
-                'price': float(price) if price else 0.0,
-                'eco_rating': float(eco_rating) if eco_rating else 0.0
-            })
-            product_texts.append(product_text)
-
-        # 1. Intent Detection
-        detected_intent, intent_confidence = ai_engine.detect_intent(query)
-        print(f"�� Detected intent: {detected_intent} (confidence: {intent_confidence})")
-
-        # 2. Simple Text Similarity
-        semantic_scores = ai_engine.calculate_simple_similarity(query, product_texts)
-
-        # 3. Advanced Product Scoring
-        results = []
-        for i, product in enumerate(product_data):
-            total_score = 0
-            score_breakdown = {}
-            
-            # 1. Intent-based scoring (70% weight) - Primary factor
-            if detected_intent != 'none' and intent_confidence > 0:
-                intent_score = 0
-                product_text = f"{product['name']} {product['description']} {product['category']}".lower()
-                
-                if detected_intent == 'facial_care' and any(word in product_text for word in ['soap', 'savon', 'face', 'facial', 'skin', 'hygiene', 'cleanser', 'moisturizer']):
-                    intent_score = 10
-                elif detected_intent == 'hair_care' and any(word in product_text for word in ['hair', 'cheveux', 'brush', 'brosse', 'shampoo', 'bamboo']):
-                    intent_score = 10
-                elif detected_intent == 'oral_care' and any(word in product_text for word in ['teeth', 'dents', 'tooth', 'dent', 'toothbrush']):
-                    intent_score = 8
-                elif detected_intent == 'kitchen' and any(word in product_text for word in ['kitchen', 'cuisine', 'utensil', 'cup', 'bottle']):
-                    intent_score = 8
-                elif detected_intent == 'bathroom' and any(word in product_text for word in ['soap', 'savon', 'towel', 'hygiene']):
-                    intent_score = 8
-                elif detected_intent == 'eco_friendly' and any(word in product_text for word in ['bamboo', 'bambou', 'eco', 'green', 'natural', 'organic']):
-                    intent_score = 10
-                elif detected_intent == 'materials' and any(word in product_text for word in ['wood', 'glass', 'metal', 'cotton', 'bamboo']):
-                    intent_score = 6
-                elif detected_intent == 'cleaning' and any(word in product_text for word in ['soap', 'savon', 'clean', 'wash']):
-                    intent_score = 7
-                
-                total_score += intent_score * 7.0  # 70% weight
-                score_breakdown['intent'] = intent_score * 7.0
-            else:
-                # If no intent detected, use semantic similarity
-                semantic_score = semantic_scores[i] if i < len(semantic_scores) else 0
-                total_score += semantic_score * 7.0  # 70% weight
-                score_breakdown['semantic'] = semantic_score * 7.0
-            
-            # 2. Direct keyword matching (20% weight)
-            query_words = set(ai_engine.preprocess_text(query).split())
-            product_words = set(ai_engine.preprocess_text(f"{product['name']} {product['description']} {product['category']}").split())
-            
-            keyword_overlap = len(query_words.intersection(product_words))
-            keyword_score = keyword_overlap * 2
-            total_score += keyword_score * 2.0  # 20% weight
-            score_breakdown['keywords'] = keyword_score * 2.0
-            
-            # 3. Semantic Similarity (10% weight) - Reduced weight
-            semantic_score = semantic_scores[i] if i < len(semantic_scores) else 0
-            total_score += semantic_score * 1.0  # 10% weight
-            score_breakdown['semantic'] = score_breakdown.get('semantic', 0) + semantic_score * 1.0
-            
-            # Filter out completely irrelevant products based on intent
-            is_relevant = True
-            if detected_intent != 'none' and intent_confidence > 0:
-                product_text = f"{product['name']} {product['description']} {product['category']}".lower()
-                
-                # For facial care, only include products that are actually for facial care
-                if detected_intent == 'facial_care':
-                    facial_keywords = ['soap', 'savon', 'face', 'facial', 'skin', 'hygiene', 'cleanser', 'moisturizer', 'wash', 'clean']
-                    is_relevant = any(keyword in product_text for keyword in facial_keywords)
-                elif detected_intent == 'hair_care':
-                    hair_keywords = ['hair', 'cheveux', 'brush', 'brosse', 'shampoo', 'comb', 'peigne', 'bamboo']
-                    is_relevant = any(keyword in product_text for keyword in hair_keywords)
-                elif detected_intent == 'oral_care':
-                    oral_keywords = ['teeth', 'dents', 'tooth', 'dent', 'toothbrush', 'toothpaste', 'dental']
-                    is_relevant = any(keyword in product_text for keyword in oral_keywords)
-                elif detected_intent == 'kitchen':
-                    kitchen_keywords = ['kitchen', 'cuisine', 'utensil', 'cup', 'bottle', 'plate', 'cook']
-                    is_relevant = any(keyword in product_text for keyword in kitchen_keywords)
-                elif detected_intent == 'bathroom':
-                    bathroom_keywords = ['bathroom', 'soap', 'savon', 'towel', 'hygiene', 'wash', 'clean']
-                    is_relevant = any(keyword in product_text for keyword in bathroom_keywords)
-            
-            # Only include products with some relevance and that match the intent
-            if total_score > 0 and is_relevant:
-                result = {
+        version = catalog.version
+
+        # ⚡ Clé normalisée (mots prétraités + intention) ; une requête déjà vue saute aussi ces deux étapes
+        normalized_query = query.lower()
+        with timer.stage("cache_lookup"):
+            cache_key = query_keys.get(normalized_query)
+        if cache_key is None:
+            # 1. Intent Detection
+            with timer.stage("detect_intent"):
+                detected_intent, intent_confidence = ai_engine.detect_intent(query)
+            # 2. Query preprocessed once; product tokens come from the index
+            with timer.stage("preprocess"):
+                query_words = set(ai_engine.preprocess_text(query).split())
+            cache_key = (tuple(sorted(query_words)), detected_intent, intent_confidence)
+            query_keys.put(normalized_query, cache_key)
+
+        result_key = (mode,) + cache_key + (filters, page, paginated)
+        with timer.stage("cache_lookup"):
+            cached_payload = search_cache.get(result_key, version)
+        if cached_payload is not None:
+            log.debug("⚡ AI Search cache hit for '%s'", query)
+            return search_response(cached_payload, timer, mode, "hit", debug_timing)
+
+        words, detected_intent, intent_confidence = cache_key
+        query_words = set(words)
+        log.debug("🧠 Detected intent: %s (confidence: %s)", detected_intent, intent_confidence)
+
+        intent_active = detected_intent != 'none' and intent_confidence > 0
+        if not len(ai_engine.index):
+            with timer.stage("index_build"):
+                ai_engine.index.build(product_data, catalog.version)
+
+        # 🔡 Mots absents de l'index remplacés par le terme connu le plus proche ("bambo" -> "bamboo")
+        with timer.stage("spelling"):
+            corrections = term_corrector.corrections(query_words, ai_engine.scorer.state().vocabulary)
+            query_words = {corrections.get(word, word) for word in query_words}
+
+        # Masque des filtres pour l'état de scoring utilisé (None sans filtre)
+        row_filter = lambda state: catalog_filters.mask(state, filters)
+        # Un résultat de plus que la page : s'il existe, la page suivante aussi
+        k = page.limit + 1
+        if mode == "bm25":
+            # 3. BM25 over the index (tf, document lengths and IDF precomputed per index version)
+            with timer.stage("similarity"):
+                scores = ai_engine.scorer.bm25(query_words, row_filter=row_filter)
+            with timer.stage("scoring"):
+                bm25_ranked = ai_engine.scorer.bm25_results(scores, k=k, offset=page.offset, after=page.cursor)
+                best = bm25_ranked[0][1] if bm25_ranked else 0
+                ranked = [(product_id, score, {'bm25': score}, round(score / best, 3)) for product_id, score in bm25_ranked]
+        else:
+            # 3. Vectorized scoring over the whole catalog (intent 70%, keywords 20%, semantic 10%)
+            with timer.stage("similarity"):
+                scores = ai_engine.scorer.score(query_words, detected_intent, intent_active, row_filter=row_filter)
+            with timer.stage("scoring"):
+                ranked = ai_engine.scorer.results(scores, k=k, offset=page.offset, after=page.cursor)
+        has_more, ranked = len(ranked) > page.limit, ranked[:page.limit]
+
+        with timer.stage("scoring"):
+            results = []
+            for product_id, total_score, score_breakdown, semantic_score in ranked:
+                product = catalog.get(product_id)
+                if product is None:
+                    continue
+                results.append({
                     "id": product['id'],
                     "name": product['name'],
                     "description": product['description'],
                     "category": product['category'],
                     "price": product['price'],
                     "score": round(total_score, 2),
-                    "ai_confidence": round(semantic_score, 3),
+                    "ai_confidence": semantic_score,
                     "detected_intent": detected_intent,
                     "intent_confidence": intent_confidence,
-                    "search_method": "ai_powered",
+                    "search_method": SEARCH_MODES[mode],
                     "score_breakdown": score_breakdown
-                }
-                results.append(result)
+                })
 
-        # Sort by total score (highest first) and limit results
-        results.sort(key=lambda x: x['score'], reverse=True)
-        results = results[:10]  # Limit to top 10 results
+        payload = {"results": results}
+        if corrections:
+            payload["corrections"] = corrections
+        if paginated:
+            # Curseur = (score de tri, id) du dernier résultat : score arrondi en mode ai, exact en bm25
+            next_cursor = None
+            if has_more and ranked:
+                last_id, last_score = ranked[-1][0], ranked[-1][1]
+                next_cursor = encode_cursor(mode, round(last_score, 2) if mode == "ai" else last_score, last_id)
+            payload["page"] = {"offset": page.offset, "limit": page.limit, "count": len(results), "next_cursor": next_cursor}
 
-        print(f"✅ AI Search: Found {len(results)} results with intent '{detected_intent}'")
-        print(f"🔍 Top results: {[r['name'] for r in results[:3]]}")
-        return jsonify({"results": results})
+        # Scoré sur l'état précédent (mise à jour en cours dans un autre thread) : servi, mais pas mis en cache
+        # sous la nouvelle version du catalogue
+        if scores["state"].version == version:
+            search_cache.put(result_key, payload, version)
+        log.sampled(logging.INFO, "✅ AI Search '%s': %d results with intent '%s', top %s",
+                    query, len(results), detected_intent, [r['name'] for r in results[:3]])
+        return search_response(payload, timer, mode, "miss", debug_timing)
 
     except Exception as e:
-        print(f"❌ AI Search Error: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("❌ AI Search Error: %s", e)
         return jsonify({"results": []})
 
+# 🔤 **Autocomplétion : termes, catégories, marques et produits commençant par q (sans prétraitement NLP)**
+@app.route("/suggest", methods=["GET"])
+def suggest():
+    query = request.args.get("q", "")
+    try:
+        limit = int(request.args.get("limit", SUGGEST_LIMIT))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= SUGGEST_MAX_LIMIT:
+        return jsonify({"error": f"limit must be between 1 and {SUGGEST_MAX_LIMIT}", "suggestions": [], "products": []}), 400
+    if not query.strip():
+        return jsonify({"query": query, "suggestions": [], "products": []})
+    return jsonify({"query": query, **suggester.suggest(query, limit)})
+
 # 📌 Lancer le serveur Flask
 if __name__ == "__main__":
     app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
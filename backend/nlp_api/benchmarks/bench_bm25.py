@@ -0,0 +1,134 @@
+"""
+⏱️ Benchmark : classement BM25 (/ai-search?mode=bm25) vs scorer actuel
+(intention + mots-clés + Jaccard), en latence et en qualité.
+
+Usage (depuis backend/nlp_api) :
+    python benchmarks/bench_bm25.py --repeat 50
+    python benchmarks/bench_bm25.py --csv ../scripts/products_bulk.csv
+
+Chaque requête du jeu étiqueté a pour produits pertinents ceux d'une marque
+ou d'une catégorie du CSV. Les deux modes sont évalués sur le même index
+avec precision@10, nDCG@10 et MRR, puis chronométrés (µs/requête, sans le
+cache de résultats).
+"""
+import argparse
+import csv
+import math
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, HERE)
+os.environ.setdefault("CATALOG_LISTEN", "0")
+os.environ.setdefault("BACKGROUND_AUTOSTART", "0")
+
+from app import AISearchEngine  # noqa: E402
+
+DEFAULT_CSV = os.path.join(os.path.dirname(HERE), "scripts", "products_bulk.csv")
+K = 10
+
+# (requête, colonne du CSV, valeur) : pertinent = produit dont la colonne vaut la valeur
+LABELLED_QUERIES = [
+    ("veja", "brand", "Veja"),
+    ("fairphone", "brand", "Fairphone"),
+    ("green toys", "brand", "Green Toys"),
+    ("vanmoof", "brand", "VanMoof"),
+    ("pilot", "brand", "Pilot"),
+    ("patagonia", "brand", "Patagonia"),
+    ("back market", "brand", "Back Market"),
+    ("produits lima", "brand", "Lima"),
+    ("cuisine alimentation", "category", "Cuisine & Alimentation"),
+    ("produits de cuisine", "category", "Cuisine & Alimentation"),
+    ("beauté hygiène", "category", "Beauté & Hygiène"),
+    ("mode accessoires", "category", "Mode & Accessoires"),
+    ("maison déco", "category", "Maison & Déco"),
+    ("technologie responsable", "category", "Technologie Responsable"),
+    ("sport bien-être", "category", "Sport & Bien-être"),
+    ("mobilité verte", "category", "Mobilité Verte"),
+    ("jardin plein air", "category", "Jardin & Plein air"),
+    ("enfants bébés", "category", "Enfants & Bébés"),
+    ("papeterie bureau", "category", "Papeterie & Bureau"),
+    ("something for the kitchen", "category", "Cuisine & Alimentation"),
+]
+
+
+def load_catalog(path):
+    products, rows = [], []
+    with open(path, encoding='utf-8') as f:
+        for product_id, row in enumerate(csv.DictReader(f), 1):
+            rows.append(row)
+            products.append({
+                'id': product_id,
+                'name': row['name'],
+                'description': row['description'] or "",
+                'category': row['category'] or "",
+                'price': float(row['price'] or 0),
+                'eco_rating': float(row['eco_rating'] or 0)
+            })
+    return products, rows
+
+
+def rank_ai(engine, query):
+    detected_intent, intent_confidence = engine.detect_intent(query)
+    query_words = set(engine.preprocess_text(query).split())
+    intent_active = detected_intent != 'none' and intent_confidence > 0
+    scores = engine.scorer.score(query_words, detected_intent, intent_active)
+    return [product_id for product_id, _, _, _ in engine.scorer.results(scores, k=K)]
+
+
+def rank_bm25(engine, query):
+    query_words = set(engine.preprocess_text(query).split())
+    return [product_id for product_id, _ in engine.scorer.bm25_results(engine.scorer.bm25(query_words), k=K)]
+
+
+def quality(ranked, relevant):
+    """(precision@K, nDCG@K, reciprocal rank)"""
+    hits = [1 if product_id in relevant else 0 for product_id in ranked[:K]]
+    precision = sum(hits) / K
+    dcg = sum(hit / math.log2(position + 2) for position, hit in enumerate(hits))
+    ideal = sum(1 / math.log2(position + 2) for position in range(min(K, len(relevant))))
+    ndcg = dcg / ideal if ideal else 0.0
+    reciprocal_rank = next((1 / (position + 1) for position, hit in enumerate(hits) if hit), 0.0)
+    return precision, ndcg, reciprocal_rank
+
+
+def time_per_query(rank, engine, queries, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            rank(engine, query)
+    return (time.perf_counter() - start) / (repeat * len(queries))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=DEFAULT_CSV, help="products CSV (name, description, category, brand columns)")
+    parser.add_argument("--repeat", type=int, default=20, help="passes over the query set for timing")
+    parser.add_argument("--verbose", action="store_true", help="print per-query metrics")
+    args = parser.parse_args()
+
+    products, rows = load_catalog(args.csv)
+    engine = AISearchEngine()
+    engine.index.build(products, version=1)
+    engine.scorer.state()
+
+    queries = [query for query, _, _ in LABELLED_QUERIES]
+    modes = {"ai": rank_ai, "bm25": rank_bm25}
+    print(f"{len(products)} products, {len(LABELLED_QUERIES)} labelled queries, metrics @{K}")
+    print(f"{'mode':6} {'P@10':>7} {'nDCG@10':>8} {'MRR':>7} {'µs/query':>10}")
+    for mode, rank in modes.items():
+        totals = [0.0, 0.0, 0.0]
+        for query, column, value in LABELLED_QUERIES:
+            relevant = {product['id'] for product, row in zip(products, rows) if row.get(column) == value}
+            metrics = quality(rank(engine, query), relevant)
+            totals = [total + metric for total, metric in zip(totals, metrics)]
+            if args.verbose:
+                print(f"   {mode:5} {query!r:32} P={metrics[0]:.2f} nDCG={metrics[1]:.2f} RR={metrics[2]:.2f}")
+        precision, ndcg, mrr = (total / len(LABELLED_QUERIES) for total in totals)
+        latency = time_per_query(rank, engine, queries, args.repeat)
+        print(f"{mode:6} {precision:7.3f} {ndcg:8.3f} {mrr:7.3f} {latency * 1e6:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
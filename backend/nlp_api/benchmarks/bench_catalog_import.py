@@ -0,0 +1,199 @@
+"""
+⏱️ Benchmark : import en masse du catalogue par lots (catalog_import.py).
+
+Usage (depuis backend/nlp_api) :
+    python benchmarks/bench_catalog_import.py --products 20000 --rows 20000 --chunk-size 2000
+    python benchmarks/bench_catalog_import.py --database-url postgresql://... --rows 100000
+
+Sur un catalogue synthétique (mêmes générateurs que bench_suite.py, base
+SQLite temporaire), un CSV de --rows lignes au format de
+scripts/products_bulk.csv (--update-share de produits existants, le reste
+nouveaux) est lu en flux par lots. Mesure :
+    - la mémoire Python maximale de la lecture du CSV (tracemalloc) ;
+    - par lot, la mise à jour incrémentale côté service : snapshot + index
+      de recherche, matrice de scoring (patch_state), modèle de contenu ;
+    - par lot, ce qu'elle remplace : build_state et ContentModel.fit sur
+      tout le catalogue ;
+    - la latence de /ai-search pendant l'import, comparée au service au repos.
+Vérifie à la fin que la matrice patchée est identique à build_state.
+
+Sans PostgreSQL, l'upsert est simulé (les noms existants gardent leur id,
+les autres reçoivent le suivant). Avec --database-url, l'import réel
+(COPY, UPDATE, INSERT, NOTIFY) est d'abord chronométré dans cette base, qui
+doit déjà avoir la table "Products".
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from bench_suite import (DEFAULT_CSV, QUERIES, create_database, load_template, measure,  # noqa: E402
+                         sqlite_product_loader, synthetic_products)
+
+CSV_COLUMNS = ["name", "description", "price", "category", "eco_rating", "image_url", "brand", "certifications", "tags", "source_url"]
+
+
+def write_import_csv(path, existing, rows, update_share, template, seed=0):
+    """CSV of rows lines: update_share of them rename-free updates of existing products, the others new"""
+    rng = random.Random(seed + 4)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+        for position, (_, name, description, category, price, eco_rating) in enumerate(
+                synthetic_products(rows, template, seed + 5)):
+            if rng.random() < update_share:
+                product = rng.choice(existing)
+                name, description, category = product["name"], product["description"] + " Nouvelle édition.", product["category"]
+            else:
+                name = f"{name} Import {position}"
+            writer.writerow([name, description, price, category, eco_rating, "", name.split(" - ")[0], "", "", ""])
+
+
+def parse_peak_kib(path, chunk_size):
+    """Peak Python memory while streaming the whole CSV through read_chunks"""
+    from catalog_import import read_chunks
+
+    tracemalloc.start()
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        for _ in read_chunks(f, chunk_size):
+            pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=20000, help="catalog size before the import")
+    parser.add_argument("--rows", type=int, default=20000, help="CSV rows to import")
+    parser.add_argument("--update-share", type=float, default=0.2, help="share of rows updating existing products")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="rows per chunk (CATALOG_IMPORT_CHUNK_SIZE)")
+    parser.add_argument("--full-rebuilds", type=int, default=2, help="chunks also measured with a full rebuild")
+    parser.add_argument("--database-url", help="also time the real import into this PostgreSQL database")
+    parser.add_argument("--csv", default=DEFAULT_CSV)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ.setdefault("CATALOG_LISTEN", "0")
+    os.environ.setdefault("BACKGROUND_AUTOSTART", "0")
+    os.environ.setdefault("CATALOG_TTL_SECONDS", "0")
+    workdir = tempfile.mkdtemp(prefix="nlp_bench_")
+    os.environ.setdefault("SEARCH_ARTIFACT_DIR", os.path.join(workdir, "index_artifact"))
+    database = os.path.join(workdir, "bench.sqlite3")
+    template = load_template(args.csv)
+    create_database(database, args.products, 0, 1, template, args.seed)
+
+    import app
+    import recommend
+    from catalog import catalog
+    from catalog_import import CatalogImporter, read_chunks
+    from scoring import build_state
+    from similarity import ContentModel
+
+    catalog.loader = sqlite_product_loader(database)
+    start = time.perf_counter()
+    products = catalog.products()
+    app.ai_engine.scorer.state()
+    recommend.content_model.ensure_model()
+    print(f"🧠 {len(products)} products indexed in {time.perf_counter() - start:.1f}s")
+
+    import_csv = os.path.join(workdir, "import.csv")
+    write_import_csv(import_csv, products, args.rows, args.update_share, template, args.seed)
+    print(f"📄 {args.rows} rows, CSV parsed in chunks of {args.chunk_size} with a peak of "
+          f"{parse_peak_kib(import_csv, args.chunk_size):,.0f} KiB")
+
+    # 0. Import réel dans PostgreSQL (optionnel) : COPY + UPDATE + INSERT + NOTIFY, sans le service
+    if args.database_url:
+        import psycopg2
+        connection = psycopg2.connect(args.database_url)
+        try:
+            with open(import_csv, encoding="utf-8-sig", newline="") as f:
+                stats = CatalogImporter(connection, snapshot=None).run(f, args.chunk_size)
+            print(f"🐘 PostgreSQL: {args.rows / stats['seconds']:,.0f} rows/s")
+        finally:
+            connection.close()
+
+    # Upsert simulé : un nom existant garde son id
+    ids_by_name = {product["name"]: product["id"] for product in products}
+    next_id = max(ids_by_name.values()) + 1
+
+    def upserted(rows):
+        nonlocal next_id
+        chunk = []
+        for row in rows:
+            if row["name"] not in ids_by_name:
+                ids_by_name[row["name"]] = next_id
+                next_id += 1
+            chunk.append({"id": ids_by_name[row["name"]], "name": row["name"], "description": row["description"],
+                          "category": row["category"], "price": row["price"], "eco_rating": row["eco_rating"]})
+        return chunk
+
+    # 1. Latence de /ai-search au repos, puis pendant l'import
+    client = app.app.test_client()
+    rng = random.Random(args.seed + 6)
+    queries = [(rng.choice(QUERIES),) for _ in range(200)]
+
+    def ai_search(query):
+        app.search_cache.clear()
+        response = client.get('/ai-search', query_string={'q': query})
+        if response.status_code != 200:
+            raise RuntimeError(f"/ai-search returned {response.status_code}")
+
+    idle = measure(ai_search, queries)
+    during, importing = [], threading.Event()
+    importing.set()
+
+    def search_during_import():
+        while importing.is_set():
+            during.append(measure(ai_search, queries[:20], warmup=0)["latency_ms"]["p95"])
+
+    searcher = threading.Thread(target=search_during_import, daemon=True)
+    searcher.start()
+
+    # 2. Mise à jour incrémentale par lot, comparée à une reconstruction complète
+    incremental, rebuilds = [], []
+    content_model = recommend.content_model
+    with open(import_csv, encoding="utf-8-sig", newline="") as f:
+        for position, (rows, _) in enumerate(read_chunks(f, args.chunk_size)):
+            chunk = upserted(rows)
+            start = time.perf_counter()
+            version = catalog.apply_changes(chunk)
+            app.ai_engine.scorer.state()
+            # Le modèle de contenu est mis à jour par son thread : on attend qu'il ait rattrapé ce lot
+            while content_model.model.version < version:
+                time.sleep(0.001)
+            incremental.append(time.perf_counter() - start)
+
+            if position < args.full_rebuilds:
+                start = time.perf_counter()
+                build_state(app.ai_engine.index)
+                ContentModel.fit(catalog.products(), version, content_model.k)
+                rebuilds.append(time.perf_counter() - start)
+    importing.clear()
+    searcher.join()
+
+    print(f"📦 {len(incremental)} chunks applied incrementally: mean {sum(incremental) / len(incremental) * 1000:.0f} ms/chunk, "
+          f"{args.rows / sum(incremental):,.0f} rows/s")
+    if rebuilds:
+        print(f"🔁 full rebuild (scoring matrix + content model): mean {sum(rebuilds) / len(rebuilds) * 1000:.0f} ms/chunk")
+    print(f"🔎 /ai-search p95 idle {idle['latency_ms']['p95']:.2f} ms, during import {max(during, default=0.0):.2f} ms (worst of {len(during)} runs)")
+
+    patched = app.ai_engine.scorer.state()
+    rebuilt = build_state(app.ai_engine.index)
+    identical = (patched.ids.tolist() == rebuilt.ids.tolist()
+                 and abs(patched.matrix[:, [patched.vocabulary[t] for t in rebuilt.vocabulary]] - rebuilt.matrix).sum() == 0)
+    print(f"✅ patched scoring matrix identical to a rebuild: {identical}")
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
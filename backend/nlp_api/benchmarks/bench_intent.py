@@ -0,0 +1,147 @@
+"""
+⏱️ Microbenchmark : détection d'intention compilée vs ancienne boucle re.findall.
+
+Usage (depuis backend/nlp_api) :
+    python benchmarks/bench_intent.py --repeat 200
+
+Vérifie d'abord que les deux implémentations donnent exactement les mêmes
+(intent, score) sur tout le corpus, puis mesure le temps moyen par requête.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("CATALOG_LISTEN", "0")
+os.environ.setdefault("BACKGROUND_AUTOSTART", "0")
+
+from app import AISearchEngine  # noqa: E402
+
+QUERIES = [
+    # English
+    "what can i use for my face",
+    "something for my face",
+    "i need a gentle face cleanser",
+    "looking for a moisturizer for dry skin",
+    "bamboo hair brush",
+    "natural shampoo for my hair",
+    "something for my hair",
+    "bamboo toothbrush",
+    "toothpaste without plastic",
+    "oral hygiene products",
+    "kitchen items",
+    "something for the kitchen",
+    "reusable bottles",
+    "metal straws for cooking",
+    "glass cup",
+    "eco-friendly soap",
+    "something eco-friendly",
+    "sustainable cotton bags",
+    "organic cotton towel",
+    "wood utensils",
+    "ceramic plate",
+    "need something to clean the bathroom",
+    "yoga mat",
+    "candle",
+    "gift for a friend",
+    # Français
+    "que puis-je utiliser pour mon visage",
+    "quelque chose pour mon visage",
+    "savon naturel pour le visage",
+    "brosse à cheveux en bambou",
+    "quelque chose pour mes cheveux",
+    "brosse à dents en bambou",
+    "dentifrice solide",
+    "hygiène buccale",
+    "quelque chose pour la cuisine",
+    "ustensiles de cuisine en bois",
+    "paille en inox réutilisable",
+    "bouteille en verre",
+    "serviette de bain en coton",
+    "produits écologiques pour la salle de bain",
+    "quelque chose d'écologique",
+    "nettoyant biodégradable",
+    "tasse en céramique",
+    "sac en tissu",
+    "bougie naturelle",
+]
+
+
+def legacy_detect_intent(engine, query):
+    """Intent detection as it was implemented before IntentDetector"""
+    try:
+        query_lower = query.lower()
+        intent_scores = {}
+
+        for intent, patterns in engine.intent_patterns.items():
+            score = 0
+            for pattern in patterns:
+                matches = re.findall(pattern, query_lower, re.IGNORECASE)
+                score += len(matches) * 3
+
+            # Additional scoring based on word importance
+            query_words = set(engine.preprocess_text(query).split())
+            important_words = {
+                'facial_care': {'face', 'facial', 'skin', 'soap', 'cleanser', 'moisturizer', 'hygiene', 'care', 'use', 'my'},
+                'hair_care': {'hair', 'shampoo', 'brush', 'comb', 'care'},
+                'oral_care': {'teeth', 'tooth', 'brush', 'toothpaste', 'dental', 'oral', 'hygiene'},
+                'kitchen': {'kitchen', 'cook', 'utensil', 'plate', 'cup', 'bottle'},
+                'bathroom': {'bathroom', 'soap', 'towel', 'hygiene', 'clean'},
+                'eco_friendly': {'eco', 'green', 'sustainable', 'bamboo', 'natural', 'organic'},
+                'materials': {'wood', 'glass', 'metal', 'cotton', 'bamboo', 'ceramic'},
+                'cleaning': {'clean', 'soap', 'wash', 'hygiene'}
+            }
+
+            if intent in important_words:
+                word_overlap = len(query_words.intersection(important_words[intent]))
+                score += word_overlap * 2
+
+            intent_scores[intent] = score
+
+        if intent_scores:
+            top_intent = max(intent_scores.items(), key=lambda x: x[1])
+            return top_intent[0], top_intent[1]
+        return 'none', 0
+    except Exception as e:
+        print(f"Error in detect_intent: {e}")
+        return 'none', 0
+
+
+def time_per_query(detect, queries, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            detect(query)
+    return (time.perf_counter() - start) / (repeat * len(queries))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=100, help="passes over the query corpus")
+    args = parser.parse_args()
+
+    engine = AISearchEngine()
+
+    mismatches = []
+    for query in QUERIES:
+        expected = legacy_detect_intent(engine, query)
+        actual = engine.detect_intent(query)
+        if tuple(expected) != tuple(actual):
+            mismatches.append((query, expected, actual))
+    if mismatches:
+        for query, expected, actual in mismatches:
+            print(f"❌ {query!r}: legacy={expected} compiled={actual}")
+        sys.exit(1)
+    print(f"✅ Identical results on {len(QUERIES)} queries")
+
+    legacy = time_per_query(lambda q: legacy_detect_intent(engine, q), QUERIES, args.repeat)
+    compiled = time_per_query(engine.detect_intent, QUERIES, args.repeat)
+    print(f"legacy   : {legacy * 1e6:8.1f} µs/query")
+    print(f"compiled : {compiled * 1e6:8.1f} µs/query")
+    print(f"speedup  : {legacy / compiled:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+⏱️ Microbenchmark : preprocess_text (tokenisation rapide + cache des lemmes) vs
+ancienne version word_tokenize + WordNetLemmatizer.
+
+Usage (depuis backend/nlp_api) :
+    python benchmarks/bench_preprocess.py --repeat 5
+    python benchmarks/bench_preprocess.py --csv ../scripts/products_bulk.csv
+
+Vérifie d'abord que les deux versions donnent exactement la même sortie sur
+tous les textes du CSV (name, description, category et texte indexé), puis
+mesure le temps moyen par texte.
+"""
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, HERE)
+os.environ.setdefault("CATALOG_LISTEN", "0")
+os.environ.setdefault("BACKGROUND_AUTOSTART", "0")
+
+from nltk.tokenize import word_tokenize  # noqa: E402
+
+from app import AISearchEngine  # noqa: E402
+from search_index import product_text  # noqa: E402
+from text_preprocessing import lemma_cache_stats  # noqa: E402
+
+DEFAULT_CSV = os.path.join(os.path.dirname(HERE), "scripts", "products_bulk.csv")
+
+
+def legacy_preprocess_text(engine, text):
+    """AISearchEngine.preprocess_text before the fast tokenizer and the lemma cache"""
+    if not text:
+        return ""
+
+    text = re.sub(r'[^a-zA-Z\s]', ' ', text.lower())
+
+    try:
+        tokens = word_tokenize(text)
+        tokens = [engine.lemmatizer.lemmatize(token) for token in tokens]
+        tokens = [token for token in tokens if token not in engine.stop_words and len(token) > 2]
+        return ' '.join(tokens)
+    except:
+        return text
+
+
+def load_texts(path):
+    texts = []
+    with open(path, encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            texts.extend([row.get('name'), row.get('description'), row.get('category')])
+            texts.append(product_text(row))
+    return texts
+
+
+def time_per_text(preprocess, texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            preprocess(text)
+    return (time.perf_counter() - start) / (repeat * len(texts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=DEFAULT_CSV, help="products CSV (name, description, category columns)")
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the corpus")
+    args = parser.parse_args()
+
+    engine = AISearchEngine()
+    texts = load_texts(args.csv)
+
+    mismatches = []
+    for text in texts:
+        expected = legacy_preprocess_text(engine, text)
+        actual = engine.preprocess_text(text)
+        if expected != actual:
+            mismatches.append((text, expected, actual))
+    if mismatches:
+        for text, expected, actual in mismatches[:20]:
+            print(f"❌ {text!r}:\n   legacy={expected!r}\n   fast  ={actual!r}")
+        print(f"{len(mismatches)} mismatches")
+        sys.exit(1)
+    print(f"✅ Identical output on {len(texts)} texts")
+
+    legacy = time_per_text(lambda text: legacy_preprocess_text(engine, text), texts, args.repeat)
+    fast = time_per_text(engine.preprocess_text, texts, args.repeat)
+    print(f"legacy : {legacy * 1e6:8.1f} µs/text")
+    print(f"fast   : {fast * 1e6:8.1f} µs/text")
+    print(f"speedup: {legacy / fast:8.1f}x")
+    print(f"lemma cache: {lemma_cache_stats(engine.lemmatize)}")
+
+
+if __name__ == "__main__":
+    main()
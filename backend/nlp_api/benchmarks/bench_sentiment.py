@@ -0,0 +1,145 @@
+"""
+⏱️ Benchmark : moteur de sentiment par lots (sentiment.py) vs TextBlob.
+
+Usage (depuis backend/nlp_api) :
+    python benchmarks/bench_sentiment.py --reviews 20000 --batch 200
+
+Génère un corpus d'avis synthétiques anglais et français (mots des lexiques,
+adverbes, négations, "!", émoticônes), vérifie d'abord que chaque polarité
+reste à moins de SENTIMENT_TOLERANCE de TextBlob (textblob-fr pour les avis
+français, s'il est installé) et que le signe retenu par /analyze_review
+(+1 / -1 / 0) est le même, puis mesure les avis/seconde de TextBlob, du
+moteur avis par avis et du moteur par lots.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reviews import rating_change  # noqa: E402
+from sentiment import SENTIMENT_TOLERANCE, SentimentEngine  # noqa: E402
+
+TEMPLATES = {
+    "en": [
+        "{adverb} {word} {noun}",
+        "this {noun} is {adverb} {word}",
+        "the {noun} was not {word}, {adverb} {word} though!",
+        "i would never buy this {noun} again, {word} {emoticon}",
+        "{word} {noun}. {adverb} {word} but the {noun} is not {adverb} {word}...",
+        "it's {word} and {word}!! {emoticon}",
+        "don't like it, {word} {noun}",
+        "no {word} at all (!)",
+    ],
+    "fr": [
+        "{adverb} {word}, le {noun} est {word}",
+        "ce {noun} est {adverb} {word} !",
+        "le {noun} n'est pas {word}, mais {adverb} {word}",
+        "je ne recommande pas ce {noun}, {word} {emoticon}",
+        "{word} et {word}. la {noun} est sans {word}...",
+        "c'est {word} !! {emoticon}",
+        "vraiment pas {word}, jamais {adverb} {word}",
+        "aucun {word} (!)",
+    ],
+}
+
+NOUNS = {
+    "en": ["product", "bottle", "toothbrush", "bag", "soap", "delivery", "quality", "price"],
+    "fr": ["produit", "gourde", "brosse", "sac", "savon", "livraison", "qualité", "prix"],
+}
+ADVERBS = {
+    "en": ["very", "really", "extremely", "too", "quite", "so", "truly"],
+    "fr": ["très", "vraiment", "trop", "assez", "complètement", "tellement", "plutôt"],
+}
+EMOTICONS = [":)", ":-(", ":D", ";)", ":/", "<3", ""]
+
+
+def synthetic_reviews(engine, count, seed=0):
+    """[(language, text)], half English, half French (French only if its lexicon is loaded)"""
+    rng = random.Random(seed)
+    words = {}
+    for language, tables in engine.tables.items():
+        vocabulary = sorted(engine.vocabulary, key=engine.vocabulary.get)
+        words[language] = [word for word, known in zip(vocabulary, tables.known) if known and word.isalpha()]
+    languages = sorted(words)
+    reviews = []
+    for position in range(count):
+        language = languages[position % len(languages)]
+        template = rng.choice(TEMPLATES[language])
+        text = template
+        while "{" in text:
+            text = (text.replace("{word}", rng.choice(words[language]), 1)
+                        .replace("{adverb}", rng.choice(ADVERBS[language]), 1)
+                        .replace("{noun}", rng.choice(NOUNS[language]), 1)
+                        .replace("{emoticon}", rng.choice(EMOTICONS), 1))
+        reviews.append((language, text[0].upper() + text[1:]))
+    return reviews
+
+
+def reference_scorers():
+    """{language: text -> TextBlob polarity} for the installed TextBlob analyzers"""
+    from textblob import TextBlob
+    scorers = {"en": lambda text: TextBlob(text).sentiment.polarity}
+    try:
+        from textblob_fr import PatternAnalyzer, PatternTagger
+        tagger, analyzer = PatternTagger(), PatternAnalyzer()
+        scorers["fr"] = lambda text: TextBlob(text, pos_tagger=tagger, analyzer=analyzer).sentiment[0]
+    except ImportError:
+        print("⚠️ textblob-fr not installed: French reviews are not compared")
+    return scorers
+
+
+def reviews_per_second(score, texts):
+    start = time.perf_counter()
+    score(texts)
+    return len(texts) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=20000, help="synthetic reviews in the corpus")
+    parser.add_argument("--batch", type=int, default=200, help="batch size of the batched engine (REVIEW_BATCH_SIZE)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    engine = SentimentEngine.load()
+    reviews = synthetic_reviews(engine, args.reviews, args.seed)
+    scorers = reference_scorers()
+
+    # 1. Accord avec TextBlob, avis par avis, dans la langue du lexique utilisé
+    texts = [text for _, text in reviews]
+    polarities = engine.polarities(texts)
+    compared, worst, sign_changes = 0, 0.0, []
+    for (language, text), polarity in zip(reviews, polarities):
+        if language not in scorers:
+            continue
+        expected = scorers[language](text)
+        compared += 1
+        worst = max(worst, abs(expected - polarity))
+        if rating_change(expected) != rating_change(polarity):
+            sign_changes.append((text, expected, polarity))
+    print(f"🔎 {compared} reviews compared to TextBlob: max |Δ| = {worst:.4f}, rating change differs on {len(sign_changes)}")
+    for text, expected, polarity in sign_changes[:10]:
+        print(f"   {text!r}: textblob={expected:.3f} engine={polarity:.3f}")
+    if worst > SENTIMENT_TOLERANCE:
+        sys.exit(1)
+
+    # 2. Débit
+    english = [text for language, text in reviews if language == "en"]
+    results = {
+        "textblob (en)": reviews_per_second(lambda batch: [scorers["en"](text) for text in batch], english),
+        "engine, one review at a time": reviews_per_second(lambda batch: [engine.polarity(text) for text in batch], texts),
+        f"engine, batches of {args.batch}": reviews_per_second(
+            lambda batch: [engine.polarities(batch[i:i + args.batch]) for i in range(0, len(batch), args.batch)], texts),
+    }
+    if "fr" in scorers:
+        french = [text for language, text in reviews if language == "fr"]
+        results["textblob-fr (fr)"] = reviews_per_second(lambda batch: [scorers["fr"](text) for text in batch], french)
+    for name, rate in results.items():
+        print(f"   {name:<32} {rate:>10,.0f} reviews/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+"""
+⏱️ Suite de benchmarks / test de charge des services NLP sur catalogues synthétiques.
+
+Usage (depuis backend/nlp_api) :
+    python benchmarks/bench_suite.py --sizes 500,5000,50000 --output bench.json
+    python benchmarks/bench_suite.py --sizes 500000 --threads 4 --operations detect_intent,ai_search
+    python benchmarks/bench_suite.py --compare bench_v1.json --output bench_v2.json
+
+Pour chaque taille, un catalogue synthétique calqué sur
+scripts/products_bulk.csv (marques, catégories, certifications, tags) et une
+table d'interactions (popularité en loi de puissance) sont générés dans une
+base SQLite temporaire, qui remplace PostgreSQL : le snapshot du catalogue
+et l'InteractionStore sont branchés dessus via leurs loaders.
+
+Chaque taille tourne dans un sous-processus neuf (modules, caches et pic
+mémoire indépendants). Sont mesurés : le temps de mise en route (catalogue,
+index, modèle de contenu, interactions), puis pour detect_intent,
+preprocess_text, /ai-search (sans cache, avec cache, mode bm25),
+recommend_similar_products et recommend_for_user : débit, latences
+(moyenne, p50, p90, p95, p99, max) et pic de mémoire résidente (RSS).
+
+Le résultat est un JSON ; --compare signale les opérations dont le p95 a
+régressé de plus de --tolerance par rapport à un fichier précédent (code
+de sortie 1).
+
+Seuls les modèles nécessaires aux opérations choisies (--operations) sont
+construits : la table des voisins TF-IDF est quadratique en nombre de
+produits (environ 2 min 30 à 50 000 produits sur un cœur).
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, HERE)
+
+DEFAULT_CSV = os.path.join(os.path.dirname(HERE), "scripts", "products_bulk.csv")
+DEFAULT_SIZES = "500,5000,50000"
+
+# Requêtes type (FR/EN), mêmes familles que bench_intent.py
+QUERIES = [
+    "something for my face", "natural shampoo for my hair", "bamboo toothbrush",
+    "something for the kitchen", "reusable bottles", "organic cotton towel",
+    "eco-friendly soap", "glass cup", "yoga mat", "gift for a friend",
+    "quelque chose pour mon visage", "brosse à dents en bambou", "ustensiles de cuisine en bois",
+    "bouteille en verre", "produits écologiques pour la salle de bain", "sac en tissu",
+    "veja", "fairphone", "mode accessoires", "technologie responsable",
+]
+
+# Phrases ajoutées aux descriptions pour varier le vocabulaire (mots-clés des intentions inclus)
+PHRASES = [
+    "bamboo toothbrush", "natural shampoo bar", "organic cotton towel", "glass water bottle",
+    "stainless steel straw", "wooden kitchen utensil", "ceramic plate", "facial cleanser",
+    "moisturizer for dry skin", "biodegradable cleaning spray", "reusable shopping bag",
+    "hair brush", "solid toothpaste", "recycled materials", "plastic free packaging",
+    "soap for the bathroom", "compost friendly", "vegan leather", "solar charger", "yoga mat",
+]
+
+INTERACTION_TYPES = ["view", "view", "view", "like", "purchase"]
+
+
+# 🔹 Génération des données synthétiques
+def load_template(path):
+    """Brands by category, certifications and tags observed in the reference CSV"""
+    brands, certifications, tags = {}, set(), set()
+    with open(path, encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            brands.setdefault(row['category'], set()).add(row['brand'])
+            certifications.update(filter(None, (row['certifications'] or "").split(';')))
+            tags.update(filter(None, (row['tags'] or "").split(';')))
+    return {category: sorted(names) for category, names in brands.items()}, sorted(certifications), sorted(tags)
+
+
+def synthetic_products(count, template, seed=0):
+    """count product rows (id, name, description, category, price, eco_rating)"""
+    brands, certifications, tags = template
+    categories = sorted(brands)
+    rng = random.Random(seed)
+    for product_id in range(1, count + 1):
+        category = rng.choice(categories)
+        brand = rng.choice(brands[category])
+        extras = ", ".join(rng.sample(PHRASES, 2) + rng.sample(tags, 2) + rng.sample(certifications, 1))
+        description = (f"Produit écoresponsable de la catégorie {category.lower()} fabriqué par {brand}. "
+                       f"Durable, de haute qualité et respectueux de l'environnement. {extras}.")
+        yield (product_id, f"{brand} - Produit {rng.randint(1000, 99999)}", description, category,
+               round(rng.uniform(3, 300), 2), round(rng.uniform(3.5, 5.0), 1))
+
+
+def synthetic_interactions(count, products, users, seed=0):
+    """count interaction rows (user_id, product_id, interaction_type), popular products first"""
+    rng = random.Random(seed + 1)
+    for _ in range(count):
+        # Loi de puissance : quelques produits concentrent la plupart des interactions
+        product_id = min(products, int(products ** rng.random()))
+        yield rng.randint(1, users), product_id, rng.choice(INTERACTION_TYPES)
+
+
+def create_database(path, products, interactions, users, template, seed=0):
+    """SQLite stand-in with the "Products" and "UserInteractions" columns used by the services"""
+    connection = sqlite3.connect(path)
+    try:
+        connection.executescript('''
+            CREATE TABLE "Products" (id INTEGER PRIMARY KEY, name TEXT NOT NULL, description TEXT,
+                                     category TEXT NOT NULL, price REAL NOT NULL, eco_rating REAL NOT NULL);
+            CREATE TABLE "UserInteractions" (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL,
+                                             product_id INTEGER NOT NULL, interaction_type TEXT NOT NULL);
+        ''')
+        connection.executemany('INSERT INTO "Products" VALUES (?, ?, ?, ?, ?, ?)', synthetic_products(products, template, seed))
+        connection.executemany(
+            'INSERT INTO "UserInteractions" (user_id, product_id, interaction_type) VALUES (?, ?, ?)',
+            synthetic_interactions(interactions, products, users, seed)
+        )
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def sqlite_product_loader(path):
+    """Catalog loader(product_ids=None) reading the SQLite stand-in"""
+    from catalog import normalize_product
+
+    def load(product_ids=None):
+        with sqlite3.connect(path) as connection:
+            if product_ids is None:
+                rows = connection.execute('SELECT id, name, description, category, price, eco_rating FROM "Products" ORDER BY id')
+            else:
+                product_ids = list(product_ids)
+                rows = connection.execute(
+                    f'SELECT id, name, description, category, price, eco_rating FROM "Products" '
+                    f'WHERE id IN ({",".join("?" * len(product_ids))}) ORDER BY id', product_ids
+                )
+            return [normalize_product(row) for row in rows]
+    return load
+
+
+def sqlite_interaction_fetcher(path):
+    """InteractionStore fetch_since(last_id, limit) reading the SQLite stand-in"""
+    def fetch_since(last_id, limit):
+        with sqlite3.connect(path) as connection:
+            return connection.execute(
+                'SELECT id, user_id, product_id, interaction_type FROM "UserInteractions" WHERE id > ? ORDER BY id LIMIT ?',
+                (last_id, limit)
+            ).fetchall()
+    return fetch_since
+
+
+# 🔹 Mesures
+def peak_rss_mb():
+    """Peak resident memory of this process (None where unavailable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux : Ko, macOS : octets
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    position = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[position]
+
+
+def measure(operation, arguments, threads=1, warmup=5):
+    """Run operation(*args) for every args in arguments; throughput, latency percentiles (ms), peak RSS"""
+    for args in arguments[:warmup]:
+        operation(*args)
+
+    latencies = []
+    lock = threading.Lock()
+
+    def timed(args):
+        start = time.perf_counter()
+        operation(*args)
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+
+    start = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(timed, arguments))
+    else:
+        for args in arguments:
+            timed(args)
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "calls": len(latencies),
+        "threads": threads,
+        "throughput_per_s": round(len(latencies) / wall, 1) if wall else None,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies) * 1000, 4) if latencies else 0.0,
+            "p50": round(percentile(latencies, 0.50) * 1000, 4),
+            "p90": round(percentile(latencies, 0.90) * 1000, 4),
+            "p95": round(percentile(latencies, 0.95) * 1000, 4),
+            "p99": round(percentile(latencies, 0.99) * 1000, 4),
+            "max": round(latencies[-1] * 1000, 4) if latencies else 0.0,
+        },
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def timed_step(steps, name, function):
+    start = time.perf_counter()
+    result = function()
+    steps[name] = round(time.perf_counter() - start, 3)
+    return result
+
+
+# 🔹 Une taille de catalogue (sous-processus)
+def run_size(size, args):
+    """Generate the data, start the services on it and measure every operation"""
+    os.environ.setdefault("CATALOG_LISTEN", "0")
+    os.environ.setdefault("BACKGROUND_AUTOSTART", "0")
+    os.environ.setdefault("CATALOG_TTL_SECONDS", "0")
+
+    users = max(50, int(size * args.users_per_product))
+    interactions = int(size * args.interactions_per_product)
+    workdir = tempfile.mkdtemp(prefix="nlp_bench_")
+    os.environ.setdefault("SEARCH_ARTIFACT_DIR", os.path.join(workdir, "index_artifact"))
+    # Pas de table matérialisée : recommend_for_user mesure le calcul en ligne (voir bench_user_recommendations.py)
+    os.environ.setdefault("USER_RECS_DIR", os.path.join(workdir, "user_recommendations"))
+    database = os.path.join(workdir, "bench.sqlite3")
+
+    setup = {}
+    timed_step(setup, "generate_data", lambda: create_database(
+        database, size, interactions, users, load_template(args.csv), args.seed))
+
+    import app
+    import recommend
+    from catalog import catalog
+    from search_index import product_text
+
+    catalog.loader = sqlite_product_loader(database)
+    recommend.interaction_store.fetch_since = sqlite_interaction_fetcher(database)
+
+    engine = app.ai_engine
+    # Le chargement publie le snapshot : l'index de recherche est construit par l'abonné
+    products = timed_step(setup, "load_catalog_and_index", catalog.products)
+    timed_step(setup, "build_scoring_state", engine.scorer.state)
+
+    rng = random.Random(args.seed + 2)
+    calls = args.calls
+    queries = [(rng.choice(QUERIES),) for _ in range(calls)]
+    texts = [(product_text(rng.choice(products)),) for _ in range(calls)]
+    product_ids = [(rng.randint(1, size), 5) for _ in range(calls)]
+    user_ids = [(rng.randint(1, users), 5) for _ in range(calls)]
+    client = app.app.test_client()
+
+    def ai_search(query, mode="ai"):
+        response = client.get('/ai-search', query_string={'q': query, 'mode': mode})
+        if response.status_code != 200:
+            raise RuntimeError(f"/ai-search returned {response.status_code}")
+
+    def ai_search_uncached(query, mode="ai"):
+        app.search_cache.clear()
+        app.query_keys.clear()
+        ai_search(query, mode)
+
+    operations = {
+        "detect_intent": (engine.detect_intent, queries),
+        "preprocess_text": (engine.preprocess_text, texts),
+        "ai_search": (ai_search_uncached, queries),
+        "ai_search_cached": (ai_search, queries),
+        "ai_search_bm25": (lambda query: ai_search_uncached(query, "bm25"), queries),
+        "recommend_similar_products": (recommend.recommend_similar_products, product_ids),
+        "recommend_for_user": (recommend.recommend_for_user, user_ids),
+    }
+    selected = args.operations.split(",") if args.operations else list(operations)
+    unknown = set(selected) - set(operations)
+    if unknown:
+        raise SystemExit(f"Unknown operations: {', '.join(sorted(unknown))}")
+
+    # Modèles de recommandation construits seulement s'ils sont mesurés (TF-IDF top-k en O(N²))
+    if "recommend_similar_products" in selected or "recommend_for_user" in selected:
+        timed_step(setup, "fit_content_model", recommend.content_model.ensure_model)
+    if "recommend_for_user" in selected:
+        timed_step(setup, "load_interactions", recommend.interaction_store.catch_up)
+    setup_peak_rss_mb = peak_rss_mb()
+
+    results = {}
+    for name in selected:
+        operation, arguments = operations[name]
+        results[name] = measure(operation, arguments, threads=args.threads)
+        print(f"   {size:>7} {name:28} p50={results[name]['latency_ms']['p50']:9.3f} ms "
+              f"p95={results[name]['latency_ms']['p95']:9.3f} ms {results[name]['throughput_per_s']:>9} ops/s",
+              file=sys.stderr)
+
+    recommend.interaction_store.stop()
+    return {
+        "products": size,
+        "users": users,
+        "interactions": interactions,
+        "setup_seconds": setup,
+        "setup_peak_rss_mb": setup_peak_rss_mb,
+        "peak_rss_mb": peak_rss_mb(),
+        "operations": results,
+    }
+
+
+def run_size_subprocess(size, args):
+    """run_size in a fresh interpreter; its JSON goes through a temporary file"""
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        output = f.name
+    try:
+        command = [sys.executable, os.path.abspath(__file__), "--single-size", str(size), "--single-output", output]
+        for option in ("csv", "calls", "threads", "seed", "users_per_product", "interactions_per_product", "operations"):
+            value = getattr(args, option)
+            if value is not None:
+                command += [f"--{option.replace('_', '-')}", str(value)]
+        # Les logs des services (print) sont écartés, la progression passe par stderr
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        with open(output, encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        os.remove(output)
+
+
+# 🔹 Comparaison entre deux exécutions
+def regressions(previous, current, tolerance):
+    """[(products, operation, previous p95, current p95)] where p95 grew by more than tolerance"""
+    before = {(run["products"], name): result["latency_ms"]["p95"]
+              for run in previous["results"] for name, result in run["operations"].items()}
+    found = []
+    for run in current["results"]:
+        for name, result in run["operations"].items():
+            old = before.get((run["products"], name))
+            new = result["latency_ms"]["p95"]
+            if old and new > old * (1 + tolerance):
+                found.append((run["products"], name, old, new))
+    return found
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"comma-separated catalog sizes (default {DEFAULT_SIZES})")
+    parser.add_argument("--csv", default=DEFAULT_CSV, help="reference products CSV for brands, categories and tags")
+    parser.add_argument("--calls", type=int, default=500, help="measured calls per operation")
+    parser.add_argument("--threads", type=int, default=1, help="concurrent callers (load test)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--users-per-product", type=float, default=0.2)
+    parser.add_argument("--interactions-per-product", type=float, default=4.0)
+    parser.add_argument("--operations", help="comma-separated subset of operations to measure")
+    parser.add_argument("--output", help="write the JSON report to this file (default: stdout)")
+    parser.add_argument("--compare", help="previous JSON report: exit 1 if a p95 regressed")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 growth for --compare (0.2 = +20%%)")
+    parser.add_argument("--single-size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--single-output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single_size is not None:
+        result = run_size(args.single_size, args)
+        with open(args.single_output, "w", encoding='utf-8') as f:
+            json.dump(result, f)
+        return
+
+    report = {
+        "suite": "nlp_api",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {"calls": args.calls, "threads": args.threads, "seed": args.seed,
+                   "users_per_product": args.users_per_product,
+                   "interactions_per_product": args.interactions_per_product},
+        "results": [],
+    }
+    for size in (int(size) for size in args.sizes.split(",")):
+        print(f"⏱️ {size} products...", file=sys.stderr)
+        report["results"].append(run_size_subprocess(size, args))
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)
+        found = regressions(previous, report, args.tolerance)
+        for products, name, old, new in found:
+            print(f"❌ {name} @ {products} products: p95 {old:.3f} ms -> {new:.3f} ms", file=sys.stderr)
+        if found:
+            sys.exit(1)
+        print(f"✅ No p95 regression above {args.tolerance:.0%}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
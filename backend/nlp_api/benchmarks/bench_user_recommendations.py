@@ -0,0 +1,111 @@
+"""
+⏱️ Benchmark : recommandations par utilisateur matérialisées (user_recommendations.py).
+
+Usage (depuis backend/nlp_api) :
+    python benchmarks/bench_user_recommendations.py --products 5000 --users 20000 --workers 4
+
+Sur un catalogue et des interactions synthétiques (mêmes générateurs que
+bench_suite.py, base SQLite temporaire), mesure :
+    - l'ancien /recommend?user_id= (DataFrame de tout le catalogue, isin,
+      sample(5), puis filtrage collaboratif) ;
+    - le job de matérialisation avec 1 processus puis --workers processus ;
+    - la lecture dans la table et le calcul en ligne (utilisateurs absents).
+Vérifie aussi que le calcul en ligne redonne exactement la ligne matérialisée.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from bench_suite import (DEFAULT_CSV, create_database, load_template, measure,  # noqa: E402
+                         sqlite_interaction_fetcher, sqlite_product_loader)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--interactions", type=int, default=200000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="job processes (USER_RECS_WORKERS)")
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--csv", default=DEFAULT_CSV)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ.setdefault("CATALOG_LISTEN", "0")
+    os.environ.setdefault("BACKGROUND_AUTOSTART", "0")
+    os.environ.setdefault("CATALOG_TTL_SECONDS", "0")
+    workdir = tempfile.mkdtemp(prefix="nlp_bench_")
+    os.environ.setdefault("SEARCH_ARTIFACT_DIR", os.path.join(workdir, "index_artifact"))
+    database = os.path.join(workdir, "bench.sqlite3")
+    create_database(database, args.products, args.interactions, args.users, load_template(args.csv), args.seed)
+
+    import recommend
+    from catalog import catalog
+    from user_recommendations import BlendedScorer, UserRecommender, materialize, write_table
+
+    catalog.loader = sqlite_product_loader(database)
+    recommend.interaction_store.fetch_since = sqlite_interaction_fetcher(database)
+    start = time.perf_counter()
+    recommend.content_model.ensure_model()
+    recommend.interaction_store.catch_up()
+    print(f"🧠 Models ready in {time.perf_counter() - start:.1f}s")
+
+    scorer = BlendedScorer(recommend.cf_recommender.model, recommend.content_model.ensure_model())
+    user_rows = list(range(len(scorer.user_ids)))
+
+    # 1. Job : 1 processus, puis --workers
+    timings = {}
+    for workers in sorted({1, args.workers}):
+        start = time.perf_counter()
+        product_ids, scores = materialize(scorer, user_rows, workers=workers)
+        timings[workers] = time.perf_counter() - start
+        print(f"🗃️ {len(user_rows)} users materialized with {workers} process(es) in {timings[workers]:.2f}s "
+              f"({len(user_rows) / timings[workers]:,.0f} users/s)")
+    table_dir = os.path.join(workdir, "user_recommendations")
+    os.makedirs(table_dir)
+    write_table(table_dir, scorer.user_ids, product_ids, scores, {"top_n": product_ids.shape[1]})
+
+    # 2. Cohérence : le calcul en ligne redonne la ligne matérialisée
+    rng = random.Random(args.seed + 3)
+    sample = rng.sample(range(len(user_rows)), min(200, len(user_rows)))
+    store = recommend.interaction_store
+    mismatches = sum(
+        1 for row in sample
+        if scorer.recommend(store.history(int(scorer.user_ids[row])), product_ids.shape[1])
+        != [int(product_id) for product_id in product_ids[row] if product_id >= 0]
+    )
+    print(f"🔎 Online vs materialized on {len(sample)} users: {mismatches} mismatches")
+
+    # 3. Latence par requête
+    materialized = UserRecommender(store, recommend.cf_recommender, recommend.content_model, base_dir=table_dir)
+    online = UserRecommender(store, recommend.cf_recommender, recommend.content_model, base_dir=os.path.join(workdir, "none"))
+    user_ids = [(int(rng.choice(scorer.user_ids)),) for _ in range(args.calls)]
+
+    def legacy(user_id):
+        # Ancien /recommend?user_id= : échantillon aléatoire du catalogue + filtrage collaboratif
+        history = store.history(user_id)
+        products = recommend.get_products()
+        available = products[~products["id"].isin(list(history))]
+        sampled = available.sample(min(5, len(available))).to_dict(orient="records")
+        return sampled + recommend.cf_recommender.model.recommend(history, 3, {product["id"] for product in sampled})
+
+    results = {
+        "legacy (sample + collaborative)": measure(legacy, user_ids),
+        "materialized table lookup": measure(lambda user_id: materialized.recommend(user_id), user_ids),
+        "online blended score": measure(lambda user_id: online.recommend(user_id), user_ids),
+    }
+    for name, result in results.items():
+        print(f"   {name:<34} p50={result['latency_ms']['p50']:8.3f} ms p95={result['latency_ms']['p95']:8.3f} ms")
+    store.stop()
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""
+🗂️ Snapshot du catalogue produits partagé par les services NLP.
+
+Les produits sont chargés une fois par processus et gardés en mémoire. Le
+snapshot est rafraîchi quand son TTL expire, sur appel explicite de
+invalidate() (route /catalog/invalidate) ou sur un NOTIFY Postgres.
+
+Le trigger qui publie les modifications de "Products" sur le canal est
+installé (idempotent) par le listener à sa première connexion ; avec
+CATALOG_INSTALL_TRIGGER=0 (rôle sans droits DDL), l'installer à la main :
+    python catalog.py install-trigger
+
+Un import en masse (catalog_import.py) désactive le NOTIFY par ligne pour
+sa transaction (SET LOCAL catalog.bulk_import = 'on') et publie à la place
+un NOTIFY par lot : {"op": "UPSERT", "ids": [...], "origin": ...}. Le
+processus qui importe a déjà appliqué le lot et ignore sa propre origine.
+"""
+import json
+import os
+import select
+import sys
+import socket
+import threading
+import time
+
+import db
+from logger import get_logger
+
+CATALOG_TTL_SECONDS = float(os.getenv("CATALOG_TTL_SECONDS", "300"))
+CATALOG_NOTIFY_CHANNEL = os.getenv("CATALOG_NOTIFY_CHANNEL", "catalog_changed")
+CATALOG_INSTALL_TRIGGER = os.getenv("CATALOG_INSTALL_TRIGGER", "1") == "1"
+
+log = get_logger("catalog")
+
+PRODUCT_COLUMNS = ["id", "name", "description", "category", "price", "eco_rating"]
+
+# 🔹 Trigger qui publie chaque modification de "Products" sur le canal NOTIFY
+# (sauf pendant un import en masse, qui notifie par lot)
+NOTIFY_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION notify_catalog_changed() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('{channel}', json_build_object('op', TG_OP, 'id', OLD.id)::text);
+        RETURN OLD;
+    END IF;
+    IF current_setting('catalog.bulk_import', true) = 'on' THEN
+        RETURN NEW;
+    END IF;
+    PERFORM pg_notify('{channel}', json_build_object('op', TG_OP, 'id', NEW.id)::text);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS products_catalog_changed ON "Products";
+CREATE TRIGGER products_catalog_changed
+AFTER INSERT OR UPDATE OR DELETE ON "Products"
+FOR EACH ROW EXECUTE FUNCTION notify_catalog_changed();
+"""
+
+
+def normalize_product(row):
+    """Convert a raw (id, name, description, category, price, eco_rating) row into a product dict"""
+    product_id, name, description, category, price, eco_rating = row
+    return {
+        'id': product_id,
+        'name': name,
+        'description': description or "",
+        'category': category or "",
+        'price': float(price) if price else 0.0,
+        'eco_rating': float(eco_rating) if eco_rating else 0.0
+    }
+
+
+def fetch_products(connection, product_ids=None):
+    """Read products from PostgreSQL (all of them, or only product_ids)"""
+    cursor = connection.cursor()
+    try:
+        if product_ids is None:
+            cursor.execute('SELECT id, name, description, category, price, eco_rating FROM "Products" ORDER BY id')
+        else:
+            cursor.execute(
+                'SELECT id, name, description, category, price, eco_rating FROM "Products" WHERE id = ANY(%s) ORDER BY id',
+                (list(product_ids),)
+            )
+        return [normalize_product(row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def load_products(product_ids=None):
+    """Default snapshot loader: read products through the shared connection pool"""
+    with db.connection() as connection:
+        return fetch_products(connection, product_ids)
+
+
+def install_notify_trigger(connection, channel=CATALOG_NOTIFY_CHANNEL):
+    """Create the "Products" trigger that feeds the NOTIFY channel"""
+    cursor = connection.cursor()
+    try:
+        # Plusieurs workers démarrent en même temps : une installation à la fois
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext('install_notify_trigger'));")
+        cursor.execute(NOTIFY_TRIGGER_SQL.replace('{channel}', channel))
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+class CatalogSnapshot:
+    """Process-wide, in-memory copy of the "Products" table"""
+
+    def __init__(self, loader=None, ttl=CATALOG_TTL_SECONDS):
+        # loader(product_ids=None) -> list of normalized product dicts
+        self.loader = loader
+        self.ttl = ttl
+        self.version = 0
+        self.loaded_at = None
+        self._products = {}
+        self._ordered = None
+        self._listeners = []
+        self._lock = threading.RLock()
+
+    # 🔹 Lecture
+    def products(self):
+        """Return the current products as a tuple (loads or refreshes if needed)"""
+        self._ensure_fresh()
+        ordered = self._ordered
+        if ordered is None:
+            with self._lock:
+                if self._ordered is None:
+                    self._ordered = tuple(self._products.values())
+                ordered = self._ordered
+        return ordered
+
+    def get(self, product_id):
+        self._ensure_fresh()
+        return self._products.get(product_id)
+
+    def get_many(self, product_ids):
+        """Products for product_ids, in the given order (unknown ids are skipped)"""
+        self._ensure_fresh()
+        products = self._products
+        return [products[product_id] for product_id in product_ids if product_id in products]
+
+    def is_loaded(self):
+        return self.loaded_at is not None
+
+    def _ensure_fresh(self):
+        if self.loaded_at is None:
+            with self._lock:
+                if self.loaded_at is None:
+                    self.reload()
+            return
+
+        if self.ttl and time.monotonic() - self.loaded_at > self.ttl:
+            # Un seul thread recharge, les autres continuent de servir l'ancien snapshot
+            if self._lock.acquire(blocking=False):
+                try:
+                    self.reload()
+                except Exception as e:
+                    log.error("❌ Catalog refresh failed, serving stale snapshot: %s", e)
+                    self.loaded_at = time.monotonic()
+                finally:
+                    self._lock.release()
+
+    # 🔹 Abonnements (index de recherche, modèles de recommandation...)
+    def subscribe(self, callback):
+        """callback(change) with change = {version, full, upserted, removed}"""
+        self._listeners.append(callback)
+
+    def _publish(self, change):
+        for callback in list(self._listeners):
+            try:
+                callback(change)
+            except Exception as e:
+                log.exception("❌ Catalog listener error: %s", e)
+
+    # 🔹 Mises à jour
+    def reload(self):
+        """Reload the full catalog through the loader"""
+        if self.loader is None:
+            raise RuntimeError("Catalog loader is not configured")
+
+        rows = self.loader()
+        with self._lock:
+            self._products = {product['id']: product for product in rows}
+            self._ordered = None
+            self.version += 1
+            self.loaded_at = time.monotonic()
+            log.info("🗂️ Catalog loaded: %d products (version %d)", len(rows), self.version)
+            # Publié sous le verrou pour que les abonnés voient les changements dans l'ordre
+            self._publish({"version": self.version, "full": True, "upserted": list(self._products.values()), "removed": []})
+        return self.version
+
+    def apply_changes(self, upserted=(), removed=()):
+        """Apply already-normalized product rows and deletions to the snapshot"""
+        upserted = list(upserted)
+        with self._lock:
+            # Filtré sous le verrou : un reload concurrent ne peut pas changer self._products entre-temps
+            removed = [product_id for product_id in removed if product_id in self._products]
+            if not upserted and not removed:
+                return self.version
+
+            for product in upserted:
+                self._products[product['id']] = product
+            for product_id in removed:
+                self._products.pop(product_id, None)
+            self._ordered = None
+            self.version += 1
+            self._publish({"version": self.version, "full": False, "upserted": upserted, "removed": removed})
+        return self.version
+
+    def patch_products(self, fields_by_id):
+        """Update fields of products already in the snapshot, e.g. {id: {'eco_rating': 4.0}}"""
+        if self.loaded_at is None:
+            return self.version
+        with self._lock:
+            upserted = [dict(self._products[product_id], **fields)
+                        for product_id, fields in fields_by_id.items() if product_id in self._products]
+            return self.apply_changes(upserted)
+
+    def refresh_products(self, product_ids):
+        """Re-read only product_ids from the database"""
+        if self.loaded_at is None:
+            return self.reload()
+
+        product_ids = set(product_ids)
+        rows = self.loader(product_ids=product_ids)
+        found = {product['id'] for product in rows}
+        return self.apply_changes(rows, product_ids - found)
+
+    def invalidate(self, product_ids=None):
+        """Force a refresh, of the whole catalog or of some products"""
+        with self._lock:
+            if product_ids:
+                return self.refresh_products(product_ids)
+            return self.reload()
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "products": len(self._products),
+            "age_seconds": round(time.monotonic() - self.loaded_at, 3) if self.loaded_at is not None else None,
+            "ttl_seconds": self.ttl
+        }
+
+
+def notification_origin():
+    """Identifies this process in the batch NOTIFY payloads it sends"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def handle_notification(catalog, payload):
+    """Apply a catalog NOTIFY payload ('' means full reload)"""
+    try:
+        message = json.loads(payload) if payload else None
+    except ValueError:
+        message = None
+
+    if isinstance(message, dict) and isinstance(message.get('ids'), list):
+        # Lot d'un import en masse : déjà appliqué par le processus qui l'a envoyé
+        if message.get('origin') == notification_origin():
+            return catalog.version
+        return catalog.invalidate(message['ids']) if message['ids'] else catalog.version
+
+    if not isinstance(message, dict) or message.get('id') is None:
+        return catalog.invalidate()
+
+    if message.get('op') == 'DELETE':
+        return catalog.apply_changes(removed=[message['id']])
+    return catalog.invalidate([message['id']])
+
+
+class PgNotifyListener(threading.Thread):
+    """Background thread that LISTENs on the catalog channel"""
+
+    def __init__(self, catalog, connect, channel=CATALOG_NOTIFY_CHANNEL, poll_interval=5.0, retry_delay=30.0,
+                 install_trigger=CATALOG_INSTALL_TRIGGER):
+        super().__init__(name="catalog-notify-listener", daemon=True)
+        self.catalog = catalog
+        self.connect = connect
+        self.channel = channel
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.install_trigger = install_trigger
+        self._stop_event = threading.Event()
+
+    def _install_trigger(self, connection):
+        """Install the "Products" trigger once; without it, nothing is ever notified"""
+        try:
+            install_notify_trigger(connection, self.channel)
+            log.info("🔔 Catalog NOTIFY trigger installed on '%s'", self.channel)
+        except Exception as e:
+            log.warning("⚠️ Catalog NOTIFY trigger not installed (%s): run 'python catalog.py install-trigger'", e)
+        self.install_trigger = False
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            connection = None
+            try:
+                connection = self.connect()
+                if self.install_trigger:
+                    self._install_trigger(connection)
+                connection.autocommit = True
+                cursor = connection.cursor()
+                cursor.execute(f'LISTEN "{self.channel}";')
+                log.info("👂 Listening for catalog changes on '%s'", self.channel)
+
+                while not self._stop_event.is_set():
+                    if select.select([connection], [], [], self.poll_interval) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        notification = connection.notifies.pop(0)
+                        handle_notification(self.catalog, notification.payload)
+            except Exception as e:
+                log.error("❌ Catalog listener error: %s", e)
+                self._stop_event.wait(self.retry_delay)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+
+
+class LocalNotifier:
+    """In-process stand-in for PgNotifyListener (tests, no Postgres)"""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.sent = []
+
+    def notify(self, payload=""):
+        self.sent.append(payload)
+        return handle_notification(self.catalog, payload)
+
+
+# 🔹 Snapshot partagé par app.py et recommend.py
+catalog = CatalogSnapshot(loader=load_products)
+_listener = None
+
+
+def start_listener(connect=db.connect, channel=CATALOG_NOTIFY_CHANNEL):
+    """Start the NOTIFY listener for the shared snapshot (once per process)"""
+    global _listener
+    if _listener is None and os.getenv("CATALOG_LISTEN", "1") == "1":
+        _listener = PgNotifyListener(catalog, connect, channel)
+        _listener.start()
+    return _listener
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["install-trigger"]:
+        sys.exit("Usage: python catalog.py install-trigger")
+    connection = db.connect()
+    try:
+        install_notify_trigger(connection)
+        print(f"🔔 Catalog NOTIFY trigger installed on '{CATALOG_NOTIFY_CHANNEL}'")
+    finally:
+        connection.close()
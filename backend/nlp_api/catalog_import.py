@@ -0,0 +1,276 @@
+"""
+📦 Import en masse du catalogue depuis un CSV (products_bulk.csv et plus gros).
+
+Depuis backend/nlp_api :
+    python catalog_import.py ../scripts/products_bulk.csv [--chunk-size N]
+ou POST /catalog/import (corps = le CSV) sur le service de recherche, avec
+le jeton NLP_ADMIN_TOKEN en en-tête "Authorization: Bearer" (voir admin_auth.py).
+
+Mêmes règles que scripts/import-products.js : une ligne sans nom est
+ignorée ; un produit existant (même nom, et même marque si la ligne en a
+une) est mis à jour, sinon il est créé ; valeurs par défaut identiques ;
+les colonnes optionnelles (brand, certifications, tags, source_url,
+createdAt / updatedAt) ne sont écrites que si la table les a. Dans un même
+lot, la dernière ligne d'un produit l'emporte, y compris quand plusieurs
+lignes (avec et sans marque) désignent le même produit existant : aucune
+d'elles n'est alors créée. "views" n'est écrit qu'à la création.
+
+Le fichier est lu en flux, par lots de CATALOG_IMPORT_CHUNK_SIZE lignes :
+la mémoire de l'import ne dépend pas de la taille du fichier. Chaque lot
+est une transaction : COPY dans une table temporaire, les lignes qui
+désignent un produit existant dans une seconde, un UPDATE ... FROM pour ces
+produits et un INSERT ... SELECT pour les autres lignes, tous deux avec
+RETURNING. Le NOTIFY par ligne du trigger est désactivé pour la
+transaction (voir catalog.py), remplacé par un NOTIFY par lot avec les ids
+touchés : les autres processus ne relisent que ces produits.
+
+Après le commit, les lignes renvoyées sont appliquées au snapshot du
+catalogue (catalog.apply_changes) si ce processus l'a chargé : l'index de
+recherche, la matrice de scoring et le modèle de contenu sont mis à jour
+par lot, sans reconstruction complète, et le service continue de répondre
+pendant l'import.
+
+Variables d'environnement :
+    CATALOG_IMPORT_CHUNK_SIZE   lignes par lot / transaction (défaut 2000)
+    CATALOG_IMPORT_NAME_INDEX   1 = crée l'index sur "Products"(name) utilisé pour retrouver les produits existants (défaut 1)
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+
+import db
+from catalog import CATALOG_NOTIFY_CHANNEL, catalog, normalize_product, notification_origin
+from logger import get_logger
+
+CATALOG_IMPORT_CHUNK_SIZE = int(os.getenv("CATALOG_IMPORT_CHUNK_SIZE", "2000"))
+CATALOG_IMPORT_NAME_INDEX = os.getenv("CATALOG_IMPORT_NAME_INDEX", "1") == "1"
+
+REQUIRED_COLUMNS = ["name", "description", "price", "category", "eco_rating", "image_url", "views"]
+OPTIONAL_COLUMNS = ["brand", "certifications", "tags", "source_url"]
+STAGING_COLUMNS = ["position", "name", "description", "price", "category", "eco_rating", "image_url"] + OPTIONAL_COLUMNS
+
+# pg_notify refuse les charges de 8000 octets et plus
+NOTIFY_MAX_BYTES = 7900
+
+RETURNED_COLUMNS = 'p.id, p.name, p.description, p.category, p.price, p.eco_rating'
+
+log = get_logger("catalog_import")
+
+
+def parse_float(value, default):
+    try:
+        return float(value) if value not in (None, "") else default
+    except ValueError:
+        return default
+
+
+def staging_row(row):
+    """CSV row -> staging values with the import-products.js defaults, or None to skip"""
+    name = (row.get("name") or "").strip()
+    if not name:
+        return None
+    return {
+        "name": name,
+        "description": row.get("description") or "",
+        "price": parse_float(row.get("price"), 0.0),
+        "category": row.get("category") or "misc",
+        "eco_rating": parse_float(row.get("eco_rating"), 3.0),
+        "image_url": row.get("image_url") or "",
+        "brand": (row.get("brand") or "").strip() or None,
+        "certifications": row.get("certifications") or None,
+        "tags": row.get("tags") or None,
+        "source_url": row.get("source_url") or None,
+    }
+
+
+def read_chunks(stream, chunk_size=CATALOG_IMPORT_CHUNK_SIZE):
+    """Yield (rows, skipped) per chunk of a CSV text stream; rows deduplicated on (name, brand), last one wins"""
+    reader = csv.DictReader(stream)
+    if "name" not in (reader.fieldnames or []):
+        raise ValueError('CSV sans colonne "name"')
+    chunk, skipped = {}, 0
+    for row in reader:
+        values = staging_row(row)
+        if values is None:
+            skipped += 1
+        else:
+            key = (values["name"], values["brand"])
+            chunk.pop(key, None)
+            chunk[key] = values
+        if len(chunk) + skipped >= chunk_size:
+            yield list(chunk.values()), skipped
+            chunk, skipped = {}, 0
+    if chunk or skipped:
+        yield list(chunk.values()), skipped
+
+
+def notify_payloads(product_ids, origin):
+    """UPSERT NOTIFY payloads carrying product_ids, each under NOTIFY_MAX_BYTES"""
+    overhead = len(json.dumps({"op": "UPSERT", "ids": [], "origin": origin}))
+    payloads, ids, size = [], [], overhead
+    for product_id in product_ids:
+        # json.dumps sépare les ids par ", "
+        width = len(str(product_id)) + 2
+        if ids and size + width > NOTIFY_MAX_BYTES:
+            payloads.append(json.dumps({"op": "UPSERT", "ids": ids, "origin": origin}))
+            ids, size = [], overhead
+        ids.append(product_id)
+        size += width
+    if ids:
+        payloads.append(json.dumps({"op": "UPSERT", "ids": ids, "origin": origin}))
+    return payloads
+
+
+class CatalogImporter:
+    """Chunked upsert of CSV rows into "Products", applied to the catalog snapshot chunk by chunk"""
+
+    def __init__(self, connection, snapshot=catalog, channel=CATALOG_NOTIFY_CHANNEL, after_chunk=None):
+        self.connection = connection
+        self.snapshot = snapshot
+        self.channel = channel
+        self.after_chunk = after_chunk
+        self.columns = None
+
+    def _prepare(self):
+        """Detect the table columns (like ensureColumnsExist) and create the name index"""
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT column_name FROM information_schema.columns WHERE table_schema = 'public' AND table_name = 'Products';"
+            )
+            have = {column for column, in cursor.fetchall()}
+            missing = [column for column in REQUIRED_COLUMNS if column not in have]
+            if missing:
+                raise ValueError(f'Colonnes obligatoires manquantes dans "Products": {", ".join(missing)}')
+            absent = [column for column in OPTIONAL_COLUMNS if column not in have]
+            if absent:
+                log.warning("⚠️ Colonnes optionnelles absentes (ignorées) : %s", ", ".join(absent))
+            if CATALOG_IMPORT_NAME_INDEX:
+                cursor.execute('CREATE INDEX IF NOT EXISTS products_name_idx ON "Products" (name);')
+        self.connection.commit()
+        self.columns = have
+
+    def _upsert(self, cursor, rows):
+        """Stage rows with COPY, update the existing products, insert the others; returns (updated, created) rows"""
+        cursor.execute(
+            "CREATE TEMP TABLE catalog_import_staging (position integer, name text, description text, "
+            "price double precision, category text, eco_rating double precision, image_url text, "
+            "brand text, certifications text, tags text, source_url text) ON COMMIT DROP;"
+        )
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for position, values in enumerate(rows):
+            writer.writerow([position] + [values[column] for column in STAGING_COLUMNS[1:]])
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY catalog_import_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+        optional = [column for column in OPTIONAL_COLUMNS if column in self.columns]
+        assignments = ['description = COALESCE(s.description, \'\')', 'price = s.price', 'category = s.category',
+                       'eco_rating = s.eco_rating', 'image_url = COALESCE(s.image_url, \'\')']
+        assignments += [f'{column} = s.{column}' for column in optional]
+        if "updatedAt" in self.columns:
+            assignments.append('"updatedAt" = now()')
+        brand_match = ' AND (s.brand IS NULL OR p.brand = s.brand)' if "brand" in self.columns else ''
+        # Toutes les lignes qui désignent un produit existant : aucune ne doit être créée
+        cursor.execute(
+            f'CREATE TEMP TABLE catalog_import_matched ON COMMIT DROP AS'
+            f' SELECT DISTINCT ON (s.position) s.position, p.id FROM catalog_import_staging s'
+            f' JOIN "Products" p ON p.name = s.name{brand_match} ORDER BY s.position, p.id;'
+        )
+        # Un seul UPDATE par produit (une ligne du FROM par cible) : la dernière ligne l'emporte
+        cursor.execute(
+            f'UPDATE "Products" AS p SET {", ".join(assignments)}'
+            f' FROM (SELECT DISTINCT ON (id) position, id FROM catalog_import_matched ORDER BY id, position DESC) m'
+            f' JOIN catalog_import_staging s ON s.position = m.position'
+            f' WHERE p.id = m.id RETURNING {RETURNED_COLUMNS};'
+        )
+        updated = cursor.fetchall()
+
+        columns = ["name", "description", "price", "category", "eco_rating", "image_url"] + optional
+        selected = [f"COALESCE(s.{column}, '')" if column in ("description", "image_url") else f"s.{column}" for column in columns]
+        columns.append("views")
+        selected.append("0")
+        for timestamp in ("createdAt", "updatedAt"):
+            if timestamp in self.columns:
+                columns.append(f'"{timestamp}"')
+                selected.append("now()")
+        cursor.execute(
+            f'INSERT INTO "Products" AS p ({", ".join(columns)}) SELECT {", ".join(selected)}'
+            f' FROM catalog_import_staging s'
+            f' WHERE NOT EXISTS (SELECT 1 FROM catalog_import_matched m WHERE m.position = s.position)'
+            f' ORDER BY s.position RETURNING {RETURNED_COLUMNS};'
+        )
+        created = cursor.fetchall()
+        return updated, created
+
+    def import_chunk(self, rows):
+        """One transaction for one chunk; returns ({counts}, normalized products)"""
+        with self.connection.cursor() as cursor:
+            # Pas de NOTIFY par ligne (trigger de catalog.py) : un NOTIFY par lot, envoyé au commit
+            cursor.execute("SET LOCAL catalog.bulk_import = 'on';")
+            updated, created = self._upsert(cursor, rows)
+            products = [normalize_product(row) for row in updated + created]
+            for payload in notify_payloads([product['id'] for product in products], notification_origin()):
+                cursor.execute("SELECT pg_notify(%s, %s);", (self.channel, payload))
+        self.connection.commit()
+        return {"updated": len(updated), "created": len(created)}, products
+
+    def run(self, stream, chunk_size=CATALOG_IMPORT_CHUNK_SIZE):
+        """Import a CSV text stream chunk by chunk; returns the import counts"""
+        self._prepare()
+        stats = {"created": 0, "updated": 0, "skipped": 0, "chunks": 0}
+        start = time.perf_counter()
+        for rows, skipped in read_chunks(stream, chunk_size):
+            stats["skipped"] += skipped
+            if not rows:
+                continue
+            try:
+                counts, products = self.import_chunk(rows)
+            except Exception:
+                self.connection.rollback()
+                raise
+            stats["created"] += counts["created"]
+            stats["updated"] += counts["updated"]
+            stats["chunks"] += 1
+
+            # Index, matrice de scoring et modèle de contenu mis à jour avec ce lot seulement
+            if self.snapshot is not None and self.snapshot.is_loaded():
+                self.snapshot.apply_changes(products)
+                if self.after_chunk is not None:
+                    self.after_chunk()
+        stats["seconds"] = round(time.perf_counter() - start, 3)
+        log.info("✅ Import terminé : %d créés, %d mis à jour, %d ignorés (%d lots, %ss)",
+                 stats['created'], stats['updated'], stats['skipped'], stats['chunks'], stats['seconds'])
+        return stats
+
+
+def import_csv(stream, chunk_size=CATALOG_IMPORT_CHUNK_SIZE, snapshot=catalog, after_chunk=None):
+    """Import a CSV text stream through a pooled connection"""
+    with db.connection() as connection:
+        return CatalogImporter(connection, snapshot, after_chunk=after_chunk).run(stream, chunk_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("csv", help="CSV file (columns of scripts/products_bulk.csv), '-' for stdin")
+    parser.add_argument("--chunk-size", type=int, default=CATALOG_IMPORT_CHUNK_SIZE, help="rows per transaction (CATALOG_IMPORT_CHUNK_SIZE)")
+    args = parser.parse_args()
+
+    if args.csv == "-":
+        stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig", newline="")
+    else:
+        stream = open(args.csv, encoding="utf-8-sig", newline="")
+    connection = db.connect()
+    try:
+        # Processus séparé : le snapshot du service est mis à jour par les NOTIFY de chaque lot
+        CatalogImporter(connection, snapshot=None).run(stream, args.chunk_size)
+    finally:
+        connection.close()
+        stream.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+👥 Filtrage collaboratif item-item sur matrices creuses.
+
+Les interactions forment une matrice CSR utilisateurs x produits, pondérée
+par interaction_type. On précalcule, par blocs, les k produits les plus
+similaires (cosinus entre colonnes) de chaque produit : la mémoire et le
+temps de calcul suivent le nombre d'interactions, pas utilisateurs².
+
+Une recommandation agrège les voisins des produits de l'historique de
+l'utilisateur : O(taille de l'historique x k).
+"""
+import os
+import time
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from logger import get_logger
+
+# 🔹 Poids par type d'interaction (les types inconnus comptent comme une vue)
+INTERACTION_WEIGHTS = {
+    'view': 1.0,
+    'click': 1.0,
+    'like': 3.0,
+    'review': 3.0,
+    'add_to_cart': 4.0,
+    'purchase': 5.0
+}
+DEFAULT_INTERACTION_WEIGHT = 1.0
+
+CF_NEIGHBORS = int(os.getenv("CF_NEIGHBORS", "50"))
+CF_BLOCK_ITEMS = int(os.getenv("CF_BLOCK_ITEMS", "2048"))
+
+log = get_logger("collaborative")
+
+
+def interaction_weight(interaction_type):
+    return INTERACTION_WEIGHTS.get((interaction_type or '').lower(), DEFAULT_INTERACTION_WEIGHT)
+
+
+def item_neighbors(user_items, k, block_items=CF_BLOCK_ITEMS):
+    """(neighbors, scores) arrays of shape (items, k); -1 marks an empty slot"""
+    n_items = user_items.shape[1]
+    neighbors = np.full((n_items, k), -1, dtype=np.int32)
+    scores = np.zeros((n_items, k), dtype=np.float32)
+    if n_items == 0 or k == 0:
+        return neighbors, scores
+
+    # Colonnes normalisées : le produit scalaire donne le cosinus item-item
+    norms = np.sqrt(np.asarray(user_items.multiply(user_items).sum(axis=0)).ravel())
+    norms[norms == 0] = 1.0
+    normalized = csr_matrix(user_items.multiply(1.0 / norms).astype(np.float32))
+    items_users = normalized.T.tocsr()
+
+    for start in range(0, n_items, block_items):
+        stop = min(n_items, start + block_items)
+        block = (items_users[start:stop] @ normalized).tocsr()
+        for offset in range(stop - start):
+            item = start + offset
+            row_start, row_stop = block.indptr[offset], block.indptr[offset + 1]
+            candidates = block.indices[row_start:row_stop]
+            similarities = block.data[row_start:row_stop]
+            keep = (candidates != item) & (similarities > 0)
+            candidates, similarities = candidates[keep], similarities[keep]
+            if len(candidates) > k:
+                top = np.argpartition(-similarities, k - 1)[:k]
+                candidates, similarities = candidates[top], similarities[top]
+            order = np.argsort(-similarities, kind='stable')
+            neighbors[item, :len(order)] = candidates[order]
+            scores[item, :len(order)] = similarities[order]
+    return neighbors, scores
+
+
+class ItemItemModel:
+    """Fitted user x item matrix and item neighbor table"""
+
+    def __init__(self, user_ids, item_ids, user_items, neighbors, scores):
+        self.user_ids = user_ids
+        self.item_ids = item_ids
+        self.item_col = {product_id: col for col, product_id in enumerate(item_ids.tolist())}
+        self.user_items = user_items
+        self.neighbors = neighbors
+        self.scores = scores
+        self.fitted_at = time.monotonic()
+
+    @classmethod
+    def fit(cls, user_ids, product_ids, weights, k=CF_NEIGHBORS):
+        """Fit from parallel arrays (one entry per interaction)"""
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        product_ids = np.asarray(product_ids, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float32)
+
+        unique_users, user_rows = np.unique(user_ids, return_inverse=True)
+        unique_items, item_cols = np.unique(product_ids, return_inverse=True)
+        # Les doublons (user, produit) sont additionnés par csr_matrix
+        user_items = csr_matrix((weights, (user_rows, item_cols)), shape=(len(unique_users), len(unique_items)))
+        user_items.sum_duplicates()
+
+        neighbors, scores = item_neighbors(user_items, k)
+        return cls(unique_users, unique_items, user_items, neighbors, scores)
+
+    def recommend(self, history, num_recommendations=3, exclude=()):
+        """Product ids ranked by Σ weight(history item) x similarity(history item, candidate).
+
+        history is {product_id: weight}; products unknown to the model are ignored.
+        """
+        known = [(self.item_col[product_id], weight) for product_id, weight in history.items() if product_id in self.item_col]
+        if not known:
+            return []
+
+        seen = np.array([col for col, _ in known], dtype=np.int64)
+        weights = np.array([weight for _, weight in known], dtype=np.float32)
+
+        candidates = self.neighbors[seen].ravel()
+        contributions = (self.scores[seen] * weights[:, None]).ravel()
+        valid = candidates >= 0
+        candidates, contributions = candidates[valid], contributions[valid]
+        if len(candidates) == 0:
+            return []
+
+        unique, inverse = np.unique(candidates, return_inverse=True)
+        totals = np.bincount(inverse, weights=contributions)
+        excluded = set(history) | set(exclude)
+        allowed = ~np.isin(self.item_ids[unique], np.fromiter(excluded, dtype=np.int64, count=len(excluded)))
+        unique, totals = unique[allowed], totals[allowed]
+
+        order = np.argsort(-totals, kind='stable')[:num_recommendations]
+        return [int(self.item_ids[i]) for i in unique[order]]
+
+
+class CollaborativeRecommender:
+    """Item-item model refitted from the InteractionStore at each compaction"""
+
+    def __init__(self, store, k=CF_NEIGHBORS):
+        self.store = store
+        self.k = k
+        self.model = None
+        store.on_compaction(lambda _store: self.fit())
+
+    def fit(self):
+        user_ids, product_ids, weights = self.store.arrays()
+        model = ItemItemModel.fit(user_ids, product_ids, weights, self.k)
+        self.model = model
+        log.info("👥 Item-item model fitted: %d users, %d products", len(model.user_ids), len(model.item_ids))
+        return model
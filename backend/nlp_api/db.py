@@ -0,0 +1,155 @@
+"""
+🔌 Accès PostgreSQL partagé par les services NLP.
+
+Un pool borné de connexions psycopg2 (ThreadedConnectionPool) remplace
+l'ouverture d'une connexion par requête. Quand toutes les connexions sont
+prises, on attend jusqu'à DB_POOL_TIMEOUT secondes au lieu d'échouer.
+connection() garantit le retour au pool sur tous les chemins.
+
+Variables d'environnement :
+    POSTGRES_DB / POSTGRES_USER / POSTGRES_PASSWORD / POSTGRES_HOST / POSTGRES_PORT
+    DATABASE_URL      utilisé si la connexion par paramètres échoue (Railway)
+    DB_POOL_MIN       connexions ouvertes au démarrage du pool (défaut 1)
+    DB_POOL_MAX       connexions simultanées max (défaut 10)
+    DB_POOL_TIMEOUT   attente max d'une connexion libre, en secondes (défaut 5)
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+
+DB_NAME = os.getenv("POSTGRES_DB", "eco_recommendation")
+DB_USER = os.getenv("POSTGRES_USER", "postgres")
+DB_PASSWORD = os.getenv("POSTGRES_PASSWORD", "postgres")
+DB_HOST = os.getenv("POSTGRES_HOST", "localhost")
+DB_PORT = os.getenv("POSTGRES_PORT", "5432")
+
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+
+
+class PoolTimeout(Exception):
+    """No connection became available within DB_POOL_TIMEOUT"""
+
+
+def connection_kwargs():
+    return dict(dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT)
+
+
+def connect():
+    """Dedicated (non-pooled) connection, e.g. for LISTEN"""
+    try:
+        return psycopg2.connect(**connection_kwargs())
+    except Exception as e:
+        print(f"❌ Database connection error: {e}")
+        # Fallback to Railway's DATABASE_URL if available
+        if os.getenv("DATABASE_URL"):
+            return psycopg2.connect(os.getenv("DATABASE_URL"))
+        raise e
+
+
+class ConnectionPool:
+    """Bounded, blocking wrapper around ThreadedConnectionPool with usage metrics"""
+
+    def __init__(self, minconn=DB_POOL_MIN, maxconn=DB_POOL_MAX, timeout=DB_POOL_TIMEOUT):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self._pool = None
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self.checked_out = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+
+    def _get_pool(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    try:
+                        self._pool = ThreadedConnectionPool(self.minconn, self.maxconn, **connection_kwargs())
+                    except Exception as e:
+                        print(f"❌ Database connection error: {e}")
+                        if not os.getenv("DATABASE_URL"):
+                            raise
+                        self._pool = ThreadedConnectionPool(self.minconn, self.maxconn, os.getenv("DATABASE_URL"))
+        return self._pool
+
+    def getconn(self):
+        waited = 0.0
+        if not self._slots.acquire(blocking=False):
+            start = time.perf_counter()
+            acquired = self._slots.acquire(timeout=self.timeout)
+            waited = time.perf_counter() - start
+            with self._metrics_lock:
+                self.waits += 1
+                self.wait_seconds += waited
+                if not acquired:
+                    self.timeouts += 1
+            if not acquired:
+                raise PoolTimeout(f"No database connection available after {self.timeout}s")
+
+        try:
+            conn = self._get_pool().getconn()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._metrics_lock:
+            self.checked_out += 1
+            self.checkouts += 1
+        return conn
+
+    def putconn(self, conn):
+        try:
+            # Une connexion cassée n'est pas remise dans le pool
+            self._get_pool().putconn(conn, close=bool(conn.closed))
+        finally:
+            with self._metrics_lock:
+                self.checked_out -= 1
+            self._slots.release()
+
+    def stats(self):
+        with self._metrics_lock:
+            return {
+                "max": self.maxconn,
+                "checked_out": self.checked_out,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 6),
+                "timeouts": self.timeouts
+            }
+
+    def closeall(self):
+        if self._pool is not None:
+            self._pool.closeall()
+
+    def reset(self):
+        """Close every connection; the next getconn() opens a new pool (e.g. before forking workers)"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+
+
+pool = ConnectionPool()
+
+
+@contextmanager
+def connection():
+    """Borrow a pooled connection; it always goes back to the pool (rolled back if left in a transaction)"""
+    conn = pool.getconn()
+    try:
+        yield conn
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
@@ -0,0 +1,222 @@
+"""
+🧮 Filtres et pagination de /ai-search.
+
+Filtres : category (répétable), min_price, max_price, min_eco_rating.
+Les colonnes catégorie (codes), prix et eco_rating sont rangées dans des
+tableaux numpy alignés sur les lignes de l'état de scoring (ids triés).
+Quand l'index ou le catalogue change, les lignes existantes sont recopiées
+à leur nouvelle place (np.searchsorted) et seuls les produits modifiés ou
+nouvellement indexés sont relus dans le snapshot ; un rechargement complet
+du catalogue les reconstruit entièrement. Un filtre devient un masque
+booléen, gardé en cache, combiné au score : une recherche filtrée coûte le
+même prix qu'une recherche complète.
+
+Pagination : offset/limit, ou cursor (renvoyé comme next_cursor) qui
+désigne le dernier résultat de la page précédente (score, id). La page
+suivante ne garde que les produits classés après lui : elle coûte le même
+prix que la première, quelle que soit sa profondeur.
+
+Variables d'environnement :
+    SEARCH_MAX_LIMIT          taille max d'une page (défaut 100)
+    SEARCH_MAX_OFFSET         offset max, au-delà utiliser cursor (défaut 10000)
+    FILTER_MASK_CACHE_SIZE    masques de filtres gardés en cache (défaut 256)
+"""
+import base64
+import json
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+from query_cache import QueryCache
+
+SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", "100"))
+SEARCH_MAX_OFFSET = int(os.getenv("SEARCH_MAX_OFFSET", "10000"))
+FILTER_MASK_CACHE_SIZE = int(os.getenv("FILTER_MASK_CACHE_SIZE", "256"))
+
+DEFAULT_LIMIT = 10
+
+
+def _float_arg(args, name):
+    value = args.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+    if number != number:
+        raise ValueError(f"{name} must be a number")
+    return number
+
+
+def _int_arg(args, name, default, maximum, minimum=0):
+    value = args.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+    if number < minimum or number > maximum:
+        raise ValueError(f"{name} must be between {minimum} and {maximum}")
+    return number
+
+
+class SearchFilters(namedtuple("SearchFilters", ["categories", "min_price", "max_price", "min_eco_rating"])):
+    """Hashable filter set (categories lowercased and sorted)"""
+
+    @classmethod
+    def from_args(cls, args):
+        """Parse request.args; raises ValueError on invalid values"""
+        categories = tuple(sorted({category.strip().lower() for category in args.getlist("category") if category.strip()}))
+        return cls(categories, _float_arg(args, "min_price"), _float_arg(args, "max_price"), _float_arg(args, "min_eco_rating"))
+
+    def is_empty(self):
+        return not self.categories and self.min_price is None and self.max_price is None and self.min_eco_rating is None
+
+
+class Page(namedtuple("Page", ["offset", "limit", "cursor"])):
+    """offset/limit and the decoded cursor ((score, product_id) or None)"""
+
+    @classmethod
+    def from_args(cls, args, mode):
+        limit = _int_arg(args, "limit", DEFAULT_LIMIT, SEARCH_MAX_LIMIT, minimum=1)
+        offset = _int_arg(args, "offset", 0, SEARCH_MAX_OFFSET)
+        token = args.get("cursor")
+        return cls(offset, limit, decode_cursor(token, mode) if token else None)
+
+
+def encode_cursor(mode, score, product_id):
+    payload = json.dumps([mode, score, product_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(token, mode):
+    """(score, product_id) from a next_cursor token of the same mode"""
+    try:
+        cursor_mode, score, product_id = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        score, product_id = float(score), int(product_id)
+    except (ValueError, TypeError):
+        raise ValueError("invalid cursor")
+    if cursor_mode != mode:
+        raise ValueError("cursor belongs to another search mode")
+    return score, product_id
+
+
+class FilterColumns:
+    """Category codes, prices and eco_ratings aligned with the rows of one ScoringState"""
+
+    def __init__(self, ids, products, category_codes=None):
+        n = len(ids)
+        self.ids = ids
+        self.category_codes = dict(category_codes or {})
+        self.categories = np.full(n, -1, dtype=np.int32)
+        self.prices = np.full(n, np.nan)
+        self.eco_ratings = np.full(n, np.nan)
+        self._fill(products)
+
+    def _rows(self, product_ids):
+        # Produits absents de l'index (pas encore indexés) : ignorés, ils ne sont jamais scorés
+        n = len(self.ids)
+        rows = np.searchsorted(self.ids, product_ids)
+        known = (rows < n) & (self.ids[np.minimum(rows, n - 1)] == product_ids)
+        return rows[known], known
+
+    def _fill(self, products):
+        products = list(products)
+        if not products or not len(self.ids):
+            return
+        rows, known = self._rows(np.array([product['id'] for product in products], dtype=np.int64))
+        codes = [self.category_codes.setdefault((product['category'] or "").lower(), len(self.category_codes)) for product in products]
+        self.categories[rows] = np.array(codes, dtype=np.int32)[known]
+        self.prices[rows] = np.array([product['price'] for product in products], dtype=np.float64)[known]
+        self.eco_ratings[rows] = np.array([product['eco_rating'] for product in products], dtype=np.float64)[known]
+
+    def patched(self, ids, changed_ids, fetch):
+        """Columns for ids: rows copied from these ones, except the changed and newly indexed products.
+
+        fetch(product_ids) returns the current rows of those products (missing ones are no longer in the catalog).
+        """
+        columns = FilterColumns(ids, (), self.category_codes)
+        found = np.zeros(len(ids), dtype=bool)
+        if len(ids) and len(self.ids):
+            rows = np.searchsorted(self.ids, ids)
+            found = (rows < len(self.ids)) & (self.ids[np.minimum(rows, len(self.ids) - 1)] == ids)
+            columns.categories[found] = self.categories[rows[found]]
+            columns.prices[found] = self.prices[rows[found]]
+            columns.eco_ratings[found] = self.eco_ratings[rows[found]]
+        refreshed = set(changed_ids).union(ids[~found].tolist())
+        if refreshed and len(ids):
+            rows, _ = columns._rows(np.array(sorted(refreshed), dtype=np.int64))
+            columns.categories[rows] = -1
+            columns.prices[rows] = np.nan
+            columns.eco_ratings[rows] = np.nan
+            columns._fill(fetch(sorted(refreshed)))
+        return columns
+
+    def mask(self, filters):
+        """Bool array of the rows passing filters"""
+        mask = np.ones(len(self.categories), dtype=bool)
+        if filters.categories:
+            codes = [self.category_codes[category] for category in filters.categories if category in self.category_codes]
+            mask &= np.isin(self.categories, codes)
+        # NaN (produit inconnu) échoue à toutes les comparaisons
+        if filters.min_price is not None:
+            mask &= self.prices >= filters.min_price
+        if filters.max_price is not None:
+            mask &= self.prices <= filters.max_price
+        if filters.min_eco_rating is not None:
+            mask &= self.eco_ratings >= filters.min_eco_rating
+        return mask
+
+
+class CatalogFilters:
+    """Filter masks for the current scoring state, patched when the index or the catalog changes"""
+
+    def __init__(self, catalog, cache_size=FILTER_MASK_CACHE_SIZE):
+        self.catalog = catalog
+        self.masks = QueryCache(max_entries=cache_size, ttl=float("inf"))
+        self._columns = None
+        self._columns_key = None
+        self._lock = threading.Lock()
+        # Produits modifiés depuis les dernières colonnes (verrou à part : publié sous le verrou du catalogue)
+        self._changed = set()
+        self._full = False
+        self._changes_lock = threading.Lock()
+
+    def on_catalog_change(self, change):
+        """Catalog subscriber: record the changed product ids"""
+        with self._changes_lock:
+            if change["full"]:
+                self._changed, self._full = set(), True
+            elif not self._full:
+                self._changed.update(product['id'] for product in change["upserted"])
+                self._changed.update(change["removed"])
+
+    def columns(self, state):
+        key = (state.version, self.catalog.version, len(state.ids))
+        if self._columns_key != key:
+            with self._lock:
+                if self._columns_key != key:
+                    with self._changes_lock:
+                        changed, full = self._changed, self._full
+                        self._changed, self._full = set(), False
+                    if self._columns is None or full:
+                        self._columns = FilterColumns(state.ids, self.catalog.products())
+                    else:
+                        self._columns = self._columns.patched(state.ids, changed, self.catalog.get_many)
+                    self._columns_key = key
+        return self._columns, key
+
+    def mask(self, state, filters):
+        """Cached bool array over state rows, or None when filters is empty"""
+        if filters.is_empty():
+            return None
+        columns, key = self.columns(state)
+        mask = self.masks.get(filters, key)
+        if mask is None:
+            mask = columns.mask(filters)
+            self.masks.put(filters, mask, key)
+        return mask
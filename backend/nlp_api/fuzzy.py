@@ -0,0 +1,230 @@
+"""
+🔡 Correction des fautes de frappe : dictionnaire de suppressions (SymSpell).
+
+Les mots de la requête absents du vocabulaire de l'index (tokens lemmatisés,
+sans accents) sont remplacés par le terme connu le plus proche avant le
+scoring : "bambo" -> "bamboo", "toothbrsh" -> "toothbrush".
+
+Au lieu de calculer la distance d'édition avec tout le vocabulaire, chaque
+terme est enregistré sous toutes les variantes obtenues en supprimant
+jusqu'à FUZZY_MAX_DISTANCE lettres de ses FUZZY_PREFIX_LENGTH premiers
+caractères. Une requête génère ses propres suppressions (quelques dizaines)
+et ne calcule la distance (Damerau-Levenshtein restreinte) qu'avec les
+termes qui partagent l'une d'elles : un coût quasi constant, quelle que soit
+la taille du catalogue. À distance égale, le terme présent dans le plus de
+produits l'emporte.
+
+Un mot valide n'est jamais corrigé : "word" reste "word" même si le
+catalogue ne contient que "wood". Seuls les mots absents à la fois du
+vocabulaire et du dictionnaire (known_word, WordNet + stop words côté
+service) sont candidats.
+
+Le dictionnaire est construit au warmup puis suit l'index de recherche en
+arrière-plan : quand le catalogue change, seuls les termes ajoutés en fin de
+vocabulaire sont indexés et les fréquences rafraîchies (un terme qui n'est
+plus dans aucun produit n'est plus proposé). Il n'est reconstruit en entier
+que si l'état de scoring l'a été (rechargement complet, artefact).
+
+Variables d'environnement :
+    FUZZY_MAX_DISTANCE    distance d'édition max d'une correction (défaut 2, 0 = désactivé)
+    FUZZY_PREFIX_LENGTH   caractères pris en compte pour les suppressions (défaut 7)
+"""
+import itertools
+import os
+import threading
+
+import numpy as np
+
+from logger import get_logger
+
+FUZZY_MAX_DISTANCE = int(os.getenv("FUZZY_MAX_DISTANCE", "2"))
+FUZZY_PREFIX_LENGTH = int(os.getenv("FUZZY_PREFIX_LENGTH", "7"))
+
+# Mots de moins de 4 lettres jamais corrigés, une seule faute tolérée sous 8 lettres :
+# au-delà, trop de mots courts sont à distance 2 l'un de l'autre ("clean" / "plein")
+MIN_WORD_LENGTH = 4
+LONG_WORD_LENGTH = 8
+
+log = get_logger("fuzzy")
+
+
+def deletes(word, max_distance):
+    """word and every string obtained by deleting up to max_distance characters"""
+    variants = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+        variants |= frontier
+    return variants
+
+
+def edit_distance(a, b, max_distance):
+    """Optimal string alignment distance, or max_distance + 1 as soon as it is exceeded"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    # Préfixe et suffixe communs retirés : il ne reste que la zone de la faute
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and end < len(b) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a, b = a[start:len(a) - end], b[start:len(b) - end]
+    if not a or not b:
+        return min(len(a) + len(b), max_distance + 1)
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return min(previous[-1], max_distance + 1)
+
+
+class FuzzyTermIndex:
+    """Deletion dictionary over the vocabulary of one ScoringState"""
+
+    def __init__(self, version, terms, frequencies, max_distance=FUZZY_MAX_DISTANCE, prefix_length=FUZZY_PREFIX_LENGTH,
+                 lineage=None):
+        self.version = version
+        self.terms = terms
+        self.frequencies = frequencies
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.lineage = lineage  # ScoringState.lineage des états que update() peut suivre
+        self.deletes = {}  # variante -> positions des termes
+        self._index_terms(0)
+
+    def _index_terms(self, start):
+        for position in range(start, len(self.terms)):
+            for variant in deletes(self.terms[position][:self.prefix_length], self.max_distance):
+                self.deletes.setdefault(variant, []).append(position)
+
+    @classmethod
+    def build(cls, state, max_distance=FUZZY_MAX_DISTANCE):
+        """Index of the vocabulary of state; document frequency = posting length (CSC columns)"""
+        frequencies = np.diff(np.asarray(state.matrix.indptr)).tolist()
+        terms = [None] * len(state.vocabulary)
+        for term, column in state.vocabulary.items():
+            terms[column] = term
+        return cls(state.version, terms, frequencies, max_distance, lineage=state.lineage)
+
+    def update(self, state):
+        """Follow state in place: index the terms appended since, refresh frequencies.
+
+        False (index untouched) when state does not derive from the indexed one by patch_state.
+        """
+        if state.lineage is not self.lineage or len(state.vocabulary) < len(self.terms):
+            return False
+        # patch_state ajoute les nouveaux termes en fin de dictionnaire : ordre d'insertion = colonnes
+        added = list(itertools.islice(state.vocabulary, len(self.terms), None))
+        if any(state.vocabulary[term] != len(self.terms) + offset for offset, term in enumerate(added)):
+            return False
+        # Lecteurs concurrents : termes et fréquences publiés avant les positions qui y renvoient
+        start = len(self.terms)
+        self.terms.extend(added)
+        self.frequencies = np.diff(np.asarray(state.matrix.indptr)).tolist()
+        self._index_terms(start)
+        self.version = state.version
+        return True
+
+    def lookup(self, word):
+        """Closest known term to word (fewest edits, then most products), or None"""
+        if len(word) < MIN_WORD_LENGTH:
+            return None
+        max_distance = self.max_distance if len(word) >= LONG_WORD_LENGTH else min(1, self.max_distance)
+        if max_distance <= 0:
+            return None
+        best = None
+        seen = set()
+        for variant in deletes(word[:self.prefix_length], max_distance):
+            for position in self.deletes.get(variant, ()):
+                if position in seen:
+                    continue
+                seen.add(position)
+                frequency = self.frequencies[position]
+                if not frequency:
+                    continue  # terme qui n'est plus dans aucun produit
+                term = self.terms[position]
+                distance = edit_distance(word, term, max_distance)
+                if distance <= max_distance:
+                    candidate = (distance, -frequency, term)
+                    if best is None or candidate < best:
+                        best = candidate
+        return best[2] if best is not None else None
+
+
+class TermCorrector:
+    """FuzzyTermIndex following the scoring state; updated in the background on changes"""
+
+    def __init__(self, scorer, max_distance=FUZZY_MAX_DISTANCE, known_word=None):
+        self.scorer = scorer
+        self.max_distance = max_distance
+        self.known_word = known_word  # word -> True si c'est un vrai mot, jamais corrigé
+        self.index = None
+        self._dirty = False
+        self._worker_lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._worker = None
+
+    def _build(self):
+        with self._build_lock:
+            # On attend une mise à jour en cours : sinon l'ancien vocabulaire serait ré-indexé
+            state = self.scorer.state(wait=True)
+            index = self.index
+            if index is None or (index.version != state.version and not index.update(state)):
+                self.index = FuzzyTermIndex.build(state, self.max_distance)
+            return self.index
+
+    def ensure_index(self):
+        """Current index; built synchronously only the very first time"""
+        index = self.index
+        if index is None:
+            index = self._build()
+        return index
+
+    def on_catalog_change(self, change):
+        """Catalog subscriber: schedule a background update"""
+        if self.index is None:
+            return
+        with self._worker_lock:
+            self._dirty = True
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._rebuild_loop, name="fuzzy-rebuild", daemon=True)
+                self._worker.start()
+
+    def _rebuild_loop(self):
+        while True:
+            # Sortie décidée sous le verrou : un changement signalé ensuite démarre un nouveau worker
+            with self._worker_lock:
+                if not self._dirty:
+                    self._worker = None
+                    return
+                self._dirty = False
+            try:
+                self._build()
+            except Exception as e:
+                log.exception("❌ Fuzzy term index rebuild failed: %s", e)
+
+    def corrections(self, words, vocabulary):
+        """{word: known term} for the unknown words (neither in vocabulary nor known_word) close to a known term"""
+        if self.max_distance <= 0:
+            return {}
+        missing = [word for word in words
+                   if word not in vocabulary and not (self.known_word is not None and self.known_word(word))]
+        if not missing:
+            return {}
+        index = self.ensure_index()
+        corrections = {}
+        for word in sorted(missing):
+            term = index.lookup(word)
+            # Index en cours de reconstruction : ne proposer que des termes encore connus
+            if term is not None and term in vocabulary:
+                corrections[word] = term
+        return corrections
@@ -0,0 +1,53 @@
+"""
+⚙️ Configuration gunicorn des services NLP (voir wsgi.py).
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Variables d'environnement :
+    SEARCH_PORT / RECOMMEND_PORT   ports écoutés (défaut 5001 / 5003)
+    GUNICORN_WORKERS               processus workers (défaut WEB_CONCURRENCY, sinon nombre de CPU)
+    GUNICORN_THREADS               threads par worker (défaut 4)
+    GUNICORN_TIMEOUT               secondes avant de tuer un worker bloqué (défaut 60)
+    GUNICORN_GRACEFUL_TIMEOUT      délai laissé aux requêtes en cours lors d'un reload (défaut 30)
+    GUNICORN_MAX_REQUESTS          recycler un worker après N requêtes (défaut 0 = jamais)
+
+Reload sans coupure : `kill -HUP <pid du master>` remplace les workers un à
+un (les nouveaux repartent de l'état préchargé du master). Pour charger du
+nouveau code : `kill -USR2` puis `kill -QUIT` sur l'ancien master, ou
+redémarrer le conteneur.
+"""
+import multiprocessing
+import os
+
+# Aucun thread dans le master : ils sont démarrés dans chaque worker (post_worker_init)
+os.environ.setdefault("BACKGROUND_AUTOSTART", "0")
+
+bind = [
+    f"0.0.0.0:{os.getenv('SEARCH_PORT', '5001')}",
+    f"0.0.0.0:{os.getenv('RECOMMEND_PORT', '5003')}",
+]
+workers = int(os.getenv("GUNICORN_WORKERS", os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count())))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+keepalive = 5
+
+# Catalogue, index et modèles construits une fois dans le master, partagés copy-on-write
+preload_app = True
+
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        import wsgi
+        wsgi.preload()
+
+
+def post_worker_init(worker):
+    import wsgi
+    wsgi.start_background()
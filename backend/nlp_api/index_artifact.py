@@ -0,0 +1,294 @@
+"""
+💾 Artefact d'index sur disque, ouvert en mémoire partagée (numpy memmap).
+
+Construction hors ligne (cron, étape de release), depuis backend/nlp_api :
+    python index_artifact.py build [--out DIR]
+    python index_artifact.py info
+
+build lit le catalogue, calcule l'index de recherche (matrice produits x
+termes, fréquences, IDF BM25, masques de mots-clés), le TF-IDF et la table
+des voisins de recommend.py, puis les écrit en .npy dans
+SEARCH_ARTIFACT_DIR/<empreinte>/. Le fichier CURRENT est remplacé en dernier
+(os.replace) : un lecteur ne voit jamais un artefact incomplet.
+
+Au démarrage, chaque worker ouvre ces fichiers avec np.load(mmap_mode='r') :
+quelques millisecondes, et les pages sont partagées entre processus par le
+cache du système au lieu d'être recopiées dans chaque worker. L'artefact
+n'est utilisé que si son empreinte (id, nom, description, catégorie de
+chaque produit) correspond au catalogue chargé ; sinon tout est recalculé
+comme avant. Un changement de prix ou d'eco_rating ne change pas
+l'empreinte.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.sparse import csc_matrix, csr_matrix
+
+from logger import get_logger
+
+# 2 : tokens et textes de mots-clés sans accents (fold_accents)
+ARTIFACT_FORMAT = 2
+SEARCH_ARTIFACT_DIR = os.getenv(
+    "SEARCH_ARTIFACT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "index_artifact")
+)
+
+log = get_logger("index_artifact")
+
+
+def catalog_fingerprint(products):
+    """sha1 of the text fields of every product, in id order"""
+    digest = hashlib.sha1()
+    for product in sorted(products, key=lambda product: product['id']):
+        digest.update(f"{product['id']}\x1f{product['name']}\x1f{product['description']}\x1f{product['category']}\x1e".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _index_dtype(*arrays):
+    """int32 when it fits: scipy then uses the memory-mapped arrays without copying them"""
+    largest = max((int(array.max()) for array in arrays if len(array)), default=0)
+    return np.int32 if largest < np.iinfo(np.int32).max else np.int64
+
+
+class IndexArtifact:
+    """Read-only view over one artifact directory"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.fingerprint = self.meta["fingerprint"]
+        self._arrays = {}
+        self._scoring_state = None
+        self._content_model = None
+
+    def array(self, name):
+        array = self._arrays.get(name)
+        if array is None:
+            array = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode='r')
+            self._arrays[name] = array
+        return array
+
+    @property
+    def ids(self):
+        return self.array("ids")
+
+    def __len__(self):
+        return self.meta["products"]
+
+    def matches(self, products, keywords=None):
+        """True if the artifact was built from these products (and these intent keywords)"""
+        if self.meta.get("format") != ARTIFACT_FORMAT or len(products) != len(self):
+            return False
+        if keywords is not None and list(keywords) != self.meta["search"]["keywords"]:
+            return False
+        return catalog_fingerprint(products) == self.fingerprint
+
+    # 🔹 Recherche (/ai-search)
+    def scoring_state(self, version):
+        """ScoringState backed by the memory-mapped arrays"""
+        from scoring import ScoringState
+
+        state = self._scoring_state
+        if state is None:
+            search = self.meta["search"]
+            ids = self.ids
+            matrix = csc_matrix(
+                (self.array("search_ones"), self.array("search_indices"), self.array("search_indptr")),
+                shape=(len(ids), len(search["vocabulary"])), copy=False
+            )
+            masks = self.array("keyword_masks")
+            keyword_masks = {keyword: masks[position] for position, keyword in enumerate(search["matched_keywords"])}
+            state = ScoringState(
+                version, ids, matrix, {term: column for column, term in enumerate(search["vocabulary"])},
+                self.array("doc_lengths"), keyword_masks,
+                self.array("term_frequencies"), self.array("token_lengths"), self.array("idf")
+            )
+            self._scoring_state = state
+        state.version = version
+        return state
+
+    def index_data(self):
+        """(tokens, term_counts, lengths, postings, keyword_postings) dicts, to hydrate a ProductIndex"""
+        from array import array
+
+        ids = self.ids
+        id_list = ids.tolist()
+        indptr, indices = self.array("search_indptr"), self.array("search_indices")
+        frequencies = self.array("term_frequencies")
+        term_counts = {product_id: {} for product_id in id_list}
+        postings = {}
+        for column, term in enumerate(self.meta["search"]["vocabulary"]):
+            start, stop = int(indptr[column]), int(indptr[column + 1])
+            posting = ids[indices[start:stop]].tolist()
+            postings[term] = array('q', posting)
+            for product_id, count in zip(posting, frequencies[start:stop].tolist()):
+                term_counts[product_id][term] = int(count)
+
+        masks = self.array("keyword_masks")
+        keyword_postings = {keyword: array('q', ids[masks[position]].tolist())
+                            for position, keyword in enumerate(self.meta["search"]["matched_keywords"])}
+        tokens = {product_id: frozenset(counts) for product_id, counts in term_counts.items()}
+        lengths = dict(zip(id_list, self.array("token_lengths").astype(np.int64).tolist()))
+        return tokens, term_counts, lengths, postings, keyword_postings
+
+    # 🔹 Similarité de contenu (/recommend?product_id=)
+    def content_model(self, version):
+        """ContentModel backed by the memory-mapped TF-IDF matrix and neighbor table"""
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from similarity import ContentModel
+
+        model = self._content_model
+        if model is None:
+            content = self.meta["content"]
+            vocabulary = {term: column for column, term in enumerate(content["vocabulary"])}
+            vectorizer = TfidfVectorizer(stop_words='english', dtype=np.float32, vocabulary=vocabulary)
+            vectorizer.idf_ = np.asarray(self.array("tfidf_idf"))
+            matrix = csr_matrix(
+                (self.array("tfidf_data"), self.array("tfidf_indices"), self.array("tfidf_indptr")),
+                shape=(len(self), len(vocabulary)), copy=False
+            )
+            model = ContentModel(version, self.ids, vectorizer, matrix, self.array("neighbors"), self.array("neighbor_scores"))
+            self._content_model = model
+        model.version = version
+        return model
+
+
+def write_artifact(base_dir, products, index, state, content_model):
+    """Write the artifact for products and point CURRENT to it; returns its directory"""
+    products = sorted(products, key=lambda product: product['id'])
+    fingerprint = catalog_fingerprint(products)
+    name = f"{fingerprint[:16]}-{int(time.time())}"
+    path = os.path.join(base_dir, name)
+    os.makedirs(path)
+
+    ids = np.asarray(state.ids, dtype=np.int64)
+    if not np.array_equal(ids, np.asarray(content_model.ids, dtype=np.int64)):
+        raise ValueError("Search index and content model were not built from the same products")
+
+    def save(name, array):
+        np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(array))
+
+    vocabulary = sorted(state.vocabulary, key=state.vocabulary.get)
+    dtype = _index_dtype(state.matrix.indices, state.matrix.indptr)
+    save("ids", ids)
+    save("search_indptr", state.matrix.indptr.astype(dtype))
+    save("search_indices", state.matrix.indices.astype(dtype))
+    save("search_ones", state.matrix.data.astype(np.int32))
+    save("term_frequencies", state.term_frequencies)
+    save("doc_lengths", state.doc_lengths)
+    save("token_lengths", state.token_lengths)
+    save("idf", state.idf)
+    matched_keywords = sorted(state.keyword_masks)
+    masks = np.zeros((len(matched_keywords), len(ids)), dtype=bool)
+    for position, keyword in enumerate(matched_keywords):
+        masks[position] = state.keyword_masks[keyword]
+    save("keyword_masks", masks)
+
+    matrix = content_model.matrix.tocsr()
+    dtype = _index_dtype(matrix.indices, matrix.indptr)
+    content_vocabulary = sorted(content_model.vectorizer.vocabulary_, key=content_model.vectorizer.vocabulary_.get)
+    save("tfidf_indptr", matrix.indptr.astype(dtype))
+    save("tfidf_indices", matrix.indices.astype(dtype))
+    save("tfidf_data", matrix.data.astype(np.float32))
+    save("tfidf_idf", content_model.vectorizer.idf_.astype(np.float64))
+    save("neighbors", content_model.neighbors)
+    save("neighbor_scores", content_model.scores)
+
+    meta = {
+        "format": ARTIFACT_FORMAT,
+        "fingerprint": fingerprint,
+        "products": len(ids),
+        "created_at": time.time(),
+        "search": {"vocabulary": vocabulary, "keywords": list(index.keywords), "matched_keywords": matched_keywords},
+        "content": {"vocabulary": content_vocabulary, "k": int(content_model.neighbors.shape[1])}
+    }
+    with open(os.path.join(path, "meta.json"), "w", encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    current = os.path.join(base_dir, "CURRENT")
+    with open(current + ".tmp", "w", encoding='utf-8') as f:
+        f.write(name)
+    os.replace(current + ".tmp", current)
+    return path
+
+
+def open_current(base_dir=SEARCH_ARTIFACT_DIR):
+    """The artifact named by base_dir/CURRENT, or None"""
+    try:
+        with open(os.path.join(base_dir, "CURRENT"), encoding='utf-8') as f:
+            name = f.read().strip()
+        return IndexArtifact(os.path.join(base_dir, name))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        log.error("❌ Index artifact unreadable, ignoring it: %s", e)
+        return None
+
+
+_current = None
+_current_loaded = False
+
+
+def current_artifact():
+    """Artifact shared by the services of this process (opened once)"""
+    global _current, _current_loaded
+    if not _current_loaded:
+        _current = open_current()
+        _current_loaded = True
+    return _current
+
+
+def build(base_dir=SEARCH_ARTIFACT_DIR):
+    """Offline build from the database catalog"""
+    os.environ.setdefault("CATALOG_LISTEN", "0")
+    os.environ.setdefault("BACKGROUND_AUTOSTART", "0")
+    from app import AISearchEngine
+    from catalog import load_products
+    from scoring import build_state
+    from similarity import ContentModel
+
+    start = time.perf_counter()
+    products = sorted(load_products(), key=lambda product: product['id'])
+    engine = AISearchEngine()
+    engine.index.build(products, version=0)
+    state = build_state(engine.index)
+    content_model = ContentModel.fit(products, version=0)
+    os.makedirs(base_dir, exist_ok=True)
+    path = write_artifact(base_dir, products, engine.index, state, content_model)
+    print(f"💾 Index artifact written to {path}: {len(products)} products in {time.perf_counter() - start:.1f}s")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["build", "info"])
+    parser.add_argument("--out", default=SEARCH_ARTIFACT_DIR, help="artifact base directory (SEARCH_ARTIFACT_DIR)")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build(args.out)
+        return
+
+    artifact = open_current(args.out)
+    if artifact is None:
+        print(f"No artifact in {args.out}")
+        sys.exit(1)
+    print(json.dumps({
+        "path": artifact.path,
+        "format": artifact.meta["format"],
+        "fingerprint": artifact.fingerprint,
+        "products": len(artifact),
+        "search_terms": len(artifact.meta["search"]["vocabulary"]),
+        "content_terms": len(artifact.meta["content"]["vocabulary"]),
+        "created_at": artifact.meta["created_at"]
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
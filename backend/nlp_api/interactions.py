@@ -0,0 +1,189 @@
+"""
+📥 Ingestion incrémentale de "UserInteractions".
+
+Au lieu de relire toute la table à chaque requête, un thread suit les
+nouvelles lignes par watermark sur id (clé auto-incrémentée) et les applique
+comme des deltas à l'historique pondéré de chaque utilisateur (produit ->
+poids cumulé) : O(1) par interaction.
+
+Un id est attribué à l'INSERT, pas au commit : une transaction lente peut
+rendre visible une ligne sous le watermark après une ligne d'id plus grand.
+Chaque lecture repart donc INTERACTIONS_LAG_IDS ids sous le watermark, et
+les ids déjà appliqués dans cette fenêtre sont ignorés.
+
+La compaction périodique reconstruit les tableaux (user, produit, poids)
+à partir des historiques et réentraîne le modèle item-item, sans lecture
+en base. Les suppressions (ON DELETE CASCADE), comme une ligne validée
+plus de INTERACTIONS_LAG_IDS ids en retard, ne sont pas vues par le
+watermark : resync() recharge tout depuis zéro si besoin.
+
+Variables d'environnement :
+    INTERACTIONS_POLL_SECONDS        intervalle de lecture des nouvelles lignes (défaut 5)
+    INTERACTIONS_BATCH_SIZE          lignes lues par requête (défaut 5000)
+    INTERACTIONS_LAG_IDS             ids relus sous le watermark à chaque lecture (défaut 1000)
+    INTERACTIONS_COMPACT_SECONDS     compaction au plus tard après N secondes de deltas (défaut 300)
+    INTERACTIONS_COMPACT_THRESHOLD   compaction après N deltas (défaut 10000)
+"""
+import os
+import threading
+import time
+
+from collaborative import interaction_weight
+from logger import get_logger
+
+INTERACTIONS_POLL_SECONDS = float(os.getenv("INTERACTIONS_POLL_SECONDS", "5"))
+INTERACTIONS_BATCH_SIZE = int(os.getenv("INTERACTIONS_BATCH_SIZE", "5000"))
+INTERACTIONS_LAG_IDS = int(os.getenv("INTERACTIONS_LAG_IDS", "1000"))
+INTERACTIONS_COMPACT_SECONDS = float(os.getenv("INTERACTIONS_COMPACT_SECONDS", "300"))
+INTERACTIONS_COMPACT_THRESHOLD = int(os.getenv("INTERACTIONS_COMPACT_THRESHOLD", "10000"))
+
+log = get_logger("interactions")
+
+
+class InteractionStore:
+    def __init__(self, fetch_since, batch_size=INTERACTIONS_BATCH_SIZE, poll_seconds=INTERACTIONS_POLL_SECONDS,
+                 compact_seconds=INTERACTIONS_COMPACT_SECONDS, compact_threshold=INTERACTIONS_COMPACT_THRESHOLD,
+                 lag_ids=INTERACTIONS_LAG_IDS):
+        # fetch_since(last_id, limit) -> rows (id, user_id, product_id, interaction_type) ordered by id
+        self.fetch_since = fetch_since
+        self.batch_size = batch_size
+        self.lag_ids = lag_ids
+        self.poll_seconds = poll_seconds
+        self.compact_seconds = compact_seconds
+        self.compact_threshold = compact_threshold
+
+        self.watermark = 0
+        self.recent_ids = set()        # ids applied within lag_ids of the watermark
+        self.histories = {}            # user_id -> {product_id: cumulated weight}
+        self.pending = 0               # interactions applied since the last compaction
+        self.compacted_at = None
+        self._compaction_listeners = []
+        self._lock = threading.RLock()
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    # 🔹 Deltas
+    def apply(self, rows):
+        """Apply interaction rows not applied yet; returns how many were new"""
+        applied = 0
+        with self._lock:
+            for interaction_id, user_id, product_id, interaction_type in rows:
+                if interaction_id <= self.watermark - self.lag_ids or interaction_id in self.recent_ids:
+                    continue
+                history = self.histories.setdefault(user_id, {})
+                history[product_id] = history.get(product_id, 0.0) + interaction_weight(interaction_type)
+                self.recent_ids.add(interaction_id)
+                self.watermark = max(self.watermark, interaction_id)
+                self.pending += 1
+                applied += 1
+            # Ids sortis de la fenêtre : ils ne seront plus relus
+            floor = self.watermark - self.lag_ids
+            self.recent_ids = {interaction_id for interaction_id in self.recent_ids if interaction_id > floor}
+        return applied
+
+    def poll(self):
+        """Fetch every row from lag_ids below the watermark and apply the new ones; returns their number"""
+        total = 0
+        last_id = max(0, self.watermark - self.lag_ids)
+        while True:
+            rows = self.fetch_since(last_id, self.batch_size)
+            if not rows:
+                break
+            total += self.apply(rows)
+            last_id = rows[-1][0]
+            if len(rows) < self.batch_size:
+                break
+        return total
+
+    # 🔹 Compaction
+    def on_compaction(self, callback):
+        """callback(store) after each compaction (e.g. refit the item-item model)"""
+        self._compaction_listeners.append(callback)
+
+    def arrays(self):
+        """(user_ids, product_ids, weights), one entry per (user, product) pair"""
+        with self._lock:
+            user_ids, product_ids, weights = [], [], []
+            for user_id, history in self.histories.items():
+                for product_id, weight in history.items():
+                    user_ids.append(user_id)
+                    product_ids.append(product_id)
+                    weights.append(weight)
+        return user_ids, product_ids, weights
+
+    def compact(self):
+        with self._lock:
+            self.pending = 0
+            self.compacted_at = time.monotonic()
+        for callback in list(self._compaction_listeners):
+            try:
+                callback(self)
+            except Exception as e:
+                log.exception("❌ Interaction compaction listener error: %s", e)
+
+    def _needs_compaction(self):
+        if self.compacted_at is None or self.pending >= self.compact_threshold:
+            return True
+        return self.pending > 0 and time.monotonic() - self.compacted_at > self.compact_seconds
+
+    # 🔹 Lecture
+    def history(self, user_id):
+        """{product_id: weight} of a user (copy)"""
+        with self._lock:
+            return dict(self.histories.get(user_id, {}))
+
+    def stats(self):
+        return {
+            "watermark": self.watermark,
+            "lag_ids": self.lag_ids,
+            "users": len(self.histories),
+            "pending": self.pending,
+            "since_compaction_seconds": round(time.monotonic() - self.compacted_at, 3) if self.compacted_at is not None else None
+        }
+
+    # 🔹 Thread d'ingestion
+    def catch_up(self):
+        """Synchronous initial load + compaction, without starting the thread (e.g. in a preloading master)"""
+        with self._lock:
+            self.poll()
+            self.compact()
+
+    def start(self):
+        """Tail in the background; state already caught up is kept"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="interaction-ingestion", daemon=True)
+            self._thread.start()
+
+    def ensure_started(self):
+        """Catch up synchronously the first time, then tail in the background"""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            if self.compacted_at is None:
+                self.catch_up()
+            self.start()
+
+    def resync(self):
+        """Drop the in-memory state and reload everything (picks up deleted rows)"""
+        with self._lock:
+            self.watermark = 0
+            self.recent_ids = set()
+            self.histories = {}
+            self.poll()
+            self.compact()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _run(self):
+        while not self._stop_event.wait(self.poll_seconds):
+            try:
+                self.poll()
+                if self._needs_compaction():
+                    self.compact()
+            except Exception as e:
+                log.error("❌ Interaction ingestion error: %s", e)
@@ -0,0 +1,49 @@
+"""
+📝 Logger des services NLP : niveaux + échantillonnage des logs par requête.
+
+Remplace les print() du chemin des requêtes. Les logs par requête passent
+par sampled() : seule une fraction (LOG_SAMPLE_RATE) est formatée et écrite,
+le reste ne coûte qu'un tirage aléatoire. Les erreurs sont toujours écrites.
+
+Variables d'environnement :
+    LOG_LEVEL         niveau minimal : DEBUG, INFO, WARNING, ERROR (défaut INFO)
+    LOG_SAMPLE_RATE   fraction des logs par requête écrits (défaut 0.01, 1 = tous)
+"""
+import logging
+import os
+import random
+import sys
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.01"))
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s"
+
+_root = logging.getLogger("nlp")
+if not _root.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    _root.addHandler(_handler)
+    _root.setLevel(LOG_LEVEL)
+    _root.propagate = False
+
+
+class SampledLogger:
+    """logging.Logger wrapper adding sampled(); other calls (info, error, exception...) are delegated"""
+
+    def __init__(self, logger, sample_rate=LOG_SAMPLE_RATE):
+        self.logger = logger
+        self.sample_rate = sample_rate
+
+    def sampled(self, level, msg, *args):
+        """Log msg % args for about sample_rate of the calls"""
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, msg, *args)
+
+    def __getattr__(self, name):
+        return getattr(self.logger, name)
+
+
+def get_logger(name, sample_rate=LOG_SAMPLE_RATE):
+    return SampledLogger(logging.getLogger(f"nlp.{name}"), sample_rate)
@@ -0,0 +1,177 @@
+"""
+📈 Métriques au format Prometheus et chronométrage par étape des requêtes.
+
+Histogrammes et compteurs en mémoire (sans dépendance), exposés en texte
+Prometheus par la route /metrics de chaque service :
+    nlp_http_request_seconds{service, endpoint, method, status}
+    nlp_search_stage_seconds{stage, mode}   db_fetch, detect_intent, preprocess, cache_lookup,
+                                            spelling, similarity, scoring, serialization
+    nlp_search_requests_total{mode, cache}
+    nlp_user_recommendations_total{source}  materialized, online
+
+Les valeurs sont propres à chaque processus : sous gunicorn, chaque worker
+expose ses propres séries (à agréger côté Prometheus, ex. sum by (le)).
+
+Variables d'environnement :
+    METRICS_BUCKETS   bornes des histogrammes en secondes, séparées par des virgules
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, request
+
+DEFAULT_BUCKETS = "0.0005,0.001,0.0025,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5"
+METRICS_BUCKETS = tuple(float(bound) for bound in os.getenv("METRICS_BUCKETS", DEFAULT_BUCKETS).split(","))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{value}"' for name, value in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label combination"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=METRICS_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        # Seul le premier bucket atteint est incrémenté ; le cumul est fait au rendu
+        position = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            series[position] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(values[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {values[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        # Les deux services (app.py, recommend.py) partagent les mêmes métriques dans un processus
+        return self._metrics.setdefault(metric.name, metric)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "nlp_http_request_seconds", "HTTP request latency in seconds", ["service", "endpoint", "method", "status"]))
+SEARCH_STAGE_SECONDS = REGISTRY.register(Histogram(
+    "nlp_search_stage_seconds", "/ai-search latency per stage in seconds", ["stage", "mode"]))
+SEARCH_REQUESTS = REGISTRY.register(Counter(
+    "nlp_search_requests_total", "/ai-search requests by mode and result cache outcome", ["mode", "cache"]))
+USER_RECOMMENDATIONS = REGISTRY.register(Counter(
+    "nlp_user_recommendations_total", "/recommend?user_id= answers by source (materialized table or online)", ["source"]))
+
+
+class StageTimer:
+    """Durations of the named stages of one request"""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def record(self, histogram, **labels):
+        for name, seconds in self.stages.items():
+            histogram.observe(seconds, stage=name, **labels)
+
+    def breakdown_ms(self):
+        stages = {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()}
+        stages["total"] = round(sum(self.stages.values()) * 1000, 3)
+        return stages
+
+
+def instrument(app, service):
+    """Record every request of app into nlp_http_request_seconds and add the /metrics route"""
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started_at = time.perf_counter()
+
+    @app.after_request
+    def _observe(response):
+        started_at = g.pop("metrics_started_at", None)
+        if started_at is not None:
+            endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started_at, service=service, endpoint=endpoint,
+                                         method=request.method, status=str(response.status_code))
+        return response
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+    return app
@@ -0,0 +1,212 @@
+"""
+📦 Ressources NLP chargées à la demande (NLTK, TextBlob, lexiques de sentiment).
+
+Importer nltk coûte à lui seul plusieurs secondes, et les nltk.download() du
+démarrage partaient sur le réseau à chaque lancement. Ici :
+    - rien n'est importé ni téléchargé à l'import du module ;
+    - les corpus sont cherchés d'abord dans NLTK_DATA (vendorisés dans l'image
+      au build : `python nlp_resources.py download`) ;
+    - stopwords / WordNet / TextBlob / lexiques de sentiment sont chargés une
+      seule fois, sous verrou, au premier usage ou par un Warmup en arrière-plan.
+
+Variables d'environnement :
+    NLTK_DATA            dossier des corpus (défaut : nltk_data/ à côté de ce fichier)
+    NLTK_AUTO_DOWNLOAD   télécharger un corpus absent au premier usage (défaut 1, 0 dans l'image)
+    NLP_WARMUP           background (défaut) | eager | lazy
+"""
+import functools
+import os
+import sys
+import threading
+import time
+
+NLTK_DATA_DIR = os.getenv("NLTK_DATA", os.path.join(os.path.dirname(os.path.abspath(__file__)), "nltk_data"))
+NLTK_AUTO_DOWNLOAD = os.getenv("NLTK_AUTO_DOWNLOAD", "1") != "0"
+NLP_WARMUP = os.getenv("NLP_WARMUP", "background").lower()
+
+# punkt n'est plus nécessaire : preprocess_text utilise fast_word_tokenize
+NLTK_RESOURCES = {
+    "stopwords": "corpora/stopwords",
+    "wordnet": "corpora/wordnet",
+}
+
+_lock = threading.RLock()
+_loaded = {}
+
+
+def _nltk():
+    import nltk
+    if NLTK_DATA_DIR not in nltk.data.path:
+        nltk.data.path.insert(0, NLTK_DATA_DIR)
+    return nltk
+
+
+def ensure_resource(name):
+    """Make sure an NLTK corpus is available (downloads it only if NLTK_AUTO_DOWNLOAD)"""
+    nltk = _nltk()
+    try:
+        nltk.data.find(NLTK_RESOURCES[name])
+    except LookupError:
+        if not NLTK_AUTO_DOWNLOAD:
+            raise
+        print(f"📦 Downloading NLTK resource '{name}' to {NLTK_DATA_DIR}")
+        nltk.download(name, download_dir=NLTK_DATA_DIR, quiet=True)
+        nltk.data.find(NLTK_RESOURCES[name])
+
+
+def _load_once(key, loader):
+    value = _loaded.get(key)
+    if value is None:
+        with _lock:
+            value = _loaded.get(key)
+            if value is None:
+                value = loader()
+                _loaded[key] = value
+    return value
+
+
+def _load_stop_words():
+    ensure_resource("stopwords")
+    from nltk.corpus import stopwords
+    return set(stopwords.words('english'))
+
+
+def _load_lemmatizer():
+    ensure_resource("wordnet")
+    from nltk.stem import WordNetLemmatizer
+    lemmatizer = WordNetLemmatizer()
+    # Force le chargement de WordNet ici, sous verrou (LazyCorpusLoader n'est pas thread-safe)
+    lemmatizer.lemmatize("products")
+    return lemmatizer
+
+
+def _load_textblob():
+    from textblob import TextBlob
+    TextBlob("warm up").sentiment
+    return TextBlob
+
+
+def _load_sentiment_engine():
+    import sentiment
+    if sentiment.SENTIMENT_ENGINE == "textblob":
+        return sentiment.TextBlobEngine(text_blob())
+    return sentiment.SentimentEngine.load()
+
+
+def stop_words():
+    """English NLTK stop words (set)"""
+    return _load_once("stop_words", _load_stop_words)
+
+
+def lemmatizer():
+    """WordNetLemmatizer with WordNet already loaded"""
+    return _load_once("lemmatizer", _load_lemmatizer)
+
+
+@functools.lru_cache(maxsize=8192)
+def is_dictionary_word(word):
+    """True for an English stop word or a word WordNet knows ("word", "random"), False for a typo ("bambo")"""
+    if word in stop_words():
+        return True
+    lemmatizer()  # WordNet chargé sous verrou
+    from nltk.corpus import wordnet
+    return bool(wordnet.synsets(word))
+
+
+def text_blob():
+    """The TextBlob class, imported on first use"""
+    return _load_once("text_blob", _load_textblob)
+
+
+def sentiment_engine():
+    """Review polarity engine (sentiment.py), lexicons compiled on first use"""
+    return _load_once("sentiment_engine", _load_sentiment_engine)
+
+
+def download_resources(download_dir=NLTK_DATA_DIR):
+    """Build-time download of every corpus into download_dir"""
+    import nltk
+    for name in NLTK_RESOURCES:
+        if not nltk.download(name, download_dir=download_dir, quiet=True):
+            raise RuntimeError(f"Could not download NLTK resource '{name}'")
+        print(f"📦 {name} -> {download_dir}")
+
+
+class Warmup:
+    """Runs named loading steps once, in order, and reports readiness"""
+
+    def __init__(self, steps, retry_seconds=5.0):
+        self.steps = list(steps)      # [(name, callable)]
+        self.retry_seconds = retry_seconds
+        self.timings = {}
+        self.errors = {}
+        self.started_at = None
+        self.ready_at = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    def run(self):
+        """Run the steps that have not succeeded yet; True when all are done"""
+        with self._lock:
+            if self.started_at is None:
+                self.started_at = time.monotonic()
+            for name, step in self.steps:
+                if name in self.timings:
+                    continue
+                start = time.perf_counter()
+                try:
+                    step()
+                except Exception as e:
+                    self.errors[name] = str(e)
+                    print(f"❌ Warmup step '{name}' failed: {e}")
+                    return False
+                self.timings[name] = round(time.perf_counter() - start, 3)
+                self.errors.pop(name, None)
+            if not self._ready.is_set():
+                self.ready_at = time.monotonic()
+                self._ready.set()
+                print(f"🔥 Warm in {self.ready_at - self.started_at:.2f}s: {self.timings}")
+            return True
+
+    def start(self):
+        """Warm up in a background thread, retrying failed steps"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="nlp-warmup", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self.run():
+            time.sleep(self.retry_seconds)
+
+    def wait(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def is_ready(self):
+        return self._ready.is_set()
+
+    def status(self):
+        return {
+            "status": "ready" if self.is_ready() else ("warming" if self.started_at is not None else "cold"),
+            "steps": [name for name, _ in self.steps],
+            "timings": dict(self.timings),
+            "errors": dict(self.errors),
+            "warm_seconds": round(self.ready_at - self.started_at, 3) if self.ready_at is not None else None
+        }
+
+    def configure(self, mode=NLP_WARMUP):
+        """eager: warm now; background: warm in a thread; lazy: load on first use only"""
+        if mode == "eager":
+            if not self.run():
+                self.start()
+        elif mode == "background":
+            self.start()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "download":
+        download_resources(sys.argv[2] if len(sys.argv) > 2 else NLTK_DATA_DIR)
+    else:
+        print("Usage: python nlp_resources.py download [DIR]")
+        sys.exit(2)
@@ -0,0 +1,91 @@
+"""
+⚡ Cache LRU + TTL des résultats de /ai-search.
+
+La clé est la requête normalisée (mots de preprocess_text triés + intention
+détectée et son score) : "bamboo", "Bamboo " et "bamboos" partagent la même
+entrée. Chaque entrée retient la version du catalogue avec laquelle elle a
+été calculée ; une entrée d'une autre version est ignorée (comptée "stale").
+
+Variables d'environnement :
+    SEARCH_CACHE_SIZE           nombre max d'entrées (défaut 1024, 0 = désactivé)
+    SEARCH_CACHE_TTL_SECONDS    durée de vie d'une entrée (défaut 300)
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "1024"))
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "300"))
+
+_MISSING = object()
+
+
+class QueryCache:
+    """Bounded LRU mapping with per-entry TTL and an optional version tag"""
+
+    def __init__(self, max_entries=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (value, version, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale = 0
+
+    def get(self, key, version=None, default=None):
+        """Cached value for key, or default if absent, expired or from another version"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, entry_version, expires_at = entry
+            if expires_at < now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            if entry_version != version:
+                del self._entries[key]
+                self.stale += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, version=None):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, version, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "stale": self.stale
+            }
@@ -0,0 +1,252 @@
+"""
+📬 File d'attente asynchrone pour l'analyse des avis.
+
+/analyze_review enregistre l'avis dans un journal SQLite local (durable : un
+redémarrage ne perd pas les avis en attente) et répond tout de suite 202 avec
+un job_id. Des workers en arrière-plan prennent les avis en attente par lots,
+calculent le sentiment et appliquent un seul delta de eco_rating par produit
+(plusieurs avis sur le même produit = une seule mise à jour, voir reviews.py).
+
+Les jobs restés 'processing' lors d'un arrêt brutal repassent 'pending' au
+démarrage, ou sont repris après REVIEW_CLAIM_TIMEOUT secondes si un autre
+processus worker (gunicorn) est mort en cours de lot : le traitement est
+"au moins une fois". Le claim se fait en BEGIN IMMEDIATE, donc un job n'est
+pris que par un seul processus à la fois.
+
+Un lot qui échoue sur une erreur passagère (PostgreSQL indisponible, pool
+saturé, journal verrouillé) repasse 'pending' et n'est repris qu'après un
+délai qui double à chaque tentative ; il n'est marqué 'failed' qu'au bout de
+REVIEW_MAX_ATTEMPTS tentatives, ou tout de suite pour une autre erreur.
+
+Chaque thread garde sa propre connexion au journal.
+
+Variables d'environnement :
+    REVIEW_QUEUE_PATH      journal SQLite (défaut review_queue.sqlite3 à côté de ce fichier)
+    REVIEW_WORKERS         threads workers par processus (défaut 2)
+    REVIEW_BATCH_SIZE      avis max par lot (défaut 200)
+    REVIEW_CLAIM_TIMEOUT   secondes avant de reprendre un lot 'processing' abandonné (défaut 300)
+    REVIEW_MAX_ATTEMPTS    tentatives d'un avis avant 'failed' (défaut 5)
+    REVIEW_RETRY_BACKOFF   délai avant la 2e tentative, doublé ensuite, en secondes (défaut 2)
+"""
+import contextlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+import psycopg2
+
+import db
+from logger import get_logger
+from reviews import review_polarities, rating_change, apply_rating_changes
+
+REVIEW_QUEUE_PATH = os.getenv(
+    "REVIEW_QUEUE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "review_queue.sqlite3")
+)
+REVIEW_WORKERS = int(os.getenv("REVIEW_WORKERS", "2"))
+REVIEW_BATCH_SIZE = int(os.getenv("REVIEW_BATCH_SIZE", "200"))
+REVIEW_CLAIM_TIMEOUT = float(os.getenv("REVIEW_CLAIM_TIMEOUT", "300"))
+REVIEW_MAX_ATTEMPTS = int(os.getenv("REVIEW_MAX_ATTEMPTS", "5"))
+REVIEW_RETRY_BACKOFF = float(os.getenv("REVIEW_RETRY_BACKOFF", "2"))
+
+# Erreurs passagères : le lot est retenté plus tard
+RETRYABLE_ERRORS = (db.PoolTimeout, psycopg2.OperationalError, psycopg2.InterfaceError, sqlite3.OperationalError)
+
+log = get_logger("reviews")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS review_jobs (
+    id TEXT PRIMARY KEY,
+    product_id INTEGER NOT NULL,
+    review TEXT NOT NULL,
+    status TEXT NOT NULL,
+    sentiment REAL,
+    change INTEGER,
+    eco_rating REAL,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    retry_at REAL
+);
+CREATE INDEX IF NOT EXISTS review_jobs_status ON review_jobs (status, created_at);
+"""
+
+# Colonnes ajoutées depuis la première version du journal
+MIGRATIONS = [
+    ("attempts", "INTEGER NOT NULL DEFAULT 0"),
+    ("retry_at", "REAL"),
+]
+
+JOB_COLUMNS = ["id", "product_id", "review", "status", "sentiment", "change", "eco_rating", "error", "attempts",
+               "retry_at", "created_at", "updated_at"]
+
+
+class ReviewQueue:
+    def __init__(self, path=REVIEW_QUEUE_PATH, workers=REVIEW_WORKERS, batch_size=REVIEW_BATCH_SIZE,
+                 claim_timeout=REVIEW_CLAIM_TIMEOUT, max_attempts=REVIEW_MAX_ATTEMPTS,
+                 retry_backoff=REVIEW_RETRY_BACKOFF, on_updated=None):
+        self.path = path
+        self.workers = workers
+        self.batch_size = batch_size
+        self.claim_timeout = claim_timeout
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        # on_updated({product_id: eco_rating}) after each applied batch (e.g. patch the catalog)
+        self.on_updated = on_updated
+        self._claim_lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._threads = []
+        self._stop_event = threading.Event()
+        self._local = threading.local()
+
+        # Connexion fermée tout de suite : celle de chaque thread est ouverte après un éventuel fork
+        with contextlib.closing(sqlite3.connect(self.path, timeout=30)) as journal, journal:
+            journal.execute("PRAGMA journal_mode=WAL")
+            journal.executescript(SCHEMA)
+            present = {row[1] for row in journal.execute("PRAGMA table_info(review_jobs)")}
+            for column, definition in MIGRATIONS:
+                if column not in present:
+                    journal.execute(f"ALTER TABLE review_jobs ADD COLUMN {column} {definition}")
+            # Reprise après un arrêt brutal
+            journal.execute("UPDATE review_jobs SET status = 'pending' WHERE status = 'processing'")
+
+    def _journal(self):
+        """This thread's journal connection, opened on first use (use it as a transaction context manager)"""
+        journal = getattr(self._local, "journal", None)
+        if journal is None:
+            journal = sqlite3.connect(self.path, timeout=30)
+            journal.execute("PRAGMA synchronous=NORMAL")
+            self._local.journal = journal
+        return journal
+
+    # 🔹 API
+    def enqueue(self, product_id, review_text):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._journal() as journal:
+            journal.execute(
+                "INSERT INTO review_jobs (id, product_id, review, status, created_at, updated_at) VALUES (?, ?, ?, 'pending', ?, ?)",
+                (job_id, product_id, review_text, now, now)
+            )
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def status(self, job_id):
+        with self._journal() as journal:
+            row = journal.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM review_jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(zip(JOB_COLUMNS, row)) if row else None
+
+    def stats(self):
+        with self._journal() as journal:
+            counts = dict(journal.execute("SELECT status, COUNT(*) FROM review_jobs GROUP BY status").fetchall())
+        return {"workers": len(self._threads), "jobs": counts}
+
+    # 🔹 Workers
+    def start(self):
+        """Start the worker threads (once per process, e.g. after a gunicorn fork)"""
+        if self._threads:
+            return
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"review-worker-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop_event.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def _claim(self):
+        """Mark up to batch_size pending (or abandoned) jobs as processing and return them"""
+        now = time.time()
+        with self._claim_lock, self._journal() as journal:
+            # Verrou d'écriture pris avant le SELECT : pas de double claim entre processus
+            journal.execute("BEGIN IMMEDIATE")
+            rows = journal.execute(
+                "SELECT id, product_id, review FROM review_jobs "
+                "WHERE (status = 'pending' AND (retry_at IS NULL OR retry_at <= ?)) "
+                "OR (status = 'processing' AND updated_at < ?) ORDER BY created_at LIMIT ?",
+                (now, now - self.claim_timeout, self.batch_size)
+            ).fetchall()
+            if rows:
+                journal.executemany(
+                    "UPDATE review_jobs SET status = 'processing', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    [(now, job_id) for job_id, _, _ in rows]
+                )
+        return rows
+
+    def process_batch(self, jobs):
+        """Score the jobs and apply one coalesced rating update per product"""
+        scored = []
+        changes_by_product = {}
+        polarities = review_polarities([review_text for _, _, review_text in jobs])
+        for (job_id, product_id, review_text), polarity in zip(jobs, polarities):
+            change = rating_change(polarity)
+            scored.append((job_id, product_id, polarity, change))
+            changes_by_product.setdefault(product_id, []).append(change)
+
+        with db.connection() as connection:
+            updated, missing = apply_rating_changes(connection, changes_by_product)
+
+        now = time.time()
+        with self._journal() as journal:
+            journal.executemany(
+                "UPDATE review_jobs SET status = ?, sentiment = ?, change = ?, eco_rating = ?, updated_at = ? WHERE id = ?",
+                [("not_found" if product_id in missing else "done", polarity, change, updated.get(product_id), now, job_id)
+                 for job_id, product_id, polarity, change in scored]
+            )
+
+        # Notes déjà écrites : une erreur ici ne doit pas faire rejouer le lot
+        if updated and self.on_updated is not None:
+            try:
+                self.on_updated(updated)
+            except Exception as e:
+                log.exception("❌ Review batch applied, catalog update failed: %s", e)
+        log.sampled(logging.INFO, "✅ %d avis traités, eco_rating mis à jour pour %d produits", len(jobs), len(updated))
+
+    def _fail(self, jobs, error):
+        """Put the jobs back to 'pending' with a backoff after a transient error, else mark them 'failed'"""
+        now = time.time()
+        retryable = isinstance(error, RETRYABLE_ERRORS)
+        with self._journal() as journal:
+            journal.execute("BEGIN IMMEDIATE")
+            attempts = dict(journal.execute(
+                f"SELECT id, attempts FROM review_jobs WHERE id IN ({', '.join('?' * len(jobs))})",
+                [job_id for job_id, _, _ in jobs]
+            ).fetchall())
+            updates = []
+            for job_id, _, _ in jobs:
+                attempt = attempts.get(job_id, self.max_attempts)
+                if retryable and attempt < self.max_attempts:
+                    updates.append(("pending", now + self.retry_backoff * 2 ** (attempt - 1), str(error), now, job_id))
+                else:
+                    updates.append(("failed", None, str(error), now, job_id))
+            journal.executemany(
+                "UPDATE review_jobs SET status = ?, retry_at = ?, error = ?, updated_at = ? WHERE id = ?", updates
+            )
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                jobs = self._claim()
+            except Exception as e:
+                log.exception("❌ Review claim failed: %s", e)
+                jobs = []
+            if not jobs:
+                with self._wakeup:
+                    self._wakeup.wait(timeout=1.0)
+                continue
+            try:
+                self.process_batch(jobs)
+            except Exception as e:
+                log.exception("❌ Review batch failed: %s", e)
+                try:
+                    self._fail(jobs, e)
+                except Exception as e:
+                    # Journal inaccessible : le lot reste 'processing' et sera repris après claim_timeout
+                    log.exception("❌ Could not record the review batch failure: %s", e)
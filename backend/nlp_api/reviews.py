@@ -0,0 +1,113 @@
+"""
+📝 Analyse d'avis par lots et mise à jour groupée de eco_rating.
+
+Les règles sont celles de /analyze_review : un avis positif (polarité > 0.1)
+ajoute 1 si eco_rating < 5, un avis négatif (< -0.1) retire 1 si
+eco_rating > 1. Pour un lot, on verrouille les produits concernés, on rejoue
+ces règles dans l'ordre des avis pour obtenir un delta par produit, puis un
+seul UPDATE ... FROM (VALUES ...) RETURNING applique tous les deltas dans la
+même transaction.
+"""
+from psycopg2.extras import execute_values
+
+import nlp_resources
+
+POSITIVE_THRESHOLD = 0.1
+NEGATIVE_THRESHOLD = -0.1
+
+
+def review_polarity(text):
+    return nlp_resources.sentiment_engine().polarity(text)
+
+
+def review_polarities(texts):
+    """Polarity of each review, scored as one batch (see sentiment.py)"""
+    return nlp_resources.sentiment_engine().polarities(texts)
+
+
+def rating_change(polarity):
+    """+1, -1 or 0 according to the /analyze_review thresholds"""
+    if polarity > POSITIVE_THRESHOLD:
+        return 1
+    if polarity < NEGATIVE_THRESHOLD:
+        return -1
+    return 0
+
+
+def replay_changes(eco_rating, changes):
+    """Rating after applying changes one by one with the per-review guards"""
+    for change in changes:
+        if change > 0 and eco_rating < 5:
+            eco_rating += 1
+        elif change < 0 and eco_rating > 1:
+            eco_rating -= 1
+    return eco_rating
+
+
+def parse_reviews(items):
+    """[(product_id, review_text)] from the request payload, plus the list of rejected entries"""
+    reviews, rejected = [], []
+    for position, item in enumerate(items or []):
+        try:
+            if item.get("product_id") is None:
+                raise ValueError("product_id is required")
+            product_id = int(item["product_id"])
+            review_text = item.get("review", "")
+            if not isinstance(review_text, str):
+                raise ValueError("review must be a string")
+            reviews.append((product_id, review_text))
+        except (AttributeError, TypeError, ValueError) as e:
+            rejected.append({"index": position, "error": str(e)})
+    return reviews, rejected
+
+
+def apply_rating_changes(connection, changes_by_product):
+    """Apply {product_id: [change, ...]} in one transaction.
+
+    Returns ({product_id: new eco_rating}, [unknown product ids]).
+    """
+    product_ids = sorted(changes_by_product)
+    if not product_ids:
+        return {}, []
+
+    with connection.cursor() as cursor:
+        # Verrouille les lignes : les deltas sont calculés sur des valeurs stables
+        cursor.execute('SELECT id, eco_rating FROM "Products" WHERE id = ANY(%s) ORDER BY id FOR UPDATE;', (product_ids,))
+        current = {product_id: eco_rating for product_id, eco_rating in cursor.fetchall()}
+
+        deltas = []
+        for product_id in product_ids:
+            if product_id in current:
+                delta = replay_changes(current[product_id], changes_by_product[product_id]) - current[product_id]
+                if delta:
+                    deltas.append((product_id, delta))
+
+        updated = {}
+        if deltas:
+            rows = execute_values(
+                cursor,
+                'UPDATE "Products" AS p SET eco_rating = p.eco_rating + v.delta '
+                'FROM (VALUES %s) AS v(id, delta) WHERE p.id = v.id RETURNING p.id, p.eco_rating;',
+                deltas,
+                template='(%s::integer, %s::double precision)',
+                fetch=True
+            )
+            updated = {product_id: eco_rating for product_id, eco_rating in rows}
+    connection.commit()
+
+    missing = [product_id for product_id in product_ids if product_id not in current]
+    return updated, missing
+
+
+def analyze_batch(connection, reviews):
+    """Score every review, then update the ratings of all touched products at once"""
+    results = []
+    changes_by_product = {}
+    polarities = review_polarities([review_text for _, review_text in reviews])
+    for (product_id, review_text), polarity in zip(reviews, polarities):
+        change = rating_change(polarity)
+        results.append({"product_id": product_id, "sentiment": polarity, "change": change})
+        changes_by_product.setdefault(product_id, []).append(change)
+
+    updated, missing = apply_rating_changes(connection, changes_by_product)
+    return results, updated, missing
@@ -0,0 +1,355 @@
+"""
+🧮 Scoring vectorisé pour /ai-search.
+
+Les produits sont représentés par une matrice creuse produits x termes
+(construite directement à partir des listes de postings du ProductIndex)
+et des masques booléens par intention. Les trois composantes du score
+(intention 70%, mots-clés 20%, Jaccard 10%) sont calculées en une fois sur
+tout le catalogue, puis argpartition extrait le top-k.
+
+Les opérations flottantes sont faites dans le même ordre que l'ancienne
+boucle Python, donc les scores sont identiques au bit près.
+
+Le mode BM25 (/ai-search?mode=bm25) utilise la même matrice avec les
+fréquences de termes, les longueurs de documents et un IDF par terme
+calculés une fois par version de l'index.
+
+Filtres et pagination (voir filters.py) : un masque de lignes autorisées
+est combiné au score, et le curseur (score, id) du dernier résultat d'une
+page écarte tout ce qui est classé avant lui. Le top-k reste un
+argpartition en O(N) sur les lignes restantes, quelle que soit la page.
+
+Quand l'index change par petits lots (import en masse, avis, NOTIFY),
+patch_state() ne recalcule que les lignes des produits modifiés à partir
+de l'état précédent (opérations sur les tableaux, sans reparcourir les
+postings). Pendant qu'un thread met l'état à jour, les recherches
+continuent avec l'état précédent au lieu d'attendre.
+"""
+import os
+import threading
+
+import numpy as np
+from scipy.sparse import csc_matrix, csr_matrix, vstack
+
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+
+class ScoringState:
+    """Arrays derived from one version of the ProductIndex"""
+
+    def __init__(self, version, ids, matrix, vocabulary, doc_lengths, keyword_masks, term_frequencies, token_lengths, idf,
+                 lineage=None):
+        self.version = version
+        self.ids = ids                      # sorted product ids, one row each
+        self.matrix = matrix                # CSC, rows = products, columns = terms (binary)
+        self.vocabulary = vocabulary        # term -> column
+        self.doc_lengths = doc_lengths      # distinct tokens per product
+        self.keyword_masks = keyword_masks  # intent keyword -> bool array over rows
+        self.term_frequencies = term_frequencies  # same layout as matrix.data, BM25 tf
+        self.token_lengths = token_lengths  # tokens per product, with repetitions
+        self.idf = idf                      # BM25 IDF per column
+        self.average_length = float(token_lengths.mean()) if len(token_lengths) else 0.0
+        # Partagé par les états dérivés par patch_state : colonnes conservées, nouveaux termes ajoutés en fin
+        self.lineage = lineage if lineage is not None else object()
+        self._intent_masks = {}
+
+    def any_keyword_mask(self, keywords):
+        """Rows whose text contains at least one of keywords (cached per keyword list)"""
+        key = tuple(keywords)
+        mask = self._intent_masks.get(key)
+        if mask is None:
+            mask = np.zeros(len(self.ids), dtype=bool)
+            for keyword in keywords:
+                keyword_mask = self.keyword_masks.get(keyword)
+                if keyword_mask is not None:
+                    mask |= keyword_mask
+            self._intent_masks[key] = mask
+        return mask
+
+
+def _round2(values):
+    """round(value, 2) of each value, identical to Python's round()"""
+    rounded = np.round(values, 2)
+    # np.round peut différer de round() seulement quand value * 100 tombe sur un demi
+    scaled = values * 100
+    for i in np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6).tolist():
+        rounded[i] = round(float(values[i]), 2)
+    return rounded
+
+
+def _after_rounded(rows, total, ids, cursor):
+    """rows ranked after cursor = (rounded score, id) in the (-round(total, 2), id) order"""
+    score, product_id = cursor
+    rounded = _round2(total[rows])
+    return rows[(rounded < score) | ((rounded == score) & (ids[rows] > product_id))]
+
+
+def build_state(index):
+    """Build the sparse matrix and keyword masks from a ProductIndex snapshot"""
+    version, tokens, postings, keyword_postings, term_counts, lengths = index.snapshot()
+
+    ids = np.array(sorted(tokens), dtype=np.int64)
+    vocabulary = {}
+    indptr = [0]
+    row_chunks = []
+    frequencies = []
+    for term, posting in postings.items():
+        vocabulary[term] = len(vocabulary)
+        row_chunks.append(np.searchsorted(ids, np.frombuffer(posting, dtype=np.int64)))
+        frequencies.extend(term_counts[product_id][term] for product_id in posting)
+        indptr.append(indptr[-1] + len(posting))
+
+    rows = np.concatenate(row_chunks) if row_chunks else np.zeros(0, dtype=np.int64)
+    matrix = csc_matrix(
+        (np.ones(len(rows), dtype=np.int32), rows, np.array(indptr, dtype=np.int64)),
+        shape=(len(ids), len(vocabulary))
+    )
+    doc_lengths = np.bincount(rows, minlength=len(ids)).astype(np.int64)
+
+    # BM25 : IDF = log(1 + (N - df + 0.5) / (df + 0.5)), df = taille de la liste de postings
+    document_frequencies = np.diff(np.array(indptr, dtype=np.int64)).astype(np.float64)
+    idf = np.log1p((len(ids) - document_frequencies + 0.5) / (document_frequencies + 0.5))
+    token_lengths = np.array([lengths[product_id] for product_id in ids.tolist()], dtype=np.float64)
+
+    keyword_masks = {}
+    for keyword, posting in keyword_postings.items():
+        mask = np.zeros(len(ids), dtype=bool)
+        mask[np.searchsorted(ids, np.frombuffer(posting, dtype=np.int64))] = True
+        keyword_masks[keyword] = mask
+
+    return ScoringState(version, ids, matrix, vocabulary, doc_lengths, keyword_masks,
+                        np.array(frequencies, dtype=np.float64), token_lengths, idf)
+
+
+def _idf(matrix, n):
+    document_frequencies = np.diff(np.asarray(matrix.indptr, dtype=np.int64)).astype(np.float64)
+    return np.log1p((n - document_frequencies + 0.5) / (document_frequencies + 0.5))
+
+
+def patch_state(state, version, changed):
+    """state with the rows of changed re-built (see ProductIndex.changes_since), same content as build_state"""
+    if not changed:
+        patched = ScoringState(version, state.ids, state.matrix, state.vocabulary, state.doc_lengths, state.keyword_masks,
+                               state.term_frequencies, state.token_lengths, state.idf, state.lineage)
+        patched._intent_masks = state._intent_masks
+        return patched
+
+    touched = np.array(sorted(changed), dtype=np.int64)
+    kept = ~np.isin(state.ids, touched)
+    present = [product_id for product_id in touched.tolist() if changed[product_id] is not None]
+
+    # Nouvelles lignes (produits ajoutés ou réindexés) : termes inconnus ajoutés en fin de vocabulaire
+    vocabulary = dict(state.vocabulary)
+    rows, columns, frequencies, token_lengths = [], [], [], []
+    for row, product_id in enumerate(present):
+        term_counts, length, _ = changed[product_id]
+        for term, count in term_counts.items():
+            rows.append(row)
+            columns.append(vocabulary.setdefault(term, len(vocabulary)))
+            frequencies.append(count)
+        token_lengths.append(length)
+    width = len(vocabulary)
+
+    old = csc_matrix((state.term_frequencies, state.matrix.indices, state.matrix.indptr),
+                     shape=state.matrix.shape).tocsr()[kept]
+    old = csr_matrix((old.data, old.indices, old.indptr), shape=(old.shape[0], width))
+    new = csr_matrix((np.array(frequencies, dtype=np.float64), (rows, columns)), shape=(len(present), width))
+
+    ids = np.concatenate([state.ids[kept], np.array(present, dtype=np.int64)])
+    order = np.argsort(ids, kind='stable')
+    ids = ids[order]
+    combined = vstack([old, new], format='csr')[order].tocsc()
+    combined.sort_indices()
+    matrix = csc_matrix((np.ones(combined.nnz, dtype=np.int32), combined.indices, combined.indptr), shape=combined.shape)
+
+    doc_lengths = np.concatenate([np.asarray(state.doc_lengths)[kept], np.bincount(rows, minlength=len(present))])[order]
+    lengths = np.concatenate([np.asarray(state.token_lengths)[kept], np.array(token_lengths, dtype=np.float64)])[order]
+
+    keyword_masks = {}
+    new_keywords = {}
+    for row, product_id in enumerate(present):
+        for keyword in changed[product_id][2]:
+            new_keywords.setdefault(keyword, []).append(row)
+    for keyword in list(state.keyword_masks) + [keyword for keyword in new_keywords if keyword not in state.keyword_masks]:
+        mask = np.zeros(len(ids), dtype=bool)
+        old_mask = state.keyword_masks.get(keyword)
+        if old_mask is not None:
+            mask[:kept.sum()] = np.asarray(old_mask)[kept]
+        mask[kept.sum() + np.array(new_keywords.get(keyword, []), dtype=np.int64)] = True
+        mask = mask[order]
+        if mask.any():
+            keyword_masks[keyword] = mask
+
+    return ScoringState(version, ids, matrix, vocabulary, doc_lengths.astype(np.int64), keyword_masks,
+                        combined.data.astype(np.float64), lengths, _idf(matrix, len(ids)), state.lineage)
+
+
+class VectorizedScorer:
+    def __init__(self, index, intent_keywords, relevance_keywords):
+        self.index = index
+        self.intent_keywords = intent_keywords
+        self.relevance_keywords = relevance_keywords
+        self._state = None
+        self._lock = threading.Lock()
+
+    def state(self, wait=False):
+        """Current ScoringState, patched or rebuilt when the index has changed.
+
+        While another thread updates it, the previous state is returned unless wait.
+        """
+        state = self._state
+        if state is not None and state.version == self.index.version:
+            return state
+        # Mise à jour en cours dans un autre thread (import...) : l'état précédent continue de servir
+        if not self._lock.acquire(blocking=state is None or wait):
+            return state
+        try:
+            state = self._state
+            if state is None or state.version != self.index.version:
+                # Artefact attaché (index_artifact.py) : tableaux memmap, rien à reconstruire
+                version, artifact = self.index.version, self.index.artifact
+                changes = self.index.changes_since(state.version) if state is not None and artifact is None else None
+                if artifact is not None:
+                    state = artifact.scoring_state(version)
+                elif changes is not None:
+                    state = patch_state(state, *changes)
+                else:
+                    state = build_state(self.index)
+                self._state = state
+            return state
+        finally:
+            self._lock.release()
+
+    def score(self, query_words, detected_intent, intent_active, row_filter=None):
+        """Score arrays for every product row (same formula as the original loop).
+
+        row_filter(state) -> bool array over rows, or None (filters); other rows are never returned.
+        """
+        state = self.state()
+        n = len(state.ids)
+
+        columns = [state.vocabulary[word] for word in query_words if word in state.vocabulary]
+        if columns:
+            overlap = np.asarray(state.matrix[:, columns].sum(axis=1)).ravel().astype(np.int64)
+        else:
+            overlap = np.zeros(n, dtype=np.int64)
+
+        # Jaccard : |q ∩ p| / |q ∪ p|, 0 si la requête ou le produit n'a aucun token
+        query_size = len(query_words)
+        union = query_size + state.doc_lengths - overlap
+        has_tokens = (state.doc_lengths > 0) & (query_size > 0)
+        jaccard = np.zeros(n, dtype=np.float64)
+        np.divide(overlap, union, out=jaccard, where=has_tokens & (union > 0))
+
+        keywords = (overlap * 2) * 2.0
+        if intent_active:
+            words, weight = self.intent_keywords.get(detected_intent, ([], 0))
+            intent = np.where(state.any_keyword_mask(words), weight, 0) * 7.0
+            semantic = 0 + jaccard * 1.0
+            total = intent + keywords + jaccard * 1.0
+        else:
+            intent = None
+            semantic = jaccard * 7.0 + jaccard * 1.0
+            total = jaccard * 7.0 + keywords + jaccard * 1.0
+
+        keep = total > 0
+        relevance_words = self.relevance_keywords.get(detected_intent) if intent_active else None
+        if relevance_words is not None:
+            keep &= state.any_keyword_mask(relevance_words)
+        allowed = row_filter(state) if row_filter is not None else None
+        if allowed is not None:
+            keep &= allowed
+
+        return {
+            "state": state,
+            "total": total,
+            "intent": intent,
+            "keywords": keywords,
+            "semantic": semantic,
+            "jaccard": jaccard,
+            "has_tokens": has_tokens,
+            "keep": keep
+        }
+
+    def top_k(self, scores, k=10, after=None):
+        """Row indices of the k best products, ordered like results.sort on the rounded score.
+
+        after = (rounded score, id) of the last product of the previous page (cursor).
+        """
+        rows = np.flatnonzero(scores["keep"])
+        if after is not None:
+            rows = _after_rounded(rows, scores["total"], scores["state"].ids, after)
+        if len(rows) == 0:
+            return []
+
+        total = scores["total"][rows]
+        if len(rows) > k:
+            # Seuil du k-ième score ; marge de 0.01 car le tri se fait sur le score arrondi
+            kth = total[np.argpartition(-total, k - 1)[k - 1]]
+            candidates = total >= kth - 0.01
+            rows, total = rows[candidates], total[candidates]
+
+        # Score arrondi décroissant, puis ligne (id) croissante : l'ordre du tri stable de l'ancienne boucle
+        order = np.lexsort((rows, -_round2(total)))
+        return rows[order[:k]].tolist()
+
+    def results(self, scores, k=10, offset=0, after=None):
+        """[(product_id, total, breakdown, ai_confidence)] for the rows offset..offset+k of the ranking"""
+        state = scores["state"]
+        ranked = []
+        for row in self.top_k(scores, offset + k, after)[offset:]:
+            if scores["intent"] is not None:
+                breakdown = {'intent': float(scores["intent"][row])}
+            else:
+                breakdown = {'semantic': float(scores["jaccard"][row] * 7.0)}
+            breakdown['keywords'] = float(scores["keywords"][row])
+            breakdown['semantic'] = float(scores["semantic"][row])
+
+            # L'ancienne boucle renvoyait l'entier 0 quand la similarité n'était pas calculable
+            confidence = round(float(scores["jaccard"][row]), 3) if scores["has_tokens"][row] else 0
+            ranked.append((int(state.ids[row]), float(scores["total"][row]), breakdown, confidence))
+        return ranked
+
+    # 🔹 BM25
+    def bm25(self, query_words, k1=BM25_K1, b=BM25_B, row_filter=None):
+        """BM25 score of every product row for the (deduplicated) query terms (0 outside row_filter)"""
+        state = self.state()
+        scores = np.zeros(len(state.ids), dtype=np.float64)
+        if not len(state.ids) or state.average_length == 0:
+            return {"state": state, "total": scores}
+
+        # k1 * (1 - b + b * |d| / avgdl) par produit
+        length_norm = k1 * (1 - b + b * state.token_lengths / state.average_length)
+        indptr, indices = state.matrix.indptr, state.matrix.indices
+        for word in query_words:
+            column = state.vocabulary.get(word)
+            if column is None:
+                continue
+            start, stop = indptr[column], indptr[column + 1]
+            rows = indices[start:stop]
+            tf = state.term_frequencies[start:stop]
+            scores[rows] += state.idf[column] * tf * (k1 + 1) / (tf + length_norm[rows])
+        allowed = row_filter(state) if row_filter is not None else None
+        if allowed is not None:
+            scores[~allowed] = 0
+        return {"state": state, "total": scores}
+
+    def bm25_results(self, scores, k=10, offset=0, after=None):
+        """[(product_id, score)] of the products offset..offset+k, best first (ties by id).
+
+        after = (score, id) of the last product of the previous page (cursor).
+        """
+        state, total = scores["state"], scores["total"]
+        rows = np.flatnonzero(total > 0)
+        if after is not None:
+            score, product_id = after
+            values = total[rows]
+            rows = rows[(values < score) | ((values == score) & (state.ids[rows] > product_id))]
+        k += offset
+        if len(rows) > k:
+            kth = total[rows][np.argpartition(-total[rows], k - 1)[k - 1]]
+            rows = rows[total[rows] >= kth]
+        # Lignes triées par id : lexsort départage les ex aequo par id croissant
+        rows = rows[np.lexsort((rows, -total[rows]))][offset:k]
+        return [(int(state.ids[row]), float(total[row])) for row in rows]
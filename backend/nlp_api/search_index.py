@@ -0,0 +1,206 @@
+"""
+🔎 Index de recherche précalculé sur le catalogue.
+
+Chaque produit est prétraité (tokenisation + lemmatisation) une seule fois,
+au chargement du catalogue, puis mis à jour produit par produit quand le
+snapshot change. Une recherche n'a plus qu'à prétraiter la requête.
+
+L'index inversé (terme -> ids produits triés, mot-clé d'intention -> ids)
+alimente la matrice creuse de scoring.py, qui score tout le catalogue en
+quelques opérations vectorisées. Pour BM25, l'index garde aussi les
+fréquences de termes et la longueur (nombre de tokens) de chaque produit.
+
+Avec un artefact précalculé (index_artifact.py), l'index est servi
+directement depuis les tableaux memmap : aucun prétraitement au démarrage.
+Les dictionnaires ne sont reconstruits qu'au premier changement de texte
+d'un produit.
+
+Une mise à jour par lot (import en masse, voir catalog_import.py) recopie
+chaque liste de postings touchée une seule fois pour tout le lot, et les
+ids modifiés à chaque version sont journalisés : la matrice de scoring
+(scoring.py) ne met à jour que ces lignes au lieu d'être reconstruite.
+"""
+import threading
+from array import array
+from collections import Counter
+
+import numpy as np
+
+from text_preprocessing import fold_accents
+
+# Versions gardées dans le journal des ids modifiés ; au-delà, reconstruction complète de l'état de scoring
+CHANGE_LOG_SIZE = 256
+
+
+def product_text(product):
+    """Text used for search: "name description category" """
+    return f"{product['name']} {product['description']} {product['category']}"
+
+
+def search_text(product):
+    """Product text lowercased without accents, where intent keywords are looked up"""
+    return fold_accents(product_text(product))
+
+
+def _merge_postings(postings, added, removed):
+    """Apply {key: [ids]} insertions and removals, copying each touched sorted posting array once"""
+    for key in list(added) + [key for key in removed if key not in added]:
+        posting = np.frombuffer(postings.get(key, array('q')), dtype=np.int64)
+        if key in removed:
+            posting = posting[~np.isin(posting, removed[key])]
+        if key in added:
+            posting = np.union1d(posting, np.array(added[key], dtype=np.int64))
+        # Nouvelle liste à chaque fois : une recherche en cours garde l'ancienne
+        if len(posting):
+            postings[key] = array('q', posting.tobytes())
+        else:
+            postings.pop(key, None)
+
+
+def _build_postings(ids_by_key):
+    return {key: array('q', sorted(ids)) for key, ids in ids_by_key.items()}
+
+
+class ProductIndex:
+    """Per-product token sets, lowercase texts and inverted index, kept in sync with the catalog"""
+
+    def __init__(self, preprocess, keywords=()):
+        self.preprocess = preprocess
+        # Sous-chaînes recherchées dans le texte produit (mots-clés des intentions)
+        self.keywords = tuple(sorted(set(keywords)))
+        self.tokens = {}            # product_id -> frozenset of lemmatized tokens
+        self.term_counts = {}       # product_id -> {term: frequency in the product text}
+        self.lengths = {}           # product_id -> number of tokens (with repetitions)
+        self.texts = {}             # product_id -> search_text (lowercase, accents folded)
+        self.postings = {}          # term -> sorted array of product ids
+        self.keyword_postings = {}  # intent keyword -> sorted array of product ids
+        self.artifact = None        # IndexArtifact serving the index until the first text change
+        self.version = 0
+        self.changes = []           # [(version, ids re-indexed or removed by that version)]
+        self.changes_base = 0       # changes_since() only knows the versions from here on
+        self._lock = threading.Lock()
+
+    def _analyze(self, product):
+        """(token set, {term: count}, token count, search text)"""
+        words = self.preprocess(product_text(product)).split()
+        counts = Counter(words)
+        return frozenset(counts), dict(counts), len(words), search_text(product)
+
+    def _matched_keywords(self, text):
+        return [keyword for keyword in self.keywords if keyword in text]
+
+    def build(self, products, version=None):
+        """(Re)build the whole index"""
+        tokens, term_counts, lengths, texts = {}, {}, {}, {}
+        term_ids, keyword_ids = {}, {}
+        for product in products:
+            product_id = product['id']
+            tokens[product_id], term_counts[product_id], lengths[product_id], texts[product_id] = self._analyze(product)
+            for term in tokens[product_id]:
+                term_ids.setdefault(term, []).append(product_id)
+            for keyword in self._matched_keywords(texts[product_id]):
+                keyword_ids.setdefault(keyword, []).append(product_id)
+
+        postings = _build_postings(term_ids)
+        keyword_postings = _build_postings(keyword_ids)
+        with self._lock:
+            self.artifact = None
+            self.tokens, self.texts = tokens, texts
+            self.term_counts, self.lengths = term_counts, lengths
+            self.postings, self.keyword_postings = postings, keyword_postings
+            self.version = version if version is not None else self.version + 1
+            self.changes, self.changes_base = [], self.version
+
+    def attach(self, artifact, products, version=None):
+        """Serve the index from a prebuilt IndexArtifact matching products (no preprocessing)"""
+        texts = {product['id']: search_text(product) for product in products}
+        with self._lock:
+            self.artifact = artifact
+            self.texts = texts
+            self.tokens, self.term_counts, self.lengths = {}, {}, {}
+            self.postings, self.keyword_postings = {}, {}
+            self.version = version if version is not None else self.version + 1
+            self.changes, self.changes_base = [], self.version
+
+    def _hydrate(self):
+        """Rebuild the dicts from the attached artifact (lock held)"""
+        if self.artifact is None:
+            return
+        self.tokens, self.term_counts, self.lengths, self.postings, self.keyword_postings = self.artifact.index_data()
+        self.artifact = None
+
+    def _unlink(self, product_id, removed_terms, removed_keywords):
+        """Forget product_id; the posting lists it leaves are collected for _merge_postings (lock held)"""
+        self.term_counts.pop(product_id, None)
+        self.lengths.pop(product_id, None)
+        for term in self.tokens.pop(product_id, ()):
+            removed_terms.setdefault(term, []).append(product_id)
+        text = self.texts.pop(product_id, None)
+        for keyword in self._matched_keywords(text or ""):
+            removed_keywords.setdefault(keyword, []).append(product_id)
+
+    def update(self, products, removed=(), version=None):
+        """Re-index changed products and drop removed ones"""
+        # Texte inchangé (prix, eco_rating...) : rien à réindexer
+        texts = self.texts
+        analyzed = {product['id']: self._analyze(product) for product in products
+                    if texts.get(product['id']) != search_text(product)}
+        removed = [product_id for product_id in removed if product_id not in analyzed]
+        with self._lock:
+            if analyzed or removed:
+                self._hydrate()
+            added_terms, added_keywords = {}, {}
+            removed_terms, removed_keywords = {}, {}
+            for product_id in list(analyzed) + removed:
+                self._unlink(product_id, removed_terms, removed_keywords)
+            for product_id, (tokens, counts, length, text) in analyzed.items():
+                self.tokens[product_id] = tokens
+                self.term_counts[product_id] = counts
+                self.lengths[product_id] = length
+                self.texts[product_id] = text
+                for term in tokens:
+                    added_terms.setdefault(term, []).append(product_id)
+                for keyword in self._matched_keywords(text):
+                    added_keywords.setdefault(keyword, []).append(product_id)
+            _merge_postings(self.postings, added_terms, removed_terms)
+            _merge_postings(self.keyword_postings, added_keywords, removed_keywords)
+
+            self.version = version if version is not None else self.version + 1
+            self.changes.append((self.version, list(analyzed) + removed))
+            if len(self.changes) > CHANGE_LOG_SIZE:
+                self.changes_base = self.changes.pop(0)[0]
+
+    def apply_change(self, change):
+        """Catalog subscriber (see CatalogSnapshot.subscribe)"""
+        if change["full"]:
+            self.build(change["upserted"], change["version"])
+        else:
+            self.update(change["upserted"], change["removed"], change["version"])
+
+    # 🔹 Lecture
+    def changes_since(self, version):
+        """(current version, {product_id: (term_counts, length, keywords) or None if removed}) of the products
+        re-indexed after version, or None if that version is too old (or an artifact is attached)"""
+        with self._lock:
+            if self.artifact is not None or version < self.changes_base or version > self.version:
+                return None
+            changed = {}
+            for change_version, product_ids in self.changes:
+                if change_version > version:
+                    changed.update(dict.fromkeys(product_ids))
+            for product_id in changed:
+                if product_id in self.term_counts:
+                    changed[product_id] = (self.term_counts[product_id], self.lengths[product_id],
+                                           self._matched_keywords(self.texts[product_id]))
+            return self.version, changed
+
+    def snapshot(self):
+        """(version, tokens, postings, keyword_postings, term_counts, lengths), copied consistently under the lock"""
+        with self._lock:
+            self._hydrate()
+            return (self.version, dict(self.tokens), dict(self.postings), dict(self.keyword_postings),
+                    dict(self.term_counts), dict(self.lengths))
+
+    def __len__(self):
+        artifact = self.artifact
+        return len(artifact) if artifact is not None else len(self.tokens)
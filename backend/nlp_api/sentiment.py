@@ -0,0 +1,319 @@
+"""
+💬 Sentiment des avis : lexique compilé une fois, avis scorés par lots.
+
+Même algorithme que TextBlob (PatternAnalyzer, lexique pattern) : moyenne de
+la polarité des mots connus, un adverbe connu ("very", "vraiment") multiplie
+la polarité du mot suivant par son intensité, une négation ("not", "pas")
+inverse l'intensité et divise le score par -2, un "!" multiplie le score
+précédent par 1.25, les émoticônes comptent comme des mots. Sans passer par
+les objets TextBlob :
+    - les lexiques anglais (textblob) et français (textblob-fr) sont chargés
+      une seule fois dans une table de hachage mot -> ligne, et leurs scores
+      dans des tableaux numpy (polarité, intensité, adverbe, négation) ;
+    - un lot d'avis est tokenisé par une seule expression régulière, les
+      mots de tout le lot sont traduits en lignes d'un coup, la langue de
+      chaque avis et les moyennes finales sont calculées par np.bincount ;
+    - seul l'enchaînement adverbe / négation reste une boucle, sur des
+      entiers.
+
+La tokenisation reproduit celle de pattern (ponctuation détachée,
+apostrophes séparées, émoticônes regroupées) sauf pour quelques cas rares
+(abréviations "U.S.", paragraphes) : les polarités restent à moins de
+SENTIMENT_TOLERANCE de TextBlob (voir benchmarks/bench_sentiment.py).
+
+Langue : avec SENTIMENT_LANGUAGE=auto, chaque avis est scoré avec le lexique
+dont il contient le plus de mots outils ("le", "est", "pas" / "the", "is",
+"not", 2 voix chacun) et de mots connus d'un seul des deux lexiques (1 voix),
+l'anglais en cas d'égalité (comportement historique).
+
+Variables d'environnement :
+    SENTIMENT_ENGINE     lexicon (défaut) | textblob (TextBlob avis par avis, anglais seulement)
+    SENTIMENT_LANGUAGE   auto (défaut) | en | fr
+"""
+import importlib.util
+import os
+import re
+import xml.etree.ElementTree as ElementTree
+
+import numpy as np
+
+SENTIMENT_ENGINE = os.getenv("SENTIMENT_ENGINE", "lexicon").lower()
+SENTIMENT_LANGUAGE = os.getenv("SENTIMENT_LANGUAGE", "auto").lower()
+SENTIMENT_TOLERANCE = 0.05
+
+# 🔹 Réglages des lexiques pattern (textblob/en/__init__.py, textblob_fr/fr.py)
+LANGUAGES = {
+    "en": {
+        "package": "textblob",
+        "path": ("en", "en-sentiment.xml"),
+        "negations": ("no", "not", "n't", "never"),
+        "modifier_suffix": "ly",
+    },
+    "fr": {
+        "package": "textblob_fr",
+        "path": ("fr-sentiment.xml",),
+        "negations": ("n'", "ne", "ni", "non", "pas", "rien", "sans", "aucun", "jamais"),
+        "modifier_suffix": "ment",
+    },
+}
+
+# Mots outils qui désignent la langue d'un avis (mots ambigus comme "a", "on", "pour" exclus)
+LANGUAGE_HINTS = {
+    "en": ("the", "is", "was", "and", "it", "this", "that", "not", "very", "but", "with", "of", "my", "they",
+           "are", "i", "you", "have", "too", "really", "would", "don", "did", "does", "product", "no", "never"),
+    "fr": ("le", "la", "les", "un", "une", "des", "du", "de", "et", "est", "c", "ce", "cette", "pas", "ne",
+           "je", "j", "il", "elle", "mais", "avec", "très", "trop", "vraiment", "qui", "que", "qu", "sur",
+           "au", "aux", "produit", "bien", "été", "ai", "n", "l", "d", "aucun", "jamais", "rien", "sans", "ni"),
+}
+
+# Ponctuation de pattern (détachée en début et fin de mot) ; guillemets et apostrophes toujours séparés
+PUNCTUATION = ".,;:!?()[]{}`'\"@#$^&*+-|=~_"
+QUOTES = "'\"“”‘’"
+
+EMOTICONS = {
+    1.00: ("<3", "♥", ">:D", ":-D", ":D", "=-D", "=D", "X-D", "x-D", "XD", "xD", "8-D"),
+    0.75: (">:P", ":-P", ":P", ":-p", ":p", ":-b", ":b", ":c)", ":o)", ":^)"),
+    0.50: (">:)", ":-)", ":)", "=)", "=]", ":]", ":}", ":>", ":3", "8)", "8-)"),
+    0.25: (">;]", ";-)", ";)", ";-]", ";]", ";D", ";^)", "*-)", "*)"),
+    0.05: (">:o", ":-O", ":O", ":o", ":-o", "o_O", "o.O", "°O°", "°o°"),
+    -0.25: (">:/", ":-/", ":/", ":\\", ">:\\", ":-.", ":-s", ":s", ":S", ":-S", ">.>"),
+    -0.75: (">:[", ":-(", ":(", "=(", ":-[", ":[", ":{", ":-<", ":c", ":-c", "=/"),
+    -1.00: (":'(", ":'''(", ";'("),
+}
+
+SARCASM = "(!)"
+EXCLAMATION = "!"
+
+
+def _token_pattern():
+    emoticons = sorted({emoticon.lower() for group in EMOTICONS.values() for emoticon in group}, key=len, reverse=True)
+    punctuation = re.escape(PUNCTUATION + "“”‘’")
+    inner = re.escape(QUOTES)
+    return re.compile(
+        r"\(\s?!\s?\)"
+        r"|(?<!\S)(?:" + "|".join(map(re.escape, emoticons)) + r")(?=\s|$)"
+        r"|\.\.\."
+        r"|[" + punctuation + r"]"
+        r"|[^\s" + punctuation + r"](?:[^\s" + inner + r"]*[^\s" + punctuation + r"])?"
+    )
+
+
+TOKEN = _token_pattern()
+
+
+def tokenize(text):
+    """Lowercase tokens of text, as pattern's find_tokens splits them"""
+    return TOKEN.findall(text.lower().replace("n't", " n't"))
+
+
+def _average(values):
+    return [sum(column) / len(values) for column in zip(*values)]
+
+
+def load_lexicon(path, language):
+    """{word: (polarity, intensity, is_modifier)} from a pattern sentiment XML, derived like pattern"""
+    senses = {}
+    for word in ElementTree.parse(path).getroot().findall("word"):
+        form = word.attrib.get("form")
+        if form:
+            scores = (float(word.attrib.get("polarity", 0.0)), float(word.attrib.get("intensity", 1.0)))
+            senses.setdefault(form, {}).setdefault(word.attrib.get("pos"), []).append(scores)
+
+    # {word: {pos: (polarity, intensity)}}, None = moyenne de toutes les catégories
+    words = {}
+    for form, by_pos in senses.items():
+        words[form] = {pos: tuple(_average(scores)) for pos, scores in by_pos.items()}
+        words[form][None] = tuple(_average(list(words[form].values())))
+
+    def annotate(word, pos, scores):
+        entry = words.setdefault(word, {})
+        entry[pos] = entry[None] = scores
+
+    if language == "en":
+        # textblob : "terrible" donne aussi l'adverbe "terribly"
+        for form, by_pos in list(words.items()):
+            if "JJ" in by_pos:
+                stem = form[:-1] + "i" if form.endswith("y") else form
+                stem = stem[:-2] if stem.endswith("le") else stem
+                annotate(stem + "ly", "RB", by_pos["JJ"])
+    elif language == "fr":
+        # textblob-fr : "précaire" aussi connu comme "precaire" (sauf mots finissant par un accent)
+        for form, by_pos in list(words.items()):
+            if not form.endswith(("à", "è", "é", "ê", "ï")):
+                folded = form.replace("à", "a").replace("é", "e").replace("è", "e").replace("ê", "e").replace("ï", "i")
+                if folded != form:
+                    for pos, scores in list(by_pos.items()):
+                        annotate(folded, pos, scores)
+
+    return {form: (by_pos[None][0], by_pos[None][1], "RB" in by_pos) for form, by_pos in words.items()}
+
+
+def lexicon_path(language):
+    """Path of the sentiment XML of language, or None if its package is not installed"""
+    settings = LANGUAGES[language]
+    spec = importlib.util.find_spec(settings["package"])
+    if spec is None or not spec.submodule_search_locations:
+        return None
+    path = os.path.join(list(spec.submodule_search_locations)[0], *settings["path"])
+    return path if os.path.exists(path) else None
+
+
+class LexiconTables:
+    """Per-language columns over the shared vocabulary, as Python lists for the scoring loop"""
+
+    def __init__(self, language, rows, lexicon, size):
+        settings = LANGUAGES[language]
+        self.language = language
+        self.modifier_suffix = settings["modifier_suffix"]
+        known = np.zeros(size, dtype=bool)
+        polarity = np.zeros(size)
+        intensity = np.ones(size)
+        modifier = np.zeros(size, dtype=bool)
+        negation = np.zeros(size, dtype=bool)
+        for word, (word_polarity, word_intensity, is_modifier) in lexicon.items():
+            row = rows[word]
+            known[row], polarity[row], intensity[row], modifier[row] = True, word_polarity, word_intensity, is_modifier
+        negation[[rows[word] for word in settings["negations"]]] = True
+        self.known, self.polarity, self.intensity = known.tolist(), polarity.tolist(), intensity.tolist()
+        self.modifier, self.negation = modifier.tolist(), negation.tolist()
+
+
+class SentimentEngine:
+    """Pattern/TextBlob polarity computed in batches over compiled lexicons"""
+
+    def __init__(self, lexicons, language=SENTIMENT_LANGUAGE):
+        # lexicons : {"en": load_lexicon(...), "fr": ...}
+        self.languages = [code for code in LANGUAGES if code in lexicons]
+        if language != "auto" and language not in lexicons:
+            raise ValueError(f"no sentiment lexicon for language '{language}'")
+        self.language = language
+
+        emoticons = {}
+        for polarity, group in EMOTICONS.items():
+            for emoticon in group:
+                emoticon = emoticon.lower()
+                # pattern ne cherche les émoticônes que parmi les tokens courts non alphabétiques
+                if not emoticon.isalpha() and len(emoticon) <= 5:
+                    emoticons.setdefault(emoticon, polarity)
+
+        words = set(emoticons) | {EXCLAMATION, SARCASM}
+        for code in self.languages:
+            words.update(lexicons[code], LANGUAGES[code]["negations"], LANGUAGE_HINTS[code])
+        self.vocabulary = {word: row for row, word in enumerate(sorted(words))}
+        size = len(self.vocabulary)
+
+        self.tables = {code: LexiconTables(code, self.vocabulary, lexicons[code], size) for code in self.languages}
+        emoticon_polarity = np.full(size, np.nan)
+        for emoticon, polarity in emoticons.items():
+            emoticon_polarity[self.vocabulary[emoticon]] = polarity
+        self.emoticon_polarity = emoticon_polarity.tolist()
+        self.exclamation = self.vocabulary[EXCLAMATION]
+        self.sarcasm = self.vocabulary[SARCASM]
+
+        # Voix pour le français (> 0) ou l'anglais (< 0) ; la case de plus sert aux mots inconnus (ligne -1)
+        self.language_votes = np.zeros(size + 1)
+        for sign, code in ((-1, "en"), (1, "fr")):
+            if code in self.tables:
+                self.language_votes[:size] += sign * np.array(self.tables[code].known)
+                for word in LANGUAGE_HINTS[code]:
+                    self.language_votes[self.vocabulary[word]] += 2 * sign
+
+    @classmethod
+    def load(cls, language=SENTIMENT_LANGUAGE):
+        """Engine over the installed lexicons (French only if textblob-fr is installed)"""
+        lexicons = {}
+        for code in LANGUAGES:
+            path = lexicon_path(code)
+            if path is not None:
+                lexicons[code] = load_lexicon(path, code)
+            elif code == "fr" and language == "auto":
+                print("⚠️ textblob-fr not installed: reviews are scored with the English lexicon only")
+        return cls(lexicons, language)
+
+    def _assessments(self, tables, rows, tokens):
+        """[polarity] of each assessed chunk of one review (pattern's Sentiment.assessments)"""
+        known, polarity, intensity = tables.known, tables.polarity, tables.intensity
+        modifier, negation, suffix = tables.modifier, tables.negation, tables.modifier_suffix
+        chunks = []       # [polarity, intensity, negated]
+        preceding = None  # adverbe connu qui précède (modifie le mot suivant)
+        negated = False   # négation qui précède
+        for row, token in zip(rows, tokens):
+            if row >= 0 and known[row]:
+                if preceding is None:
+                    chunk = [polarity[row], intensity[row], False]
+                    chunks.append(chunk)
+                else:
+                    chunk = chunks[-1]
+                    chunk[0] = max(-1.0, min(polarity[row] * chunk[1], 1.0))
+                    chunk[1] = intensity[row]
+                if negated:
+                    chunk[1] = 1.0 / chunk[1]
+                    chunk[2] = True
+                preceding = token if modifier[row] else None
+                negated = negation[row]
+                continue
+
+            if row >= 0 and negation[row]:
+                negated = True
+            elif negated and len(token.strip("'")) > 1:
+                negated = False
+            # "really not good" : la négation après un adverbe en -ly / -ment porte sur le bloc de l'adverbe
+            if negated and preceding is not None and preceding.endswith(suffix):
+                chunks[-1][2] = True
+                negated = False
+            elif preceding is not None and len(token) > 2:
+                preceding = None
+            if row == self.exclamation:
+                if chunks:
+                    chunks[-1][0] = max(-1.0, min(chunks[-1][0] * 1.25, 1.0))
+            elif row == self.sarcasm:
+                chunks.append([0.0, 1.0, False])
+            elif row >= 0 and self.emoticon_polarity[row] == self.emoticon_polarity[row]:
+                chunks.append([self.emoticon_polarity[row], 1.0, False])
+        # "not good" = légèrement négatif, "not bad" = légèrement positif
+        return [chunk[0] * -0.5 if chunk[2] else chunk[0] for chunk in chunks]
+
+    def languages_of(self, rows, owners, count):
+        """Language code of each review of a batch"""
+        if self.language != "auto" or len(self.languages) == 1:
+            return [self.language if self.language != "auto" else self.languages[0]] * count
+        votes = np.bincount(owners, weights=self.language_votes[rows], minlength=count)
+        return ["fr" if vote > 0 else "en" for vote in votes.tolist()]
+
+    def polarities(self, texts):
+        """Polarity in [-1, 1] of each text (0.0 for empty or unknown texts)"""
+        token_lists = [tokenize(text or "") for text in texts]
+        lengths = [len(tokens) for tokens in token_lists]
+        lookup = self.vocabulary.get
+        flat = [lookup(token, -1) for tokens in token_lists for token in tokens]
+        rows = np.array(flat, dtype=np.int64)
+        owners = np.repeat(np.arange(len(texts)), lengths)
+
+        languages = self.languages_of(rows, owners, len(texts))
+        chunk_owners, chunk_polarities = [], []
+        start = 0
+        for position, (tokens, length, language) in enumerate(zip(token_lists, lengths, languages)):
+            scores = self._assessments(self.tables[language], flat[start:start + length], tokens)
+            chunk_owners.extend([position] * len(scores))
+            chunk_polarities.extend(scores)
+            start += length
+
+        totals = np.bincount(chunk_owners, weights=chunk_polarities, minlength=len(texts))
+        counts = np.bincount(chunk_owners, minlength=len(texts))
+        return (totals / np.maximum(counts, 1)).tolist()
+
+    def polarity(self, text):
+        return self.polarities([text])[0]
+
+
+class TextBlobEngine:
+    """Previous behavior: one TextBlob per review (SENTIMENT_ENGINE=textblob)"""
+
+    def __init__(self, text_blob):
+        self.text_blob = text_blob
+
+    def polarities(self, texts):
+        return [self.text_blob(text or "").sentiment.polarity for text in texts]
+
+    def polarity(self, text):
+        return self.polarities([text])[0]
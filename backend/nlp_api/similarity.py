@@ -0,0 +1,299 @@
+"""
+🧠 Modèle de similarité de contenu (TF-IDF) pour /recommend?product_id=.
+
+Le TfidfVectorizer est entraîné une seule fois par version du catalogue et
+on précalcule, pour chaque produit, ses k plus proches voisins. Les
+similarités sont calculées par blocs de lignes, donc la mémoire reste en
+O(N·k) au lieu de la matrice N×N complète. Une recommandation devient une
+simple lecture dans la table des voisins.
+
+Quand le catalogue change, le modèle est mis à jour dans un thread en
+arrière-plan ; l'ancien continue de servir pendant ce temps. Des produits
+ajoutés ou modifiés (import en masse, NOTIFY) sont vectorisés avec le
+vocabulaire et l'IDF existants, leurs voisins calculés contre tout le
+catalogue, puis fusionnés dans les listes des autres produits : O(N x lot)
+au lieu d'un réentraînement en O(N²). Un rechargement complet ou une
+suppression réentraîne tout, comme avant. Si un artefact précalculé
+(index_artifact.py) correspond au catalogue, le modèle est ouvert depuis
+ses fichiers memmap au lieu d'être réentraîné.
+"""
+import os
+import threading
+
+import numpy as np
+from scipy.sparse import csr_matrix, diags, vstack
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from index_artifact import current_artifact
+from logger import get_logger
+
+SIMILAR_TOP_K = int(os.getenv("SIMILAR_TOP_K", "20"))
+# Nombre max de cellules float32 calculées par bloc (≈ 128 Mo par défaut)
+SIMILARITY_BLOCK_CELLS = int(os.getenv("SIMILARITY_BLOCK_CELLS", str(32 * 1024 * 1024)))
+
+log = get_logger("similarity")
+
+
+def combined_features(product):
+    """Text used for content similarity: category + description"""
+    return f"{product['category'] or ''} {product['description'] or ''}"
+
+
+def _top_k(block, k):
+    """(columns, scores) of the k largest values of each row of a dense block, best first"""
+    top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(block, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+def top_k_neighbors(matrix, k, block_cells=SIMILARITY_BLOCK_CELLS):
+    """(neighbors, scores) arrays of shape (N, k), computed block by block.
+
+    matrix rows must be L2-normalized so that the dot product is the cosine similarity.
+    """
+    n = matrix.shape[0]
+    k = max(0, min(k, n - 1))
+    neighbors = np.zeros((n, k), dtype=np.int32)
+    scores = np.zeros((n, k), dtype=np.float32)
+    if k == 0:
+        return neighbors, scores
+
+    block_size = max(1, min(n, block_cells // max(n, 1)))
+    transposed = matrix.T.tocsr()
+    for start in range(0, n, block_size):
+        stop = min(n, start + block_size)
+        block = (matrix[start:stop] @ transposed).toarray().astype(np.float32, copy=False)
+        # Un produit n'est jamais son propre voisin
+        block[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+        neighbors[start:stop], scores[start:stop] = _top_k(block, k)
+    return neighbors, scores
+
+
+class ContentModel:
+    """One fitted TF-IDF model and its neighbor table"""
+
+    def __init__(self, version, ids, vectorizer, matrix, neighbors, scores):
+        self.version = version
+        self.ids = ids
+        # Ids triés (cas normal, catalogue ORDER BY id) : recherche dichotomique, pas de dict par produit
+        self.row_of = None if bool(np.all(ids[:-1] < ids[1:])) else {product_id: row for row, product_id in enumerate(ids.tolist())}
+        self.vectorizer = vectorizer
+        self.matrix = matrix
+        self.neighbors = neighbors
+        self.scores = scores
+
+    @classmethod
+    def fit(cls, products, version, k=SIMILAR_TOP_K):
+        products = list(products)
+        ids = np.array([product['id'] for product in products], dtype=np.int64)
+        vectorizer = TfidfVectorizer(stop_words='english', dtype=np.float32)
+        matrix = vectorizer.fit_transform([combined_features(product) for product in products])
+        neighbors, scores = top_k_neighbors(matrix, k)
+        return cls(version, ids, vectorizer, matrix, neighbors, scores)
+
+    def row(self, product_id):
+        """Row of product_id in the model, or None"""
+        if self.row_of is not None:
+            return self.row_of.get(product_id)
+        row = int(np.searchsorted(self.ids, product_id))
+        return row if row < len(self.ids) and self.ids[row] == product_id else None
+
+    def similar_ids(self, product_id, num_recommendations):
+        """Ids of the most similar products: O(k) lookup in the neighbor table"""
+        row = self.row(product_id)
+        if row is None:
+            return None
+        return [int(self.ids[i]) for i in self.neighbors[row, :num_recommendations]]
+
+    def updated(self, products, version, k=SIMILAR_TOP_K, block_cells=SIMILARITY_BLOCK_CELLS):
+        """Model with products added or re-vectorized and their neighbors merged in (self if no vector changed).
+
+        The vocabulary and IDF of the last fit are kept. Returns None when a full fit is needed instead.
+        """
+        products = list({product['id']: product for product in products}.values())
+        if not products:
+            self.version = version
+            return self
+        vectors = self.vectorizer.transform([combined_features(product) for product in products]).astype(np.float32).tocsr()
+        matrix = self.matrix.tocsr()
+        rows = [self.row(product['id']) for product in products]
+
+        # Texte inchangé (prix, eco_rating...) : même vecteur, rien à recalculer
+        existing = [position for position, row in enumerate(rows) if row is not None]
+        if existing:
+            difference = abs(vectors[existing] - matrix[[rows[position] for position in existing]])
+            existing = [position for position, changed in zip(existing, np.asarray(difference.sum(axis=1)).ravel() > 0) if changed]
+        added = [position for position, row in enumerate(rows) if row is None]
+        if not existing and not added:
+            self.version = version
+            return self
+
+        n_old = len(self.ids)
+        n = n_old + len(added)
+        width = self.neighbors.shape[1]
+        if width != max(0, min(k, n - 1)):
+            return None
+
+        # Lignes modifiées remplacées, nouveaux produits ajoutés à la fin
+        replaced = np.array([rows[position] for position in existing], dtype=np.int64)
+        keep = np.ones(n_old, dtype=np.float32)
+        keep[replaced] = 0
+        placement = csr_matrix((np.ones(len(replaced), dtype=np.float32), (replaced, np.arange(len(replaced)))),
+                               shape=(n_old, len(replaced)))
+        matrix = vstack([diags(keep) @ matrix + placement @ vectors[existing], vectors[added]], format='csr')
+        matrix.eliminate_zeros()
+        ids = np.concatenate([np.asarray(self.ids), np.array([products[position]['id'] for position in added], dtype=np.int64)])
+        changed = np.concatenate([replaced, np.arange(n_old, n)])
+
+        neighbors = np.zeros((n, width), dtype=np.int32)
+        scores = np.zeros((n, width), dtype=np.float32)
+        neighbors[:n_old], scores[:n_old] = self.neighbors, self.scores
+        if width:
+            transposed = matrix.T.tocsr()
+
+            def full_rows(rows):
+                # Voisins de quelques lignes contre tout le catalogue
+                block_size = max(1, block_cells // max(n, 1))
+                rows_neighbors = np.zeros((len(rows), width), dtype=np.int32)
+                rows_scores = np.zeros((len(rows), width), dtype=np.float32)
+                for start in range(0, len(rows), block_size):
+                    chunk = rows[start:start + block_size]
+                    block = (matrix[chunk] @ transposed).toarray().astype(np.float32, copy=False)
+                    block[np.arange(len(chunk)), chunk] = -np.inf
+                    rows_neighbors[start:start + len(chunk)], rows_scores[start:start + len(chunk)] = _top_k(block, width)
+                return rows_neighbors, rows_scores
+
+            # 1. Produits modifiés ou ajoutés
+            changed_neighbors, changed_scores = full_rows(changed)
+
+            # 2. Produits existants : les produits modifiés ou ajoutés entrent dans leur liste s'ils font mieux
+            is_changed = np.zeros(n, dtype=bool)
+            is_changed[changed] = True
+            changed_columns = matrix[changed].T.tocsr()
+            block_size = max(1, block_cells // max(len(changed) + width, 1))
+            incomplete = []
+            for start in range(0, n_old, block_size):
+                stop = min(n_old, start + block_size)
+                similarities = (matrix[start:stop] @ changed_columns).toarray().astype(np.float32, copy=False)
+                old_neighbors = neighbors[start:stop]
+                old_scores = scores[start:stop].copy()
+                # Ancien score d'un produit modifié : périmé, remplacé par la nouvelle similarité
+                old_scores[is_changed[old_neighbors]] = -np.inf
+                candidates = np.concatenate([old_neighbors, np.broadcast_to(changed.astype(np.int32), similarities.shape)], axis=1)
+                top, top_scores = _top_k(np.concatenate([old_scores, similarities], axis=1), width)
+                # Un voisin périmé évincé laisse une place qu'un produit inconnu de la liste (score <= ancien
+                # dernier) pourrait prendre : ces lignes-là sont recalculées en entier
+                incomplete.append(start + np.flatnonzero(top_scores[:, -1] < scores[start:stop, -1]))
+                neighbors[start:stop] = np.take_along_axis(candidates, top, axis=1)
+                scores[start:stop] = top_scores
+            incomplete = np.setdiff1d(np.concatenate(incomplete), changed) if incomplete else changed[:0]
+            neighbors[incomplete], scores[incomplete] = full_rows(incomplete)
+            neighbors[changed], scores[changed] = changed_neighbors, changed_scores
+
+        return ContentModel(version, ids, self.vectorizer, matrix, neighbors, scores)
+
+    def similar_ids_online(self, product, num_recommendations):
+        """Products unknown to the model (added since the last fit): one sparse row x matrix product"""
+        vector = self.vectorizer.transform([combined_features(product)])
+        similarities = (self.matrix @ vector.T).toarray().ravel()
+        own_row = self.row(product['id'])
+        if own_row is not None:
+            similarities[own_row] = -np.inf
+        count = min(num_recommendations, len(similarities))
+        if count <= 0:
+            return []
+        top = np.argpartition(-similarities, count - 1)[:count]
+        top = top[np.argsort(-similarities[top], kind='stable')]
+        return [int(self.ids[i]) for i in top if self.ids[i] != product['id']]
+
+
+class ContentSimilarityModel:
+    """Fit-once content model following the catalog snapshot"""
+
+    def __init__(self, catalog, k=SIMILAR_TOP_K):
+        self.catalog = catalog
+        self.k = k
+        self.model = None
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._build_lock = threading.Lock()
+        self._worker = None
+
+    def _build(self):
+        with self._build_lock:
+            products = self.catalog.products()
+            version = self.catalog.version
+            if self.model is None or self.model.version != version:
+                artifact = current_artifact()
+                if artifact is not None and artifact.matches(products):
+                    self.model = artifact.content_model(version)
+                    log.info("💾 Content model loaded from %s (catalog version %d)", artifact.path, version)
+                else:
+                    self.model = ContentModel.fit(products, version, self.k)
+                    log.info("🧠 Content model fitted: %d products (catalog version %d)", len(products), version)
+            return self.model
+
+    def ensure_model(self):
+        """Current model; fitted synchronously only the very first time"""
+        model = self.model
+        if model is None:
+            model = self._build()
+        return model
+
+    def _apply_changes(self, changes):
+        """Incremental update for upserts, full refit for reloads and deletions"""
+        if any(change["full"] or change["removed"] for change in changes):
+            self._build()
+            return
+        with self._build_lock:
+            model = self.model
+            changes = [change for change in changes if change["version"] > model.version]
+            if not changes:
+                return
+            upserted = [product for change in changes for product in change["upserted"]]
+            updated = model.updated(upserted, changes[-1]["version"], self.k)
+            if updated is not None:
+                if updated is not model:
+                    log.info("🧠 Content model updated: %d products (catalog version %d)", len(upserted), updated.version)
+                self.model = updated
+                return
+        self._build()
+
+    # 🔹 Mise à jour en arrière-plan
+    def on_catalog_change(self, change):
+        """Catalog subscriber: queue the change for the background worker"""
+        if self.model is None:
+            return
+        with self._pending_lock:
+            self._pending.append(change)
+        self._dirty.set()
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._rebuild_loop, name="content-model-rebuild", daemon=True)
+            self._worker.start()
+
+    def _rebuild_loop(self):
+        # Les changements arrivés pendant une mise à jour sont appliqués ensemble au tour suivant
+        while self._dirty.is_set():
+            self._dirty.clear()
+            with self._pending_lock:
+                changes, self._pending = self._pending, []
+            try:
+                self._apply_changes(changes)
+            except Exception as e:
+                log.exception("❌ Content model rebuild failed: %s", e)
+
+    def similar_products(self, product_id, num_recommendations=3):
+        """Most similar products as catalog dicts ([] if the product is unknown)"""
+        product = self.catalog.get(product_id)
+        if product is None:
+            return []
+
+        model = self.ensure_model()
+        similar_ids = None
+        if num_recommendations <= model.neighbors.shape[1]:
+            similar_ids = model.similar_ids(product_id, num_recommendations)
+        if similar_ids is None:
+            similar_ids = model.similar_ids_online(product, num_recommendations)
+        return self.catalog.get_many(similar_ids)
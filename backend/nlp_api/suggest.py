@@ -0,0 +1,354 @@
+"""
+🔤 Autocomplétion pour /suggest : tableaux triés + recherche dichotomique.
+
+Deux index de préfixes, construits à partir du snapshot du catalogue et du
+vocabulaire lemmatisé de l'index de recherche :
+    - suggestions : termes, catégories et marques (préfixe "Marque - " du
+      nom), classés par nombre de produits puis eco_rating moyen ;
+    - produits : noms de produits, classés par eco_rating.
+
+Les clés sont en minuscules sans accents ("eco" trouve "Écologique"). Un
+préfixe correspond à une tranche contiguë du tableau trié (bisect) ; les
+meilleures entrées de la tranche sont extraites par argpartition sur un
+tableau de rangs précalculé, et mémorisées pour les préfixes courts (1 et
+2 caractères) dont les tranches sont les plus longues. Aucun prétraitement
+NLP à la requête.
+
+Quand le catalogue change, un nouvel index est dérivé en arrière-plan des
+seuls produits modifiés : leurs entrées sont retirées et réinsérées dans
+les tableaux triés (np.isin / np.searchsorted), les agrégats par catégorie
+et par marque corrigés de leur contribution, les termes dont le nombre de
+produits a changé remplacés, puis les rangs recalculés (np.lexsort).
+L'ancien continue de répondre pendant ce temps. Il n'est reconstruit en
+entier qu'après un rechargement complet du catalogue ou de l'état de
+scoring.
+
+Variables d'environnement :
+    SUGGEST_LIMIT       suggestions renvoyées par défaut (défaut 8)
+    SUGGEST_MAX_LIMIT   maximum accepté pour limit (défaut 20)
+"""
+import itertools
+import os
+import threading
+from bisect import bisect_left
+
+import numpy as np
+
+from logger import get_logger
+from text_preprocessing import fold_accents
+
+SUGGEST_LIMIT = int(os.getenv("SUGGEST_LIMIT", "8"))
+SUGGEST_MAX_LIMIT = int(os.getenv("SUGGEST_MAX_LIMIT", "20"))
+
+# Préfixes dont le top est mémorisé, et taille minimale de tranche pour le faire
+MEMOIZED_PREFIX_LENGTH = 2
+MEMOIZED_MIN_RANGE = 64
+
+# Critères de classement des entrées : (secondaire, principal)
+SORT_CRITERIA = 2
+
+log = get_logger("suggest")
+
+
+def product_brand(product):
+    """Brand from the "Brand - Product" naming convention of the catalog, or None"""
+    name = product['name'] or ""
+    brand, separator, _ = name.partition(" - ")
+    if not separator:
+        return None
+    return brand.strip() or None
+
+
+class PrefixIndex:
+    """Sorted keys with a static rank; top-k entries of any prefix, patched by entry id"""
+
+    def __init__(self, keys, payloads, ids, columns, max_limit=SUGGEST_MAX_LIMIT):
+        # Tableaux alignés triés par clé ; ids : identifiant de chaque entrée (patched),
+        # columns : critères de classement pour np.lexsort (le dernier prime), plus petit = meilleur
+        self.keys = keys
+        self.payloads = payloads
+        self.ids = ids
+        self.columns = columns
+        # lexsort est stable : à égalité, l'ordre des clés départage
+        self.ranks = np.empty(len(keys), dtype=np.int64)
+        self.ranks[np.lexsort(columns)] = np.arange(len(keys))
+        self.max_limit = max_limit
+        self._top = {}
+
+    @staticmethod
+    def _arrays(entries):
+        # entries : [(key, payload, id, (critères...))], triées par clé
+        keys = np.empty(len(entries), dtype=object)
+        keys[:] = [entry[0] for entry in entries]
+        payloads = np.empty(len(entries), dtype=object)
+        payloads[:] = [entry[1] for entry in entries]
+        ids = np.array([entry[2] for entry in entries], dtype=np.int64)
+        columns = tuple(np.array([entry[3][criterion] for entry in entries], dtype=np.float64)
+                        for criterion in range(SORT_CRITERIA))
+        return keys, payloads, ids, columns
+
+    @classmethod
+    def from_entries(cls, entries, max_limit=SUGGEST_MAX_LIMIT):
+        """entries: [(key, payload, id, (secondary, primary))], smaller criteria rank first"""
+        return cls(*cls._arrays(sorted(entries, key=lambda entry: entry[0])), max_limit=max_limit)
+
+    def patched(self, removed_ids, entries):
+        """New index without the entries of removed_ids, plus entries (same format as from_entries)"""
+        kept = ~np.isin(self.ids, np.array(list(removed_ids), dtype=np.int64))
+        keys, payloads, ids = self.keys[kept], self.payloads[kept], self.ids[kept]
+        columns = tuple(column[kept] for column in self.columns)
+        if entries:
+            new_keys, new_payloads, new_ids, new_columns = self._arrays(sorted(entries, key=lambda entry: entry[0]))
+            where = np.searchsorted(keys, new_keys)
+            keys = np.insert(keys, where, new_keys)
+            payloads = np.insert(payloads, where, new_payloads)
+            ids = np.insert(ids, where, new_ids)
+            columns = tuple(np.insert(column, where, new_column) for column, new_column in zip(columns, new_columns))
+        return PrefixIndex(keys, payloads, ids, columns, self.max_limit)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _range(self, prefix):
+        return bisect_left(self.keys, prefix), bisect_left(self.keys, prefix + "\U0010ffff")
+
+    def _best(self, lo, hi, limit):
+        ranks = self.ranks[lo:hi]
+        if len(ranks) > limit:
+            candidates = np.argpartition(ranks, limit - 1)[:limit]
+        else:
+            candidates = np.arange(len(ranks))
+        return (lo + candidates[np.argsort(ranks[candidates])]).tolist()
+
+    def complete(self, prefix, limit):
+        """Payloads of the best entries whose key starts with prefix"""
+        lo, hi = self._range(prefix)
+        if hi <= lo:
+            return []
+        if limit <= self.max_limit and len(prefix) <= MEMOIZED_PREFIX_LENGTH and hi - lo >= MEMOIZED_MIN_RANGE:
+            top = self._top.get(prefix)
+            if top is None:
+                top = self._top[prefix] = self._best(lo, hi, self.max_limit)
+        else:
+            top = self._best(lo, hi, limit)
+        return [self.payloads[position] for position in top[:limit]]
+
+
+def product_entry(product):
+    """Entry of the product-name index for product, or None when it has no name"""
+    key = fold_accents(product['name'] or "").strip()
+    if not key:
+        return None
+    eco_rating = product['eco_rating'] or 0.0
+    return (key, {
+        "id": product['id'],
+        "name": product['name'],
+        "category": product['category'],
+        "eco_rating": product['eco_rating']
+    }, product['id'], (product['id'], -eco_rating))
+
+
+def term_entry(term, column, count):
+    return (term + "\x00term", {"text": term, "type": "term", "count": count}, column, (0.0, -count))
+
+
+class SuggestIndex:
+    """Suggestion and product-name prefix indexes for one catalog version"""
+
+    def __init__(self, version, suggestions, products):
+        self.version = version
+        self.suggestions = suggestions
+        self.products = products
+        # Agrégats dont patched() dérive l'index suivant (passés de l'un à l'autre)
+        self.lineage = None        # ScoringState.lineage du vocabulaire indexé
+        self.terms = []            # colonne -> terme
+        self.term_counts = np.zeros(0, dtype=np.int64)
+        self.groups = {}           # (clé, type) -> [texte, nombre de produits, somme des eco_rating]
+        self.group_ids = {}        # (clé, type) -> id d'entrée, négatif (les termes ont leur colonne)
+        self.contributions = {}    # product_id -> ([(clé, type)], eco_rating)
+
+    def _add_product(self, product):
+        eco_rating = product['eco_rating'] or 0.0
+        keys = []
+        for text, kind in ((product['category'], "category"), (product_brand(product), "brand")):
+            if text:
+                key = (fold_accents(text), kind)
+                group = self.groups.setdefault(key, [text, 0, 0.0])
+                group[1] += 1
+                group[2] += eco_rating
+                self.group_ids.setdefault(key, -1 - len(self.group_ids))
+                keys.append(key)
+        self.contributions[product['id']] = (keys, eco_rating)
+        return keys
+
+    def _remove_product(self, product_id):
+        keys, eco_rating = self.contributions.pop(product_id, ((), 0.0))
+        for key in keys:
+            group = self.groups[key]
+            group[1] -= 1
+            group[2] -= eco_rating
+        return keys
+
+    def _group_entry(self, key):
+        text, count, eco_total = self.groups[key]
+        payload = {"text": text, "type": key[1], "count": count}
+        return (key[0] + "\x00" + key[1], payload, self.group_ids[key], (-eco_total / count, -count))
+
+    def _follow(self, state):
+        # Vocabulaire et df (longueur des postings, colonnes de la matrice CSC) de state
+        self.lineage = state.lineage
+        self.term_counts = np.diff(np.asarray(state.matrix.indptr)).astype(np.int64)
+
+    @classmethod
+    def build(cls, products, state, version):
+        """products: catalog snapshot; state: ScoringState (lemmatized vocabulary and document frequencies)"""
+        index = cls(version, None, None)
+        index._follow(state)
+        index.terms = [None] * len(state.vocabulary)
+        for term, column in state.vocabulary.items():
+            index.terms[column] = term
+
+        product_entries = []
+        for product in products:
+            index._add_product(product)
+            entry = product_entry(product)
+            if entry is not None:
+                product_entries.append(entry)
+
+        # Clés "texte\x00type" : l'ordre des clés départage les égalités comme (texte, type)
+        suggestion_entries = [term_entry(index.terms[column], column, int(index.term_counts[column]))
+                              for column in np.flatnonzero(index.term_counts).tolist()]
+        suggestion_entries += [index._group_entry(key) for key in index.groups]
+        index.suggestions = PrefixIndex.from_entries(suggestion_entries)
+        index.products = PrefixIndex.from_entries(product_entries)
+        return index
+
+    def patched(self, changes, state, version):
+        """Index with changes ({product_id: product, or None when removed}) applied, following state.
+
+        Returns None when state does not derive from the indexed vocabulary by patch_state: build() instead.
+        The aggregates are handed over to the new index, this one can no longer be patched.
+        """
+        if self.contributions is None or state.lineage is not self.lineage or len(state.vocabulary) < len(self.terms):
+            return None
+        # patch_state ajoute les nouveaux termes en fin de dictionnaire : ordre d'insertion = colonnes
+        terms = self.terms
+        for offset, term in enumerate(itertools.islice(state.vocabulary, len(terms), None)):
+            if state.vocabulary[term] != len(terms) + offset:
+                return None
+        index = SuggestIndex(version, None, None)
+        index.terms, index.groups, index.group_ids, index.contributions = terms, self.groups, self.group_ids, self.contributions
+        self.contributions = None
+        terms.extend(itertools.islice(state.vocabulary, len(terms), None))
+        index._follow(state)
+
+        # Termes : seules les colonnes dont le df a changé sont remplacées
+        previous = np.zeros(len(index.term_counts), dtype=np.int64)
+        previous[:len(self.term_counts)] = self.term_counts
+        changed_columns = np.flatnonzero(index.term_counts != previous).tolist()
+        removed_entries = list(changed_columns)
+        suggestion_entries = [term_entry(terms[column], column, int(index.term_counts[column]))
+                              for column in changed_columns if index.term_counts[column]]
+
+        # Catégories et marques : contributions des produits modifiés retirées puis ajoutées
+        changed_groups = set()
+        for product_id in changes:
+            changed_groups.update(index._remove_product(product_id))
+        product_entries = []
+        for product in changes.values():
+            if product is not None:
+                changed_groups.update(index._add_product(product))
+                entry = product_entry(product)
+                if entry is not None:
+                    product_entries.append(entry)
+        for key in changed_groups:
+            removed_entries.append(index.group_ids[key])
+            if index.groups[key][1] > 0:
+                suggestion_entries.append(index._group_entry(key))
+            else:
+                del index.groups[key]
+
+        index.suggestions = self.suggestions.patched(removed_entries, suggestion_entries)
+        index.products = self.products.patched(changes, product_entries)
+        return index
+
+    def suggest(self, query, limit=SUGGEST_LIMIT):
+        prefix = fold_accents(query).lstrip()
+        if not prefix:
+            return {"suggestions": [], "products": []}
+        return {
+            "suggestions": self.suggestions.complete(prefix, limit),
+            "products": self.products.complete(prefix, limit)
+        }
+
+
+class Suggester:
+    """SuggestIndex following the catalog snapshot; patched in the background on changes"""
+
+    def __init__(self, catalog, scorer):
+        self.catalog = catalog
+        self.scorer = scorer
+        self.index = None
+        self._dirty = False
+        self._changes = {}          # product_id -> produit (None si supprimé) depuis le dernier build
+        self._full = False          # rechargement complet depuis le dernier build
+        self._worker_lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._worker = None
+
+    def _build(self):
+        with self._build_lock:
+            with self._worker_lock:
+                changes, full = self._changes, self._full
+                self._changes, self._full = {}, False
+            # Vocabulaire à jour de l'index de recherche (on attend une mise à jour en cours), versionné comme lui
+            state = self.scorer.state(wait=True)
+            index = self.index
+            if index is not None and not full and (changes or index.version != state.version):
+                index = index.patched(changes, state, state.version) or SuggestIndex.build(
+                    self.catalog.products(), state, state.version)
+            elif index is None or full:
+                index = SuggestIndex.build(self.catalog.products(), state, state.version)
+            self.index = index
+            return index
+
+    def ensure_index(self):
+        """Current index; built synchronously only the very first time"""
+        index = self.index
+        if index is None:
+            index = self._build()
+        return index
+
+    def on_catalog_change(self, change):
+        """Catalog subscriber: record the changed products and schedule a background patch"""
+        with self._worker_lock:
+            # Relevé même avant le premier build : le worker ne doit perdre aucun changement
+            if change["full"]:
+                self._changes, self._full = {}, True
+            elif not self._full:
+                for product in change["upserted"]:
+                    self._changes[product['id']] = product
+                for product_id in change["removed"]:
+                    self._changes[product_id] = None
+            if self.index is None:
+                return
+            self._dirty = True
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._rebuild_loop, name="suggest-rebuild", daemon=True)
+                self._worker.start()
+
+    def _rebuild_loop(self):
+        while True:
+            # Sortie décidée sous le verrou : un changement signalé ensuite démarre un nouveau worker
+            with self._worker_lock:
+                if not self._dirty:
+                    self._worker = None
+                    return
+                self._dirty = False
+            try:
+                self._build()
+            except Exception as e:
+                log.exception("❌ Suggest index rebuild failed: %s", e)
+
+    def suggest(self, query, limit=SUGGEST_LIMIT):
+        return self.ensure_index().suggest(query, limit)
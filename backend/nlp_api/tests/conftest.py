@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Les modules du service sont importés à plat, comme depuis backend/nlp_api
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
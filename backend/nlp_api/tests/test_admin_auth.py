@@ -0,0 +1,35 @@
+"""
+🧪 Jeton des routes d'administration (admin_auth.py).
+
+Usage (depuis backend/nlp_api) :
+    python -m pytest tests/test_admin_auth.py
+"""
+import pytest
+from flask import Flask
+
+import admin_auth
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+
+    @app.route("/catalog/import", methods=["POST"])
+    @admin_auth.admin_required
+    def import_catalog():
+        return "imported", 200
+
+    return app.test_client()
+
+
+def test_disabled_without_configured_token(client, monkeypatch):
+    monkeypatch.setattr(admin_auth, "NLP_ADMIN_TOKEN", "")
+    assert client.post("/catalog/import", headers={"Authorization": "Bearer "}).status_code == 403
+
+
+def test_token_required(client, monkeypatch):
+    monkeypatch.setattr(admin_auth, "NLP_ADMIN_TOKEN", "s3cret")
+    assert client.post("/catalog/import").status_code == 401
+    assert client.post("/catalog/import", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.post("/catalog/import", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+    assert client.post("/catalog/import", headers={"X-Admin-Token": "s3cret"}).status_code == 200
@@ -0,0 +1,73 @@
+"""
+🧪 Import CSV (catalog_import.py) sur une vraie base PostgreSQL.
+
+La table "Products" est recréée : à lancer uniquement sur une base jetable.
+
+Usage (depuis backend/nlp_api) :
+    CATALOG_IMPORT_TEST_DATABASE_URL=postgresql://... python -m pytest tests/test_catalog_import.py
+"""
+import io
+import os
+
+import pytest
+
+DATABASE_URL = os.getenv("CATALOG_IMPORT_TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="CATALOG_IMPORT_TEST_DATABASE_URL not set")
+
+HEADER = "name,description,price,category,eco_rating,image_url,brand,certifications,tags,source_url\n"
+
+
+@pytest.fixture
+def connection():
+    import psycopg2
+
+    connection = psycopg2.connect(DATABASE_URL)
+    with connection.cursor() as cursor:
+        cursor.execute('DROP TABLE IF EXISTS "Products";')
+        cursor.execute(
+            'CREATE TABLE "Products" (id serial PRIMARY KEY, name varchar(255) NOT NULL, description text NOT NULL, '
+            'price double precision NOT NULL, category varchar(255) NOT NULL, eco_rating double precision NOT NULL, '
+            'image_url text NOT NULL, views integer NOT NULL DEFAULT 0, brand text, certifications text, tags text, '
+            'source_url text, "createdAt" timestamptz NOT NULL, "updatedAt" timestamptz NOT NULL);'
+        )
+        cursor.execute(
+            'INSERT INTO "Products" (name, description, price, category, eco_rating, image_url, brand, "createdAt", "updatedAt") '
+            "VALUES ('Bamboo toothbrush', 'Old', 3.0, 'hygiène', 4.0, '', 'EcoBrush', now(), now());"
+        )
+    connection.commit()
+    yield connection
+    with connection.cursor() as cursor:
+        cursor.execute('DROP TABLE IF EXISTS "Products";')
+    connection.commit()
+    connection.close()
+
+
+def run_import(connection, csv_text, chunk_size=100):
+    from catalog_import import CatalogImporter
+
+    return CatalogImporter(connection, snapshot=None).run(io.StringIO(HEADER + csv_text), chunk_size)
+
+
+def products(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT name, brand, description, price FROM "Products" ORDER BY id;')
+        return cursor.fetchall()
+
+
+def test_rows_matching_the_same_product_update_it_once(connection):
+    # Même produit existant, désigné sans marque puis avec la sienne : mis à jour, jamais recréé
+    stats = run_import(connection,
+                       "Bamboo toothbrush,Without brand,3.5,hygiène,4.5,,,,,\n"
+                       "Bamboo toothbrush,With brand,3.9,hygiène,4.5,,EcoBrush,,,\n")
+
+    assert (stats["created"], stats["updated"]) == (0, 1)
+    assert products(connection) == [("Bamboo toothbrush", "EcoBrush", "With brand", 3.9)]
+
+
+def test_duplicate_new_product_is_created_once(connection):
+    stats = run_import(connection,
+                       "Glass bottle,First,15,cuisine,4.1,,Verre,,,\n"
+                       "Glass bottle,Second,16,cuisine,4.1,,Verre,,,\n")
+
+    assert (stats["created"], stats["updated"]) == (1, 0)
+    assert products(connection)[1:] == [("Glass bottle", "Verre", "Second", 16.0)]
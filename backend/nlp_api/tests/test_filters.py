@@ -0,0 +1,50 @@
+"""
+🧪 Pagination et colonnes de filtres de /ai-search : limit >= 1, colonnes
+patchées à partir des produits modifiés.
+
+Usage (depuis backend/nlp_api) :
+    python -m pytest tests/test_filters.py
+"""
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from catalog import CatalogSnapshot
+from filters import CatalogFilters, Page, SearchFilters
+from scoring import VectorizedScorer
+from search_index import ProductIndex
+
+PRODUCTS = [
+    {"id": 1, "name": "Bamboo toothbrush", "description": "", "category": "Hygiène", "price": 3.5, "eco_rating": 4.5},
+    {"id": 2, "name": "Glass bottle", "description": "", "category": "Cuisine", "price": 15.0, "eco_rating": 4.1},
+]
+
+
+@pytest.mark.parametrize("limit", ["0", "-1", "101"])
+def test_limit_out_of_range_is_rejected(limit):
+    with pytest.raises(ValueError):
+        Page.from_args(MultiDict({"limit": limit}), "search")
+
+
+def test_offset_zero_is_accepted():
+    assert Page.from_args(MultiDict({"offset": "0", "limit": "1"}), "search")[:2] == (0, 1)
+
+
+def test_columns_follow_changed_products(monkeypatch):
+    catalog = CatalogSnapshot(loader=lambda product_ids=None: [dict(product) for product in PRODUCTS], ttl=0)
+    index = ProductIndex(lambda text: " ".join(text.lower().split()))
+    catalog.subscribe(index.apply_change)
+    scorer = VectorizedScorer(index, {}, {})
+    catalog_filters = CatalogFilters(catalog)
+    catalog.subscribe(catalog_filters.on_catalog_change)
+    catalog.products()
+    catalog_filters.columns(scorer.state())
+
+    catalog.patch_products({1: {"price": 30.0}})
+    catalog.apply_changes([{"id": 3, "name": "Wooden board", "description": "", "category": "cuisine", "price": 20.0,
+                            "eco_rating": 4.0}], [2])
+    monkeypatch.setattr(catalog, "products", lambda: pytest.fail("full rebuild"))
+    state = scorer.state()
+    mask = catalog_filters.mask(state, SearchFilters(("cuisine",), 10.0, None, None))
+
+    assert state.ids[mask].tolist() == [3]
+    assert catalog_filters.mask(state, SearchFilters((), 25.0, None, None)).tolist() == [True, False]
@@ -0,0 +1,22 @@
+"""
+🧪 Détection d'intention compilée (intent.py).
+
+Usage (depuis backend/nlp_api) :
+    python -m pytest tests/test_intent.py
+"""
+from intent import IntentDetector, fold_pattern
+
+
+def test_fold_pattern_keeps_escapes():
+    assert fold_pattern(r"\b(Hygiène|soin)\b") == r"\b(hygiene|soin)\b"
+    assert fold_pattern(r"\Bss\S+\W\D") == r"\Bss\S+\W\D"
+
+
+def test_accents_and_uppercase_escapes():
+    detector = IntentDetector({"oral_care": [r"\b(hygiène buccale|dentifrice)\b"], "refill": [r"\Brecharge\b"]},
+                              {}, lambda text: text)
+
+    assert detector.scores("Hygiene buccale et dentifrice") == {"oral_care": 6, "refill": 0}
+    # \B : "recharge" seulement au milieu d'un mot
+    assert detector.scores("recharge")["refill"] == 0
+    assert detector.scores("autorecharge")["refill"] == 3
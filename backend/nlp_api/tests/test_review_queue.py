@@ -0,0 +1,104 @@
+"""
+🧪 File d'avis (review_queue.py) : journal SQLite, workers, reprise après erreur.
+
+PostgreSQL et le moteur de sentiment sont remplacés par des fonctions de test.
+
+Usage (depuis backend/nlp_api) :
+    python -m pytest tests/test_review_queue.py
+"""
+import contextlib
+import time
+
+import psycopg2
+import pytest
+
+import review_queue
+from review_queue import ReviewQueue
+from reviews import replay_changes
+
+
+@pytest.fixture
+def ratings(monkeypatch):
+    """Products table stand-in: {product_id: eco_rating}; ratings.failures = errors raised by the next applies"""
+    class Ratings(dict):
+        pass
+
+    ratings = Ratings({1: 3.0})
+    ratings.failures = []
+
+    def apply_rating_changes(connection, changes_by_product):
+        if ratings.failures:
+            raise ratings.failures.pop(0)
+        updated = {}
+        for product_id, changes in changes_by_product.items():
+            if product_id in ratings:
+                ratings[product_id] = replay_changes(ratings[product_id], changes)
+                updated[product_id] = ratings[product_id]
+        return updated, [product_id for product_id in changes_by_product if product_id not in ratings]
+
+    monkeypatch.setattr(review_queue, "review_polarities", lambda texts: [0.8 if "great" in text else -0.8 for text in texts])
+    monkeypatch.setattr(review_queue, "apply_rating_changes", apply_rating_changes)
+    monkeypatch.setattr(review_queue.db, "connection", contextlib.nullcontext)
+    return ratings
+
+
+def queue(tmp_path, **options):
+    queue = ReviewQueue(path=str(tmp_path / "reviews.sqlite3"), workers=1, retry_backoff=0.05, **options)
+    queue.start()
+    return queue
+
+
+def wait_for(queue, job_id, statuses, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.status(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} still {queue.status(job_id)['status']}")
+
+
+def test_enqueue_process_status(tmp_path, ratings):
+    updates = []
+    reviews = queue(tmp_path, on_updated=updates.append)
+    try:
+        job_id = reviews.enqueue(1, "great toothbrush")
+        missing_id = reviews.enqueue(404, "great bottle")
+        job = wait_for(reviews, job_id, ("done",))
+        missing = wait_for(reviews, missing_id, ("not_found",))
+    finally:
+        reviews.stop()
+
+    assert (job["change"], job["eco_rating"], job["attempts"]) == (1, 4.0, 1)
+    assert missing["eco_rating"] is None
+    assert ratings[1] == 4.0
+    assert updates == [{1: 4.0}]
+
+
+def test_transient_failure_is_retried(tmp_path, ratings):
+    ratings.failures = [psycopg2.OperationalError("server closed the connection"), review_queue.db.PoolTimeout()]
+    reviews = queue(tmp_path)
+    try:
+        job_id = reviews.enqueue(1, "great toothbrush")
+        job = wait_for(reviews, job_id, ("done", "failed"))
+    finally:
+        reviews.stop()
+
+    assert (job["status"], job["attempts"], job["eco_rating"]) == ("done", 3, 4.0)
+    assert ratings[1] == 4.0
+
+
+def test_failed_after_max_attempts_or_on_other_errors(tmp_path, ratings):
+    ratings.failures = [psycopg2.OperationalError("down")] * 2 + [ValueError("bad row")]
+    reviews = queue(tmp_path, max_attempts=2)
+    try:
+        exhausted_id = reviews.enqueue(1, "great toothbrush")
+        exhausted = wait_for(reviews, exhausted_id, ("done", "failed"))
+        broken_id = reviews.enqueue(1, "awful bottle")
+        broken = wait_for(reviews, broken_id, ("done", "failed"))
+    finally:
+        reviews.stop()
+
+    assert (exhausted["status"], exhausted["attempts"], exhausted["error"]) == ("failed", 2, "down")
+    assert (broken["status"], broken["attempts"], broken["error"]) == ("failed", 1, "bad row")
+    assert ratings[1] == 3.0
@@ -0,0 +1,70 @@
+"""
+🧪 Mise à jour groupée de eco_rating (reviews.py) : les deltas rejoués pour
+un lot donnent la même note que les avis appliqués un par un.
+
+Le test sur PostgreSQL recrée la table "Products" : il utilise la même base
+jetable que test_catalog_import.py et est ignoré sans elle.
+
+Usage (depuis backend/nlp_api) :
+    CATALOG_IMPORT_TEST_DATABASE_URL=postgresql://... python -m pytest tests/test_reviews.py
+"""
+import os
+
+import pytest
+
+from reviews import apply_rating_changes, rating_change, replay_changes
+
+DATABASE_URL = os.getenv("CATALOG_IMPORT_TEST_DATABASE_URL")
+
+
+def one_by_one(eco_rating, changes):
+    """/analyze_review once per review: UPDATE ... WHERE eco_rating < 5 (or > 1) for each one"""
+    for change in changes:
+        if change == 1 and eco_rating < 5:
+            eco_rating += 1
+        if change == -1 and eco_rating > 1:
+            eco_rating -= 1
+    return eco_rating
+
+
+@pytest.mark.parametrize("polarity, change", [(0.5, 1), (0.1, 0), (0.0, 0), (-0.1, 0), (-0.6, -1)])
+def test_rating_change_thresholds(polarity, change):
+    assert rating_change(polarity) == change
+
+
+@pytest.mark.parametrize("eco_rating, changes, expected", [
+    (3.0, [], 3.0),
+    (4.0, [1, 1, 1], 5.0),         # plafonné à 5
+    (2.0, [-1, -1, -1], 1.0),      # plancher à 1
+    (5.0, [1, -1], 4.0),           # le +1 bloqué au plafond n'est pas rattrapé
+    (1.0, [-1, 1, 0, 1], 3.0),
+    (3.5, [1, 1], 5.5),            # garde sur la note avant l'avis, comme /analyze_review
+])
+def test_replay_matches_reviews_applied_one_by_one(eco_rating, changes, expected):
+    assert replay_changes(eco_rating, changes) == expected == one_by_one(eco_rating, changes)
+
+
+@pytest.mark.skipif(not DATABASE_URL, reason="CATALOG_IMPORT_TEST_DATABASE_URL not set")
+def test_apply_rating_changes_updates_only_changed_products():
+    import psycopg2
+
+    connection = psycopg2.connect(DATABASE_URL)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS "Products";')
+            cursor.execute('CREATE TABLE "Products" (id serial PRIMARY KEY, eco_rating double precision NOT NULL);')
+            cursor.execute('INSERT INTO "Products" (id, eco_rating) VALUES (1, 4.0), (2, 1.0), (3, 5.0), (4, 3.0);')
+        connection.commit()
+
+        updated, missing = apply_rating_changes(connection, {1: [1, 1, 1], 2: [-1, 1], 3: [1, -1], 4: [1, -1], 99: [1]})
+
+        assert updated == {1: 5.0, 2: 2.0, 3: 4.0}
+        assert missing == [99]
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT id, eco_rating FROM "Products" ORDER BY id;')
+            assert cursor.fetchall() == [(1, 5.0), (2, 2.0), (3, 4.0), (4, 3.0)]
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS "Products";')
+        connection.commit()
+        connection.close()
@@ -0,0 +1,99 @@
+"""
+🧪 VectorizedScorer (scoring.py) contre la boucle produit par produit qu'il
+remplace : mêmes produits, même ordre, mêmes scores arrondis.
+
+Usage (depuis backend/nlp_api) :
+    python -m pytest tests/test_scoring.py
+"""
+import random
+
+import pytest
+
+from scoring import VectorizedScorer
+from search_index import ProductIndex
+
+WORDS = ["bamboo", "toothbrush", "glass", "bottle", "organic", "cotton", "solar", "charger", "reusable", "bag",
+         "soap", "shampoo", "wood", "board", "kids", "toy", "recycled", "paper"]
+INTENT_KEYWORDS = {
+    "hygiene": (["toothbrush", "soap", "shampoo"], 1.0),
+    "kitchen": (["bottle", "board", "glass"], 0.8),
+}
+RELEVANCE_KEYWORDS = {"hygiene": ["toothbrush", "soap", "shampoo", "bamboo"]}
+
+
+def catalog(seed=0, size=300):
+    rng = random.Random(seed)
+    return [{"id": product_id,
+             "name": " ".join(rng.choices(WORDS, k=rng.randint(1, 3))),
+             "description": " ".join(rng.choices(WORDS, k=rng.randint(0, 6))),
+             "category": rng.choice(["hygiène", "cuisine", "jouets"])}
+            for product_id in rng.sample(range(1, 10000), size)]
+
+
+def indexed(products):
+    keywords = [word for words, _ in INTENT_KEYWORDS.values() for word in words]
+    keywords += [word for words in RELEVANCE_KEYWORDS.values() for word in words]
+    index = ProductIndex(lambda text: " ".join(text.lower().split()), keywords)
+    index.build(products)
+    return index
+
+
+def loop_ranking(index, products, query_words, detected_intent, intent_active, k=10):
+    """The /ai-search loop before vectorization: one product at a time, stable sort on the rounded score"""
+    intent_words, intent_weight = INTENT_KEYWORDS.get(detected_intent, ([], 0)) if intent_active else ([], 0)
+    relevance_words = RELEVANCE_KEYWORDS.get(detected_intent) if intent_active else None
+    results = []
+    for product in sorted(products, key=lambda product: product['id']):
+        product_words = index.tokens[product['id']]
+        product_text = index.texts[product['id']]
+        semantic_score = 0
+        if query_words and product_words:
+            union = len(query_words | product_words)
+            semantic_score = len(query_words & product_words) / union if union > 0 else 0
+
+        total_score = 0
+        if intent_active:
+            total_score += (intent_weight if any(word in product_text for word in intent_words) else 0) * 7.0
+        else:
+            total_score += semantic_score * 7.0
+        total_score += len(query_words & product_words) * 2 * 2.0
+        total_score += semantic_score * 1.0
+
+        is_relevant = relevance_words is None or any(keyword in product_text for keyword in relevance_words)
+        if total_score > 0 and is_relevant:
+            results.append((product['id'], round(total_score, 2), round(semantic_score, 3)))
+    results.sort(key=lambda result: result[1], reverse=True)
+    return results[:k]
+
+
+@pytest.mark.parametrize("query, detected_intent, intent_active", [
+    ("bamboo toothbrush", "hygiene", True),
+    ("glass bottle", "kitchen", True),
+    ("organic cotton bag", "general", False),
+    ("solar", "general", False),
+    ("kids wood toy", "hygiene", True),
+    ("unknown words only", "general", False),
+])
+def test_vectorized_ranking_matches_the_loop(query, detected_intent, intent_active):
+    products = catalog()
+    index = indexed(products)
+    scorer = VectorizedScorer(index, INTENT_KEYWORDS, RELEVANCE_KEYWORDS)
+    query_words = set(query.split())
+
+    ranked = scorer.results(scorer.score(query_words, detected_intent, intent_active))
+
+    assert [(product_id, round(total, 2), confidence) for product_id, total, _, confidence in ranked] == \
+        loop_ranking(index, products, query_words, detected_intent, intent_active)
+
+
+def test_pages_follow_the_loop_ordering():
+    products = catalog(seed=1)
+    index = indexed(products)
+    scorer = VectorizedScorer(index, INTENT_KEYWORDS, RELEVANCE_KEYWORDS)
+    query_words = {"bamboo", "bag", "soap"}
+    scores = scorer.score(query_words, "general", False)
+
+    expected = [product_id for product_id, _, _ in loop_ranking(index, products, query_words, "general", False, k=60)]
+    pages = [product_id for offset in range(0, 60, 20)
+             for product_id, _, _, _ in scorer.results(scores, k=20, offset=offset)]
+    assert pages == expected
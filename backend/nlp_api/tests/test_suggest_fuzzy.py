@@ -0,0 +1,114 @@
+"""
+🧪 /suggest et la correction orthographique suivent le vocabulaire de l'index
+de recherche, y compris quand la matrice de scoring est encore en cours de
+mise à jour au moment de leur reconstruction, et sont patchés à partir des
+produits modifiés sans reconstruction complète.
+
+Usage (depuis backend/nlp_api) :
+    python -m pytest tests/test_suggest_fuzzy.py
+"""
+import threading
+
+from catalog import CatalogSnapshot
+from fuzzy import FuzzyTermIndex, TermCorrector
+from scoring import VectorizedScorer
+from search_index import ProductIndex
+from suggest import Suggester, SuggestIndex
+
+PRODUCTS = [
+    {"id": 1, "name": "EcoBrush - Bamboo toothbrush", "description": "Biodegradable toothbrush for teeth",
+     "category": "hygiène", "price": 3.5, "eco_rating": 4.5},
+    {"id": 2, "name": "Verre - Glass bottle", "description": "Reusable glass bottle for water",
+     "category": "cuisine", "price": 15.0, "eco_rating": 4.1},
+]
+NEW_PRODUCT = {"id": 3, "name": "Atelier - Zebrawood cutting board", "description": "Solid zebrawood board",
+               "category": "cuisine", "price": 30.0, "eco_rating": 4.0}
+
+
+def service():
+    catalog = CatalogSnapshot(loader=lambda product_ids=None: [dict(product) for product in PRODUCTS], ttl=0)
+    index = ProductIndex(lambda text: " ".join(text.lower().split()))
+    catalog.subscribe(index.apply_change)
+    scorer = VectorizedScorer(index, {}, {})
+    suggester = Suggester(catalog, scorer)
+    corrector = TermCorrector(scorer)
+    catalog.subscribe(suggester.on_catalog_change)
+    catalog.subscribe(corrector.on_catalog_change)
+    catalog.products()
+    suggester.ensure_index()
+    corrector.ensure_index()
+    return catalog, scorer, suggester, corrector
+
+
+def wait_rebuilt(*indexes):
+    """Join the background rebuild workers (a worker that already finished is None)"""
+    for index in indexes:
+        worker = index._worker
+        if worker is not None:
+            worker.join()
+
+
+def suggested_terms(suggester, prefix):
+    return [entry["text"] for entry in suggester.suggest(prefix)["suggestions"] if entry["type"] == "term"]
+
+
+def test_new_term_is_suggested_and_corrected():
+    catalog, scorer, suggester, corrector = service()
+    assert suggested_terms(suggester, "zebra") == []
+
+    version = catalog.apply_changes([NEW_PRODUCT])
+    wait_rebuilt(suggester, corrector)
+
+    assert suggester.index.version == version
+    assert suggested_terms(suggester, "zebra") == ["zebrawood"]
+    assert corrector.corrections({"zebrawod"}, scorer.state().vocabulary) == {"zebrawod": "zebrawood"}
+
+
+def test_rebuild_waits_for_a_scoring_update_in_progress():
+    catalog, scorer, suggester, corrector = service()
+
+    # Une autre requête met à jour la matrice de scoring pendant que les index se reconstruisent
+    scorer._lock.acquire()
+    catalog.apply_changes([NEW_PRODUCT])
+    releaser = threading.Timer(0.2, scorer._lock.release)
+    releaser.start()
+    wait_rebuilt(suggester, corrector)
+    releaser.join()
+
+    assert suggested_terms(suggester, "zebra") == ["zebrawood"]
+    assert corrector.index.version == scorer.state().version
+    assert corrector.corrections({"zebrawod"}, scorer.state().vocabulary) == {"zebrawod": "zebrawood"}
+
+
+def test_changes_are_patched_without_a_full_rebuild(monkeypatch):
+    catalog, scorer, suggester, corrector = service()
+
+    def full_rebuild(*args, **kwargs):
+        raise AssertionError("full rebuild")
+
+    monkeypatch.setattr(SuggestIndex, "build", full_rebuild)
+    monkeypatch.setattr(FuzzyTermIndex, "build", full_rebuild)
+    catalog.patch_products({2: {"eco_rating": 4.9}})
+    version = catalog.apply_changes([NEW_PRODUCT], [1])
+    wait_rebuilt(suggester, corrector)
+
+    assert suggester.index.version == corrector.index.version == version
+    assert suggester.suggest("verre")["products"][0]["eco_rating"] == 4.9
+    categories = {entry["text"]: entry["count"] for prefix in ("cuisine", "hygiene")
+                  for entry in suggester.suggest(prefix)["suggestions"] if entry["type"] == "category"}
+    assert categories == {"cuisine": 2}
+    assert suggested_terms(suggester, "bamboo") == []
+    assert suggested_terms(suggester, "zebra") == ["zebrawood"]
+    # Terme qui n'est plus dans aucun produit : plus proposé comme correction
+    assert corrector.corrections({"toothbrsh", "zebrawod"}, scorer.state().vocabulary) == {"zebrawod": "zebrawood"}
+
+
+def test_full_reload_rebuilds():
+    catalog, scorer, suggester, corrector = service()
+    previous = suggester.index, corrector.index
+
+    catalog.reload()
+    wait_rebuilt(suggester, corrector)
+
+    assert suggester.index is not previous[0] and corrector.index is not previous[1]
+    assert suggester.index.version == corrector.index.version == scorer.state().version
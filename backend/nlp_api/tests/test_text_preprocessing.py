@@ -0,0 +1,48 @@
+"""
+🧪 fast_word_tokenize (text_preprocessing.py) contre nltk.word_tokenize sur
+des textes déjà réduits à [a-z\\s], comme ceux de preprocess_text.
+
+Usage (depuis backend/nlp_api) :
+    python -m pytest tests/test_text_preprocessing.py
+"""
+import random
+
+import pytest
+
+from text_preprocessing import TREEBANK_SPLITS, fast_word_tokenize, fold_accents
+
+nltk = pytest.importorskip("nltk")
+
+# Contractions Treebank, mots qui les contiennent sans être coupés, et mots ordinaires
+WORDS = list(TREEBANK_SPLITS) + [
+    "cannots", "wannabe", "gonnas", "gottam", "lemmes", "gimmes", "tis", "twas", "dye", "moren", "can", "not",
+    "bamboo", "toothbrush", "reusable", "a", "i", "eco", "zero", "waste",
+]
+SPACES = [" ", "  ", "\t", "\n", " \n "]
+
+
+def nltk_tokens(text):
+    try:
+        return nltk.word_tokenize(text)
+    except LookupError:
+        # Données Punkt absentes : sans ponctuation, le texte est de toute façon une seule phrase
+        return nltk.word_tokenize(text, preserve_line=True)
+
+
+@pytest.mark.parametrize("text", ["", "   ", "cannot", "i cannot wait", "gonna wanna gotta", "lemme gimme that",
+                                  "cannotcannot", " leading and trailing \n"])
+def test_same_tokens_as_nltk(text):
+    assert fast_word_tokenize(text) == nltk_tokens(text)
+
+
+def test_same_tokens_as_nltk_on_random_texts():
+    rng = random.Random(0)
+    for _ in range(500):
+        words = rng.choices(WORDS, k=rng.randint(0, 12))
+        text = rng.choice(SPACES).join(words)
+        assert fast_word_tokenize(text) == nltk_tokens(text), text
+
+
+def test_folded_text_is_tokenized_like_nltk():
+    text = fold_accents("Brosse à dents écologique en bambou cannot œuvre")
+    assert fast_word_tokenize(text) == nltk_tokens(text)
@@ -0,0 +1,74 @@
+"""
+✂️ Tokenisation rapide et cache des lemmes pour preprocess_text.
+
+preprocess_text réduit déjà le texte à [a-z\\s] (après fold_accents : les
+lettres accentuées perdent leur accent au lieu d'être supprimées) avant de
+tokeniser. Sur un tel texte, word_tokenize (Punkt + Treebank) revient à un
+split sur les espaces, sauf pour quelques contractions que Treebank coupe en
+deux ("cannot" -> "can", "not"). fast_word_tokenize reproduit exactement ce
+résultat sans passer par Punkt.
+
+Le vocabulaire du catalogue est petit : un cache LRU token -> lemme évite de
+relancer WordNet sur les mêmes mots.
+
+Variables d'environnement :
+    LEMMA_CACHE_SIZE   nombre max de lemmes mémorisés (défaut 50000)
+"""
+import os
+import unicodedata
+from functools import lru_cache
+
+LEMMA_CACHE_SIZE = int(os.getenv("LEMMA_CACHE_SIZE", "50000"))
+
+# Contractions coupées par le tokenizer Treebank de NLTK (CONTRACTIONS2) qui
+# peuvent survivre au filtre [a-z\s] ; celles avec apostrophe ne le peuvent pas.
+TREEBANK_SPLITS = {
+    'cannot': ('can', 'not'),
+    'gimme': ('gim', 'me'),
+    'gonna': ('gon', 'na'),
+    'gotta': ('got', 'ta'),
+    'lemme': ('lem', 'me'),
+    'wanna': ('wan', 'na'),
+}
+
+
+# Ligatures que la décomposition NFKD ne sépare pas
+LIGATURES = str.maketrans({'œ': 'oe', 'Œ': 'OE', 'æ': 'ae', 'Æ': 'AE', 'ß': 'ss'})
+
+
+def fold_accents(text):
+    """Lowercase text without diacritics: "Écologique" -> "ecologique" """
+    text = text.translate(LIGATURES)
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def fast_word_tokenize(text):
+    """Same tokens as nltk.word_tokenize for text made only of [a-z] and whitespace"""
+    tokens = []
+    for token in text.split():
+        split = TREEBANK_SPLITS.get(token)
+        if split is None:
+            tokens.append(token)
+        else:
+            tokens.extend(split)
+    return tokens
+
+
+def cached_lemmatizer(lemmatize, maxsize=LEMMA_CACHE_SIZE):
+    """Memoize a lemmatize(token) callable in a bounded LRU table"""
+    return lru_cache(maxsize=maxsize)(lemmatize)
+
+
+def lemma_cache_stats(cached):
+    info = cached.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "entries": info.currsize,
+        "max_entries": info.maxsize,
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_rate": round(info.hits / lookups, 4) if lookups else None
+    }
@@ -0,0 +1,420 @@
+"""
+🗃️ Recommandations par utilisateur matérialisées pour /recommend?user_id=.
+
+Job hors ligne (cron, étape de release), depuis backend/nlp_api :
+    python user_recommendations.py build [--out DIR] [--workers N]
+    python user_recommendations.py info
+
+build charge les interactions, le modèle item-item (collaborative.py) et le
+modèle de contenu (similarity.py), puis calcule les USER_RECS_TOP_N
+meilleurs produits de chaque utilisateur actif. Score d'un produit : somme,
+sur l'historique pondéré de l'utilisateur, de poids x similarité, une fois
+avec les voisins de co-interaction et une fois avec les voisins de contenu ;
+chaque signal est ramené à [0, 1] par utilisateur puis mélangé selon
+USER_RECS_CONTENT_WEIGHT. Les produits déjà vus sont exclus, les places
+restantes complétées par les produits les plus populaires. Les utilisateurs
+sont traités par blocs (produits de matrices creuses), répartis sur un pool
+de processus.
+
+Le résultat est écrit en .npy dans USER_RECS_DIR/<horodatage>/ : ids des
+utilisateurs triés, tableau utilisateurs x N des produits (-1 = vide) et de
+leurs scores. Le fichier CURRENT est remplacé en dernier (os.replace). Le
+service ouvre la table avec np.load(mmap_mode='r') : une recommandation est
+une recherche dichotomique dans les ids puis la lecture d'une ligne. Un
+utilisateur absent de la table (nouveau, ou inactif lors du job) est
+calculé en ligne avec le même score.
+
+Variables d'environnement :
+    USER_RECS_DIR              dossier des tables (défaut : user_recommendations/ à côté de ce fichier)
+    USER_RECS_TOP_N            produits recommandés par utilisateur (défaut 8)
+    USER_RECS_CONTENT_WEIGHT   part du signal de contenu dans le score, entre 0 et 1 (défaut 0.3)
+    USER_RECS_ACTIVE_DAYS      utilisateurs actifs = une interaction depuis N jours (défaut 90, 0 = tous)
+    USER_RECS_BLOCK_USERS      utilisateurs par tâche du pool de processus (défaut 1024)
+    USER_RECS_WORKERS          processus du job (défaut : nombre de CPU)
+    USER_RECS_CHECK_SECONDS    intervalle de vérification d'une nouvelle table par le service (défaut 60)
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.sparse import csr_matrix, diags
+
+from logger import get_logger
+
+USER_RECS_DIR = os.getenv(
+    "USER_RECS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "user_recommendations")
+)
+USER_RECS_TOP_N = int(os.getenv("USER_RECS_TOP_N", "8"))
+USER_RECS_CONTENT_WEIGHT = float(os.getenv("USER_RECS_CONTENT_WEIGHT", "0.3"))
+USER_RECS_ACTIVE_DAYS = int(os.getenv("USER_RECS_ACTIVE_DAYS", "90"))
+USER_RECS_BLOCK_USERS = int(os.getenv("USER_RECS_BLOCK_USERS", "1024"))
+USER_RECS_WORKERS = int(os.getenv("USER_RECS_WORKERS", str(os.cpu_count() or 1)))
+USER_RECS_CHECK_SECONDS = float(os.getenv("USER_RECS_CHECK_SECONDS", "60"))
+
+TABLE_FORMAT = 1
+
+log = get_logger("user_recommendations")
+
+
+def _scaled_rows(matrix, weight):
+    """matrix with each row divided by its maximum, times weight"""
+    maxima = matrix.max(axis=1).toarray().ravel()
+    factors = np.zeros(len(maxima), dtype=np.float32)
+    positive = maxima > 0
+    factors[positive] = weight / maxima[positive]
+    return (diags(factors) @ matrix).tocsr()
+
+
+class BlendedScorer:
+    """Co-interaction and content neighbor tables as sparse matrices over the catalog rows"""
+
+    def __init__(self, cf_model, content_model, content_weight=USER_RECS_CONTENT_WEIGHT):
+        self.content_weight = content_weight
+        # Lignes du catalogue = lignes du modèle de contenu
+        self.ids = np.asarray(content_model.ids, dtype=np.int64)
+        self._sorter = np.argsort(self.ids, kind='stable')
+        n = len(self.ids)
+
+        # Colonnes du modèle item-item -> lignes du catalogue (-1 : produit supprimé depuis)
+        self.user_ids = cf_model.user_ids
+        self.user_items = csr_matrix(cf_model.user_items, dtype=np.float32)
+        self.item_col = cf_model.item_col
+        item_rows = self.rows(cf_model.item_ids)
+        n_items = len(item_rows)
+        known = item_rows >= 0
+        self.item_to_row = csr_matrix(
+            (np.ones(int(known.sum()), dtype=np.float32), (np.nonzero(known)[0], item_rows[known])), shape=(n_items, n)
+        )
+
+        neighbors = np.asarray(cf_model.neighbors)
+        targets = np.where(neighbors >= 0, item_rows[np.maximum(neighbors, 0)], -1)
+        items, slots = np.nonzero(targets >= 0)
+        self.cf = csr_matrix(
+            (np.asarray(cf_model.scores)[items, slots], (items, targets[items, slots])), shape=(n_items, n)
+        )
+
+        scores = np.asarray(content_model.scores)
+        rows, slots = np.nonzero(scores > 0)
+        self.content = csr_matrix(
+            (scores[rows, slots], (rows, np.asarray(content_model.neighbors)[rows, slots])), shape=(n, n)
+        )
+
+        # Complément : produits du catalogue par nombre d'utilisateurs, du plus au moins populaire
+        counts = np.bincount(self.user_items.indices, minlength=n_items)
+        popularity = np.zeros(n, dtype=np.int64)
+        popularity[item_rows[known]] = counts[known]
+        self.popular = np.argsort(-popularity, kind='stable')
+
+    def rows(self, product_ids):
+        """Catalog rows of product_ids (-1 for products missing from the catalog)"""
+        product_ids = np.asarray(product_ids, dtype=np.int64)
+        if not len(self.ids):
+            return np.full(len(product_ids), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.ids, product_ids, sorter=self._sorter), len(self.ids) - 1)
+        rows = self._sorter[positions]
+        return np.where(self.ids[rows] == product_ids, rows, -1)
+
+    def top_n(self, user_items, history, top_n):
+        """(product ids, scores) arrays of shape (users, top_n), -1 / 0 for empty slots.
+
+        user_items: users x item-item columns weights; history: users x catalog rows weights.
+        """
+        cf = _scaled_rows((user_items @ self.cf).tocsr(), 1.0 - self.content_weight)
+        content = _scaled_rows((history @ self.content).tocsr(), self.content_weight)
+        blended = (cf + content).tocsr()
+        blended.sort_indices()
+        history = history.tocsr()
+
+        product_ids = np.full((blended.shape[0], top_n), -1, dtype=np.int64)
+        scores = np.zeros((blended.shape[0], top_n), dtype=np.float32)
+        for user in range(blended.shape[0]):
+            start, stop = blended.indptr[user], blended.indptr[user + 1]
+            candidates = blended.indices[start:stop]
+            values = blended.data[start:stop]
+            seen = history.indices[history.indptr[user]:history.indptr[user + 1]]
+            keep = (values > 0) & ~np.isin(candidates, seen)
+            candidates, values = candidates[keep], values[keep]
+            if len(candidates) > top_n:
+                top = np.argpartition(-values, top_n - 1)[:top_n]
+                candidates, values = candidates[top], values[top]
+            order = np.lexsort((candidates, -values))
+            chosen = candidates[order].tolist()
+            scores[user, :len(chosen)] = values[order]
+
+            if len(chosen) < top_n:
+                skip = set(seen.tolist()) | set(chosen)
+                for row in self.popular[:top_n + len(skip)].tolist():
+                    if len(chosen) >= top_n:
+                        break
+                    if row not in skip:
+                        chosen.append(row)
+            product_ids[user, :len(chosen)] = self.ids[chosen]
+        return product_ids, scores
+
+    def user_rows(self, rows, top_n):
+        """top_n for rows of the fitted user x item matrix (one task of the job)"""
+        user_items = self.user_items[rows]
+        return self.top_n(user_items, user_items @ self.item_to_row, top_n)
+
+    def recommend(self, history, top_n):
+        """Product ids for one {product_id: weight} history (online path)"""
+        product_ids = list(history)
+        weights = np.array([history[product_id] for product_id in product_ids], dtype=np.float32)
+
+        columns = [self.item_col.get(product_id, -1) for product_id in product_ids]
+        known = np.array([column >= 0 for column in columns], dtype=bool)
+        user_items = csr_matrix(
+            (weights[known], (np.zeros(int(known.sum()), dtype=np.int64), np.array(columns, dtype=np.int64)[known])),
+            shape=(1, self.user_items.shape[1])
+        )
+        # Historique sur le catalogue : inclut les produits encore inconnus du modèle item-item
+        rows = self.rows(product_ids)
+        in_catalog = rows >= 0
+        history_rows = csr_matrix(
+            (weights[in_catalog], (np.zeros(int(in_catalog.sum()), dtype=np.int64), rows[in_catalog])),
+            shape=(1, len(self.ids))
+        )
+        recommended, _ = self.top_n(user_items, history_rows, top_n)
+        return [int(product_id) for product_id in recommended[0] if product_id >= 0]
+
+
+# 🔹 Table matérialisée
+class RecommendationTable:
+    """Read-only view over one materialized table directory"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.user_ids = np.load(os.path.join(path, "user_ids.npy"), mmap_mode='r')
+        self.product_ids = np.load(os.path.join(path, "product_ids.npy"), mmap_mode='r')
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def lookup(self, user_id):
+        """Materialized product ids of user_id, or None if the user is not in the table"""
+        row = int(np.searchsorted(self.user_ids, user_id))
+        if row >= len(self.user_ids) or self.user_ids[row] != user_id:
+            return None
+        return [int(product_id) for product_id in self.product_ids[row] if product_id >= 0]
+
+
+def write_table(base_dir, user_ids, product_ids, scores, meta):
+    """Write the table (rows sorted by user id) and point CURRENT to it; returns its directory"""
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+    path = os.path.join(base_dir, name)
+    os.makedirs(path)
+
+    order = np.argsort(user_ids, kind='stable')
+
+    def save(name, array):
+        np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(array))
+
+    save("user_ids", np.asarray(user_ids, dtype=np.int64)[order])
+    save("product_ids", product_ids[order])
+    save("scores", scores[order])
+    with open(os.path.join(path, "meta.json"), "w", encoding='utf-8') as f:
+        json.dump({"format": TABLE_FORMAT, "users": len(order), "created_at": time.time(), **meta}, f)
+
+    current = os.path.join(base_dir, "CURRENT")
+    with open(current + ".tmp", "w", encoding='utf-8') as f:
+        f.write(name)
+    os.replace(current + ".tmp", current)
+    return path
+
+
+def open_current(base_dir=USER_RECS_DIR):
+    """The table named by base_dir/CURRENT, or None"""
+    try:
+        with open(os.path.join(base_dir, "CURRENT"), encoding='utf-8') as f:
+            name = f.read().strip()
+        table = RecommendationTable(os.path.join(base_dir, name))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        log.error("❌ User recommendation table unreadable, ignoring it: %s", e)
+        return None
+    if table.meta.get("format") != TABLE_FORMAT:
+        return None
+    return table
+
+
+class UserRecommender:
+    """Materialized table first; online blended score for the users missing from it"""
+
+    def __init__(self, store, cf_recommender, content_model, base_dir=USER_RECS_DIR, top_n=USER_RECS_TOP_N,
+                 content_weight=USER_RECS_CONTENT_WEIGHT, check_seconds=USER_RECS_CHECK_SECONDS):
+        self.store = store
+        self.cf_recommender = cf_recommender
+        self.content_model = content_model
+        self.base_dir = base_dir
+        self.top_n = top_n
+        self.content_weight = content_weight
+        self.check_seconds = check_seconds
+        self.table = None
+        self._table_name = None
+        self._checked_at = None
+        self._scorer = None
+        self._scorer_key = None
+        self._lock = threading.Lock()
+
+    def current_table(self):
+        """Materialized table, reopened when the job has pointed CURRENT to a new one"""
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_seconds:
+            return self.table
+        with self._lock:
+            if self._checked_at is None or now - self._checked_at >= self.check_seconds:
+                try:
+                    with open(os.path.join(self.base_dir, "CURRENT"), encoding='utf-8') as f:
+                        name = f.read().strip()
+                except FileNotFoundError:
+                    name = None
+                if name != self._table_name:
+                    self.table = open_current(self.base_dir) if name else None
+                    self._table_name = name
+                    if self.table is not None:
+                        log.info("🗃️ User recommendations loaded from %s: %d users", self.table.path, len(self.table))
+                self._checked_at = now
+        return self.table
+
+    def scorer(self):
+        """BlendedScorer of the current item-item and content models (rebuilt when either changes)"""
+        cf_model = self.cf_recommender.model
+        content_model = self.content_model.ensure_model()
+        if cf_model is None:
+            return None
+        key = (id(cf_model), id(content_model), content_model.version)
+        if self._scorer_key != key:
+            with self._lock:
+                if self._scorer_key != key:
+                    self._scorer = BlendedScorer(cf_model, content_model, self.content_weight)
+                    self._scorer_key = key
+        return self._scorer
+
+    def recommend(self, user_id, num_recommendations=None):
+        """(product ids, "materialized" | "online") for user_id"""
+        num_recommendations = num_recommendations or self.top_n
+        table = self.current_table()
+        product_ids = table.lookup(user_id) if table is not None else None
+        if product_ids is not None and num_recommendations <= table.meta["top_n"]:
+            # Historique déjà en mémoire (préchargé) : on écarte ce que l'utilisateur a vu depuis le job
+            if self.store.compacted_at is not None:
+                history = self.store.history(user_id)
+                product_ids = [product_id for product_id in product_ids if product_id not in history]
+            return product_ids[:num_recommendations], "materialized"
+
+        self.store.ensure_started()
+        history = self.store.history(user_id)
+        scorer = self.scorer() if history else None
+        if scorer is None:
+            return [], "online"
+        return scorer.recommend(history, num_recommendations), "online"
+
+
+# 🔹 Job
+def fetch_active_users(days):
+    """Ids of the users with an interaction in the last days"""
+    import db
+
+    with db.connection() as connection, connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT DISTINCT user_id FROM "UserInteractions" WHERE "timestamp" >= NOW() - %s * INTERVAL \'1 day\'',
+            (days,)
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+_worker_scorer = None
+
+
+def _init_worker(scorer):
+    global _worker_scorer
+    _worker_scorer = scorer
+
+
+def _score_block(rows, top_n):
+    return _worker_scorer.user_rows(rows, top_n)
+
+
+def materialize(scorer, user_rows, top_n=USER_RECS_TOP_N, workers=USER_RECS_WORKERS, block_users=USER_RECS_BLOCK_USERS):
+    """(product ids, scores) of the given rows of the user x item matrix, blocks spread over a process pool"""
+    blocks = [user_rows[start:start + block_users] for start in range(0, len(user_rows), block_users)]
+    if not blocks:
+        return np.full((0, top_n), -1, dtype=np.int64), np.zeros((0, top_n), dtype=np.float32)
+
+    if workers <= 1 or len(blocks) == 1:
+        results = [scorer.user_rows(rows, top_n) for rows in blocks]
+    else:
+        # fork : les workers héritent des matrices sans les recevoir sérialisées
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        with ProcessPoolExecutor(max_workers=min(workers, len(blocks)), mp_context=context,
+                                 initializer=_init_worker, initargs=(scorer,)) as executor:
+            results = list(executor.map(_score_block, blocks, [top_n] * len(blocks)))
+    return np.concatenate([ids for ids, _ in results]), np.concatenate([scores for _, scores in results])
+
+
+def build(base_dir=USER_RECS_DIR, workers=USER_RECS_WORKERS, top_n=USER_RECS_TOP_N,
+          content_weight=USER_RECS_CONTENT_WEIGHT, active_days=USER_RECS_ACTIVE_DAYS):
+    """Offline job: materialize the recommendations of every active user"""
+    os.environ.setdefault("CATALOG_LISTEN", "0")
+    os.environ.setdefault("BACKGROUND_AUTOSTART", "0")
+    import recommend
+
+    start = time.perf_counter()
+    recommend.interaction_store.catch_up()
+    cf_model = recommend.cf_recommender.model
+    content_model = recommend.content_model.ensure_model()
+    scorer = BlendedScorer(cf_model, content_model, content_weight)
+
+    user_rows = np.arange(len(scorer.user_ids))
+    if active_days > 0:
+        active = np.array(fetch_active_users(active_days), dtype=np.int64)
+        user_rows = user_rows[np.isin(scorer.user_ids, active)]
+    prepared = time.perf_counter()
+
+    product_ids, scores = materialize(scorer, user_rows, top_n, workers)
+    os.makedirs(base_dir, exist_ok=True)
+    path = write_table(base_dir, scorer.user_ids[user_rows], product_ids, scores, {
+        "top_n": top_n,
+        "content_weight": content_weight,
+        "active_days": active_days,
+        "catalog_version": content_model.version,
+        "seconds": round(time.perf_counter() - start, 3)
+    })
+    print(f"🗃️ User recommendations written to {path}: {len(user_rows)} users in {time.perf_counter() - prepared:.1f}s "
+          f"({workers} workers, models loaded in {prepared - start:.1f}s)")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["build", "info"])
+    parser.add_argument("--out", default=USER_RECS_DIR, help="table base directory (USER_RECS_DIR)")
+    parser.add_argument("--workers", type=int, default=USER_RECS_WORKERS, help="job processes (USER_RECS_WORKERS)")
+    parser.add_argument("--top-n", type=int, default=USER_RECS_TOP_N, help="products per user (USER_RECS_TOP_N)")
+    parser.add_argument("--active-days", type=int, default=USER_RECS_ACTIVE_DAYS, help="0 = every user (USER_RECS_ACTIVE_DAYS)")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build(args.out, args.workers, args.top_n, USER_RECS_CONTENT_WEIGHT, args.active_days)
+        return
+
+    table = open_current(args.out)
+    if table is None:
+        print(f"No user recommendation table in {args.out}")
+        sys.exit(1)
+    print(json.dumps({"path": table.path, **table.meta}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+🚀 Point d'entrée WSGI de production : les deux services dans un seul serveur.
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+app.py (recherche, avis) et recommend.py (recommandations) tournent dans les
+mêmes processus et partagent le snapshot du catalogue et le pool PostgreSQL.
+gunicorn écoute sur les deux ports habituels ; chaque requête est envoyée à
+l'application qui correspond au port d'arrivée (5001 -> app.py, 5003 ->
+recommend.py), donc les URLs existantes ne changent pas.
+
+Avec preload_app, ce module est importé une seule fois dans le master :
+preload() y charge catalogue, index de recherche, TF-IDF et modèle item-item,
+puis les workers en héritent par copy-on-write au fork. Aucun thread ne
+tourne dans le master (BACKGROUND_AUTOSTART=0, posé par gunicorn.conf.py) ;
+start_background() les démarre dans chaque worker (hook post_worker_init
+de gunicorn.conf.py, une fois le worker initialisé).
+"""
+import os
+
+import db
+import app as search_service
+import recommend as recommend_service
+
+SEARCH_PORT = os.getenv("SEARCH_PORT", "5001")
+RECOMMEND_PORT = os.getenv("RECOMMEND_PORT", "5003")
+
+
+class PortDispatcher:
+    """Route each request to the Flask app bound to the port it arrived on"""
+
+    def __init__(self, apps_by_port, default):
+        self.apps_by_port = apps_by_port
+        self.default = default
+
+    def __call__(self, environ, start_response):
+        target = self.apps_by_port.get(environ.get("SERVER_PORT"), self.default)
+        return target(environ, start_response)
+
+
+application = PortDispatcher({SEARCH_PORT: search_service.app, RECOMMEND_PORT: recommend_service.app}, default=search_service.app)
+
+
+def preload():
+    """Build the shared state once, in the master, before the workers are forked"""
+    steps = [
+        ("search warmup", search_service.warmup.run),
+        ("content model", recommend_service.content_model.ensure_model),
+        ("interactions", recommend_service.interaction_store.catch_up),
+        ("user recommendations", recommend_service.user_recommender.current_table),
+    ]
+    for name, step in steps:
+        try:
+            step()
+        except Exception as e:
+            # Les workers chargeront cette partie au premier usage
+            print(f"❌ Preload step '{name}' failed: {e}")
+
+    # Les connexions ouvertes par le master ne doivent pas être partagées par les workers
+    db.pool.reset()
+
+
+def start_background():
+    """Per-process threads of both services (called in each worker after fork)"""
+    search_service.start_background()
+    recommend_service.start_background()
@@ -6,7 +6,7 @@ echo "🚀 Starting Eco-Recommendation App..."
 # Start NLP API (only if DATABASE_URL is available)
 if [ ! -z "$DATABASE_URL" ]; then
     echo "🐍 Starting NLP API..."
-    cd /app/backend/nlp_api && python3 app.py &
+    cd /app/backend/nlp_api && gunicorn -c gunicorn.conf.py wsgi:application &
     sleep 3
 else
     echo "⚠️  No DATABASE_URL found, skipping NLP API"